@@ -0,0 +1,107 @@
+import time
+import uuid
+import asyncio
+import statistics
+from typing import Optional
+
+from kvasir_agents.sandbox.local import LocalSandbox
+
+
+# Per-operation latency of LocalSandbox through its exec channel against one docker exec per operation, the way
+# every operation used to run. Needs docker and the research-sandbox image, and creates (and removes) its own
+# container. Run from the agents directory with: python -m benchmarks.sandbox_exec_latency
+
+N_REPEATS = 50
+PACKAGE_NAME = "benchmark"
+SCRIPT_PATH = f"/app/{PACKAGE_NAME}/script.py"
+SCRIPT_CONTENT = "\n".join(f"x_{i} = {i}" for i in range(200))
+
+
+async def _docker_exec(container_name: str, command: str, stdin: Optional[str] = None) -> str:
+    process = await asyncio.create_subprocess_exec(
+        "docker", "exec", "-i", container_name,
+        "bash", "-c", f"mkdir -p /app/{PACKAGE_NAME} && cd /app/{PACKAGE_NAME} && {command}",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    out, _ = await process.communicate(stdin.encode("utf-8") if stdin is not None else None)
+    return out.decode("utf-8")
+
+
+async def _docker_exec_replace_script_lines(container_name: str) -> None:
+    # The exists check, read and write a SWE replace_script_lines call makes
+    await _docker_exec(container_name, f"test -f {SCRIPT_PATH}")
+    content = await _docker_exec(container_name, f"cat {SCRIPT_PATH}")
+    await _docker_exec(container_name, f"cat > {SCRIPT_PATH}", stdin=content)
+
+
+async def _channel_replace_script_lines(sandbox: LocalSandbox) -> None:
+    await sandbox.check_file_exists(SCRIPT_PATH)
+    content = await sandbox.read_file(SCRIPT_PATH, truncate=False)
+    await sandbox.write_file(SCRIPT_PATH, content)
+
+
+async def _time(operation) -> float:
+    # Warm up, the first call through the channel starts its process
+    await operation()
+
+    latencies = []
+    for _ in range(N_REPEATS):
+        start = time.perf_counter()
+        await operation()
+        latencies.append(time.perf_counter() - start)
+
+    return statistics.median(latencies) * 1000
+
+
+async def main():
+    sandbox = LocalSandbox(uuid.uuid4(), PACKAGE_NAME)
+    container_name = sandbox.container_name
+
+    try:
+        await sandbox.create_container_if_not_exists()
+        await _docker_exec(container_name, f"cat > {SCRIPT_PATH}", stdin=SCRIPT_CONTENT)
+
+        operations = {
+            "run_python_code": (
+                lambda: _docker_exec(container_name, "python -c 'import sys; exec(sys.stdin.read())'", stdin="print(1)"),
+                lambda: sandbox.run_python_code("print(1)")
+            ),
+            "run_shell_code": (
+                lambda: _docker_exec(container_name, "echo 1"),
+                lambda: sandbox.run_shell_code("echo 1")
+            ),
+            "read_file": (
+                lambda: _docker_exec(container_name, f"cat {SCRIPT_PATH}"),
+                lambda: sandbox.read_file(SCRIPT_PATH)
+            ),
+            "write_file": (
+                lambda: _docker_exec(container_name, f"cat > {SCRIPT_PATH}", stdin=SCRIPT_CONTENT),
+                lambda: sandbox.write_file(SCRIPT_PATH, SCRIPT_CONTENT)
+            ),
+            "check_file_exists": (
+                lambda: _docker_exec(container_name, f"test -f {SCRIPT_PATH}"),
+                lambda: sandbox.check_file_exists(SCRIPT_PATH)
+            ),
+            "list_directory": (
+                lambda: _docker_exec(container_name, "ls -la"),
+                lambda: sandbox.list_directory_contents()
+            ),
+            "replace_script_lines": (
+                lambda: _docker_exec_replace_script_lines(container_name),
+                lambda: _channel_replace_script_lines(sandbox)
+            ),
+        }
+
+        print(f"{'operation':>22} {'docker exec ms':>15} {'channel ms':>11} {'speedup':>8}")
+        for name, (docker_exec_operation, channel_operation) in operations.items():
+            docker_exec_ms = await _time(docker_exec_operation)
+            channel_ms = await _time(channel_operation)
+            print(f"{name:>22} {docker_exec_ms:>15.1f} {channel_ms:>11.1f} {docker_exec_ms / channel_ms:>7.1f}x")
+    finally:
+        await sandbox.delete_container_if_exists()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
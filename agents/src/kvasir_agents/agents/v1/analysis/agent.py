@@ -116,3 +116,5 @@ class AnalysisAgentV1(AgentV1[AnalysisDeps, str]):
         except Exception as e:
             await self.fail_run_if_exists(f"Error running analysis agent: {e}")
             raise e
+        finally:
+            await self.deps.kernel.shutdown()
@@ -4,6 +4,7 @@ from dataclasses import dataclass, field
 
 from kvasir_agents.agents.v1.kvasir.knowledge_bank import SUPPORTED_TASKS_LITERAL
 from kvasir_agents.agents.v1.base_agent import AgentDeps
+from kvasir_agents.sandbox.kernel import PythonKernel
 from kvasir_ontology.entities.analysis.data_model import Analysis
 
 
@@ -16,9 +17,13 @@ class AnalysisDeps(AgentDeps):
     analysis_id: Optional[UUID] = None
     # Will be set by agent during setup
     analysis: Optional[Analysis] = None
+    # Code cells run incrementally in this kernel for the lifetime of the run
+    kernel: Optional[PythonKernel] = None
 
     def __post_init__(self):
         super().__post_init__()
+        if self.kernel is None:
+            self.kernel = self.sandbox.create_python_kernel()
         if isinstance(self.kvasir_run_id, str):
             self.kvasir_run_id = UUID(self.kvasir_run_id)
         if isinstance(self.analysis, dict):
@@ -8,6 +8,7 @@ from kvasir_agents.utils.code_utils import remove_print_statements_from_code
 from kvasir_agents.agents.v1.analysis.deps import AnalysisDeps
 from kvasir_agents.agents.v1.chart.agent import ChartAgentV1, ChartDeps
 from kvasir_agents.agents.v1.base_agent import Context
+from kvasir_agents.sandbox.scheduler import ExecPriority, exec_priority
 
 from kvasir_ontology.entities.analysis.data_model import (
     SectionCreate, CodeCellCreate, MarkdownCellCreate, CodeOutputCreate, AnalysisCell, Analysis, Section)
@@ -60,12 +61,10 @@ async def create_code_cell(
 
     await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Creating code cell in section {section_id} {code}", "tool_call")
 
-    past_code = _extract_code_from_previous_cells(
-        ctx.deps.analysis, remove_print_statements=True)
-    full_code = f"{past_code}\n\n{code}"
-
-    out, err = await ctx.deps.sandbox.run_python_code(
-        full_code,
+    # Only the new cell runs unless the kernel's state is out of date, then the previous cells are replayed first
+    out, err = await ctx.deps.kernel.run_cell(
+        code,
+        previous_cells=_get_code_cells(ctx.deps.analysis),
         truncate_output=True,
         timeout=ctx.deps.time_limit
     )
@@ -171,11 +170,14 @@ analysis_toolset = FunctionToolset(
 ###
 
 
-def _extract_code_from_previous_cells(analysis: Analysis, remove_print_statements: bool = True) -> str:
-    code_cells = [
+def _get_code_cells(analysis: Analysis) -> List[str]:
+    return [
         cell.type_fields.code for section in analysis.sections for cell in section.cells if cell.type == "code"
     ]
-    code_combined = "\n\n".join(code_cells)
+
+
+def _extract_code_from_previous_cells(analysis: Analysis, remove_print_statements: bool = True) -> str:
+    code_combined = "\n\n".join(_get_code_cells(analysis))
     if remove_print_statements:
         code_combined = remove_print_statements_from_code(code_combined)
     return code_combined
@@ -193,7 +195,9 @@ async def _add_analysis_chart(ctx: RunContext[AnalysisDeps], cell_id: uuid.UUID,
             ctx.deps.analysis, remove_print_statements=True))
 
     chart_agent = ChartAgentV1(deps)
-    chart_output = await chart_agent(chart_description, Context(analyses=[ctx.deps.analysis.id]))
+    # Charts are generated in the background, so their code yields the sandbox to the run's own code
+    with exec_priority(ExecPriority.BACKGROUND):
+        chart_output = await chart_agent(chart_description, Context(analyses=[ctx.deps.analysis.id]))
     save_path = SANDBOX_INTERNAL_SCRIPT_DIR / f"{cell_id}_{uuid.uuid4()}.py"
     await ctx.deps.sandbox.write_file(str(save_path), chart_output.script_content)
     await ctx.deps.ontology.analyses.create_code_output_echart(cell_id, EchartCreate(chart_script_path=str(save_path)))
@@ -72,12 +72,17 @@ class AgentDeps:
 
 class AgentV1(ABC, Generic[TDeps, TOutput]):
     deps_class: type[TDeps]
+    # How many of the last messages of a run's history to load when resuming it, None to load all of them. The
+    # history processors only rewrite old messages, they don't drop any, so every agent needs its whole history
+    max_history_messages: Optional[int] = None
 
     def __init__(self, deps: TDeps, agent: Agent[TDeps, TOutput]):
         self.deps = deps
         self.agent = agent
         self.message_history: Optional[List[ModelMessage]] = None
         self.new_messages: List[ModelMessage] = []
+        # How many of the new messages have been saved, only the ones after them are appended on the next save
+        self.saved_message_count = 0
 
     async def __call__(
             self,
@@ -176,19 +181,27 @@ class AgentV1(ABC, Generic[TDeps, TOutput]):
 
     async def finish_run(self, success_message: Optional[str] = None):
         assert self.deps.run_id is not None, "Run ID must be set before finishing run."
-        await self.deps.callbacks.save_message_history(self.deps.user_id, self.deps.run_id, self.new_messages)
+        await self.save_new_messages()
         await self.deps.callbacks.set_run_status(self.deps.user_id, self.deps.run_id, "completed")
         if success_message:
             await self.deps.callbacks.log(self.deps.user_id, self.deps.run_id, success_message, "result")
+        await self.deps.callbacks.flush_logs()
         await self.save_deps()
 
     async def fail_run_if_exists(self, error: str):
         if self.deps.run_id is not None:
             await self.deps.callbacks.set_run_status(self.deps.user_id, self.deps.run_id, "failed")
             await self.deps.callbacks.log(self.deps.user_id, self.deps.run_id, error, "error")
-            await self.deps.callbacks.save_message_history(self.deps.user_id, self.deps.run_id, self.new_messages)
+            await self.deps.callbacks.flush_logs()
+            await self.save_new_messages()
             await self.save_deps()
 
+    async def save_new_messages(self):
+        assert self.deps.run_id is not None, "Run ID must be set before saving messages."
+        unsaved_messages = self.new_messages[self.saved_message_count:]
+        await self.deps.callbacks.save_message_history(self.deps.user_id, self.deps.run_id, unsaved_messages)
+        self.saved_message_count += len(unsaved_messages)
+
     async def save_deps(self):
         assert self.deps.run_id is not None, "Run ID must be set before saving deps."
         deps_dict = self.deps.to_dict()
@@ -237,7 +250,7 @@ class AgentV1(ABC, Generic[TDeps, TOutput]):
     async def from_run(cls, user_id: UUID, run_id: UUID, callbacks: KvasirV1Callbacks, bearer_token: Optional[str] = None) -> Self:
         deps = await cls.load_deps(user_id, run_id, callbacks, bearer_token)
         agent = cls(deps)
-        agent.message_history = await callbacks.get_message_history(user_id, run_id)
+        agent.message_history = await callbacks.get_message_history(user_id, run_id, cls.max_history_messages)
         return agent
 
     @classmethod
@@ -21,6 +21,10 @@ class KvasirV1Callbacks(ABC):
     async def log(self, user_id: UUID, run_id: UUID, message: str, type: Literal["result", "tool_call", "error", "info"]) -> None:
         pass
 
+    async def flush_logs(self) -> None:
+        """Writes out log messages that are still buffered, for implementations that don't write them right away."""
+        pass
+
     @abstractmethod
     async def get_run_status(self, user_id: UUID, run_id: UUID) -> Literal["pending", "completed", "failed", "waiting", "running"]:
         pass
@@ -57,10 +61,12 @@ class KvasirV1Callbacks(ABC):
 
     @abstractmethod
     async def save_message_history(self, user_id: UUID, run_id: UUID, message_history: List[ModelMessage]) -> None:
+        """Appends the messages to the run's history, after the ones saved before."""
         pass
 
     @abstractmethod
-    async def get_message_history(self, user_id: UUID, run_id: UUID) -> List[ModelMessage] | None:
+    async def get_message_history(self, user_id: UUID, run_id: UUID, max_messages: Optional[int] = None) -> List[ModelMessage] | None:
+        """The run's whole history, or only its last max_messages messages, see get_history_tail."""
         pass
 
     @abstractmethod
@@ -43,6 +43,9 @@ class PydanticAIMessage(BaseModel):
     id: uuid.UUID
     run_id: uuid.UUID
     message_list: bytes
+    seq: Optional[int] = None
+    message_count: Optional[int] = None
+    compression: Optional[Literal["zstd"]] = None
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc))
 
@@ -18,6 +18,7 @@ from kvasir_agents.app_secrets import SANDBOX_INTERNAL_SCRIPT_DIR
 from kvasir_agents.agents.v1.shared_tools import navigation_toolset
 from kvasir_agents.agents.v1.chart.agent import ChartAgentV1
 from kvasir_agents.agents.v1.base_agent import Context
+from kvasir_agents.sandbox.scheduler import ExecPriority, exec_priority
 
 
 data_source_system_prompt = f"""
@@ -378,7 +379,9 @@ async def _add_object_group_chart(ctx: RunContext[ExtractionDeps], object_group_
         bearer_token=ctx.deps.bearer_token)
 
     chart_agent = ChartAgentV1(deps)
-    chart_output = await chart_agent(chart_description, context)
+    # Charts are generated in the background, so their code yields the sandbox to the run's own code
+    with exec_priority(ExecPriority.BACKGROUND):
+        chart_output = await chart_agent(chart_description, context)
     save_path = SANDBOX_INTERNAL_SCRIPT_DIR / \
         f"{object_group_id}_{uuid.uuid4()}.py"
     await ctx.deps.sandbox.write_file(str(save_path), chart_output.script_content)
@@ -1,11 +1,27 @@
 import copy
 from dataclasses import dataclass
 from pydantic_ai import RunContext
-from pydantic_ai.messages import ModelMessage, ModelRequest, ToolReturnPart
+from pydantic_ai.messages import ModelMessage, ModelRequest, ToolReturnPart, RetryPromptPart
 
 from kvasir_agents.utils.agent_utils import print_message_history
 
 
+def get_history_tail(messages: list[ModelMessage], max_messages: int) -> list[ModelMessage]:
+    """
+    The last max_messages messages, from the first request in them that does not answer a tool call, as a history
+    has to start where the model was not mid tool call. If the last turn is longer than that, all of the last turn.
+    Returns an empty list if no message starts a turn.
+    """
+    def starts_turn(message: ModelMessage) -> bool:
+        return isinstance(message, ModelRequest) and not any(
+            isinstance(part, (ToolReturnPart, RetryPromptPart)) for part in message.parts)
+
+    start = max(0, len(messages) - max_messages)
+    turn_starts = [i for i in range(start, len(messages)) if starts_turn(messages[i])] or \
+        [i for i in range(start - 1, -1, -1) if starts_turn(messages[i])][:1]
+    return messages[turn_starts[0]:] if turn_starts else []
+
+
 def get_last_script_message_index(messages: list[ModelMessage]) -> dict[str, int]:
     """
     Find the index of the last message containing a script modification tool call.
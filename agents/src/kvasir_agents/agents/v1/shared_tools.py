@@ -23,11 +23,23 @@ async def read_files_tool(ctx: RunContext[AgentDeps], file_paths: list[str]) ->
 
     await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Reading {len(file_paths)} file(s): {', '.join(file_paths)}", "tool_call")
 
+    # Only files with an allowed extension are read, all of them in one call to the sandbox
+    readable_paths = [
+        file_path for file_path in file_paths if is_readable_extension(file_path)]
+    try:
+        read_results = await ctx.deps.sandbox.read_files(readable_paths, max_lines=5000)
+    except RuntimeError as e:
+        await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Error reading files: {e}", "error")
+        raise ModelRetry(f"Could not read files: {e}")
+    read_results_by_path = dict(zip(readable_paths, read_results))
+
     results = []
+    # The outcome of each file goes into one log entry rather than one per file
+    log_lines = []
 
     for file_path in file_paths:
-        # Check if file has an allowed extension
-        if not is_readable_extension(file_path):
+        if file_path not in read_results_by_path:
+            log_lines.append(f"{file_path}: not an allowed file type")
             results.append(
                 f"<begin_file file_path={file_path}>\n"
                 f"ERROR: File does not have an allowed extension. Only text-based files are supported: {', '.join(sorted(READABLE_EXTENSIONS))}\n"
@@ -35,41 +47,61 @@ async def read_files_tool(ctx: RunContext[AgentDeps], file_paths: list[str]) ->
             )
             continue
 
-        # Read file and check total line count
-        shell_code = f"head -n 5000 {file_path} && wc -l < {file_path} || echo 'Error: File not found or cannot be read'"
-        out, err = await ctx.deps.sandbox.run_shell_code(shell_code)
-
-        if err or "Error:" in out or not out.strip():
-            error_msg = err or out.strip()
-            await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Error reading file {file_path}: {error_msg}", "error")
+        read_result = read_results_by_path[file_path]
+        if read_result.error:
+            log_lines.append(f"{file_path}: error - {read_result.error}")
             results.append(
                 f"<begin_file file_path={file_path}>\n"
-                f"ERROR: Could not read file - {error_msg}\n"
+                f"ERROR: Could not read file - {read_result.error}\n"
                 f"<end_file>"
             )
             continue
 
-        # Extract total line count from end of output
-        total_lines = len(out.split('\n'))
-        out_with_line_numbers = add_line_numbers_to_script(out)
+        out_with_line_numbers = add_line_numbers_to_script(read_result.content)
 
-        if total_lines > 5000:
-            await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Read file {file_path} (truncated: showing first 5000 of {total_lines} lines)", "result")
+        if read_result.total_lines > 5000:
+            log_lines.append(f"{file_path} (truncated: showing first 5000 of {read_result.total_lines} lines)")
             results.append(
-                f"<begin_file file_path={file_path}>\n\n{out_with_line_numbers}\n\n[TRUNCATED: Showing first 5000 of {total_lines} lines]\n\n<end_file>"
+                f"<begin_file file_path={file_path}>\n\n{out_with_line_numbers}\n\n[TRUNCATED: Showing first 5000 of {read_result.total_lines} lines]\n\n<end_file>"
             )
         else:
-            await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Read file {file_path} ({total_lines} lines)", "result")
+            log_lines.append(f"{file_path} ({read_result.total_lines} lines)")
             results.append(
                 f"<begin_file file_path={file_path}>\n\n{out_with_line_numbers}\n\n<end_file>"
             )
 
     separator = "\n\n" + "=" * 80 + "\n\n"
     result = separator.join(results)
-    await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Successfully read {len(file_paths)} file(s)", "result")
+    await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Read {len(file_paths)} file(s):\n" + "\n".join(log_lines), "result")
     return result
 
 
+async def read_output_tool(ctx: RunContext[AgentDeps], path: str, offset: int = 0, length: int = 20000) -> str:
+    """
+    Read part of the full output of a command whose output was truncated, the truncation message gives the path.
+
+    Args:
+        ctx: The run context.
+        path: The path of the full output, from the truncation message.
+        offset: The byte to start reading from, the middle of the output starts where the shown head ends.
+        length: The number of bytes to read.
+
+    Returns:
+        The bytes read, and the offset to continue from.
+    """
+    await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Reading output {path} from byte {offset:,}", "tool_call")
+    try:
+        page = await ctx.deps.sandbox.read_output(path, offset, length)
+    except RuntimeError as e:
+        await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Error reading output: {e}", "error")
+        raise ModelRetry(f"Could not read output: {e}. Outputs are only kept for the most recent commands.")
+
+    await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Read bytes {offset:,} to {page.next_offset:,} of {page.size:,} of output {path}", "result")
+    if page.next_offset >= page.size:
+        return f"{page.content}\n\n[End of output, {page.size:,} bytes]"
+    return f"{page.content}\n\n[Showing bytes {offset:,} to {page.next_offset:,} of {page.size:,}, continue from offset {page.next_offset}]"
+
+
 async def ls_tool(ctx: RunContext[AgentDeps], paths: list[str] = ["/app"]) -> str:
     if not paths:
         raise ModelRetry("No paths provided")
@@ -109,6 +141,7 @@ async def ls_tool(ctx: RunContext[AgentDeps], paths: list[str] = ["/app"]) -> st
 navigation_toolset = FunctionToolset(
     tools=[
         read_files_tool,
+        read_output_tool,
         # ls is broken since it uses the internal cwd in modal and not the docker one
         # ls_tool
     ],
@@ -1,8 +1,11 @@
 from pathlib import Path
+from typing import Callable
 from pydantic_ai import RunContext, ModelRetry, FunctionToolset
 
+from kvasir_agents.sandbox.line_patch import LinePatchOperation, LinePatchResult
 from kvasir_agents.utils.code_utils import (
     add_line_numbers_to_script,
+    add_line_numbers_to_lines,
     replace_lines_in_script,
     add_lines_to_script_at_line,
     delete_lines_from_script
@@ -65,7 +68,7 @@ async def replace_script_lines(
         reasoning: The concise reasoning for why you are calling this tool.
 
     Returns:
-        str: The updated script.
+        str: The lines around the edit in the updated script, with line numbers.
     """
     await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Replacing lines {line_number_start}-{line_number_end} in {file_path} ({len(new_code)} characters)", "tool_call")
 
@@ -73,28 +76,14 @@ async def replace_script_lines(
         raise ModelRetry(
             f"File {file_path} is not writable. It is in a read-only path. Read-only paths: {', '.join(ctx.deps.read_only_paths)}")
 
-    if not await ctx.deps.sandbox.check_file_exists(file_path):
-        raise ModelRetry(
-            f"File {file_path} does not exist. To create a new file, call the write_file tool.")
-
-    old_content = await ctx.deps.sandbox.read_file(file_path)
-
-    updated_content = replace_lines_in_script(
-        old_content,
-        line_number_start,
-        line_number_end,
-        new_code,
-        script_has_line_numbers=False
+    patch_result = await _patch_script(
+        ctx, file_path, "replace", line_number_start, line_number_end, new_code,
+        missing_file_message=f"File {file_path} does not exist. To create a new file, call the write_file tool.",
+        apply_to_cached_content=lambda content: replace_lines_in_script(
+            content, line_number_start, line_number_end, new_code, script_has_line_numbers=False)
     )
 
-    await ctx.deps.sandbox.write_file(file_path, updated_content)
-
-    # Track the modified file
-    ctx.deps.modified_files[file_path] = updated_content
-
-    updated_content_with_line_numbers = add_line_numbers_to_script(
-        updated_content)
-    out = f"UPDATED FILE: {file_path}\n\n <file path={file_path}>\n\n {updated_content_with_line_numbers}\n\n </file>"
+    out = f"UPDATED FILE: {file_path}\n\n{_format_patch_excerpt(file_path, patch_result)}"
     out += "\n\nThe file is not automatically run and validated, you must call the final_result tool to submit the file for validation and feedback.\n"
 
     await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Replaced lines {line_number_start}-{line_number_end} in {file_path}", "result")
@@ -113,7 +102,7 @@ async def add_script_lines(ctx: RunContext[SWEDeps], file_path: str, new_code: s
         start_line: The line number to add the lines at. This line number is inclusive.
 
     Returns:
-        str: The updated script.
+        str: The lines around the edit in the updated script, with line numbers.
     """
     await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Adding lines at line {start_line} in {file_path} ({len(new_code)} characters)", "tool_call")
 
@@ -121,26 +110,14 @@ async def add_script_lines(ctx: RunContext[SWEDeps], file_path: str, new_code: s
         raise ModelRetry(
             f"File {file_path} is not writable. It is in a read-only path. Read-only paths: {', '.join(ctx.deps.read_only_paths)}")
 
-    if not await ctx.deps.sandbox.check_file_exists(file_path):
-        raise ModelRetry(
-            f"Script {file_path} does not exist. To create a new script, call the write_file tool.")
-
-    old_content = await ctx.deps.sandbox.read_file(file_path)
-
-    updated_content = add_lines_to_script_at_line(
-        old_content,
-        new_code,
-        start_line,
-        script_has_line_numbers=False
+    patch_result = await _patch_script(
+        ctx, file_path, "insert", start_line, start_line, new_code,
+        missing_file_message=f"Script {file_path} does not exist. To create a new script, call the write_file tool.",
+        apply_to_cached_content=lambda content: add_lines_to_script_at_line(
+            content, new_code, start_line, script_has_line_numbers=False)
     )
 
-    await ctx.deps.sandbox.write_file(file_path, updated_content)
-
-    # Track the modified file
-    ctx.deps.modified_files[file_path] = updated_content
-
-    script_with_line_numbers = add_line_numbers_to_script(updated_content)
-    out = f"UPDATED SCRIPT: \n\n <file path={file_path}>\n\n {script_with_line_numbers}\n\n </file>"
+    out = f"UPDATED SCRIPT: \n\n{_format_patch_excerpt(file_path, patch_result)}"
     out += "\n\nThe script is not automatically run and validated, you must call the final_result tool to submit the script for validation and feedback."
 
     await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Added lines at line {start_line} in {file_path}", "result")
@@ -159,7 +136,7 @@ async def delete_script_lines(ctx: RunContext[SWEDeps], file_path: str, line_num
         line_number_end: The end line number of the code to delete. This line number is inclusive.
 
     Returns:    
-        str: The updated script.
+        str: The lines around the edit in the updated script, with line numbers.
     """
     await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Deleting lines {line_number_start}-{line_number_end} from {file_path}", "tool_call")
 
@@ -167,26 +144,14 @@ async def delete_script_lines(ctx: RunContext[SWEDeps], file_path: str, line_num
         raise ModelRetry(
             f"File {file_path} is not writable. It is in a read-only path. Read-only paths: {', '.join(ctx.deps.read_only_paths)}")
 
-    if not await ctx.deps.sandbox.check_file_exists(file_path):
-        raise ModelRetry(
-            f"File {file_path} does not exist. To create a new file, call the write_file tool.")
-
-    old_content = await ctx.deps.sandbox.read_file(file_path)
-
-    updated_content = delete_lines_from_script(
-        old_content,
-        line_number_start,
-        line_number_end,
-        script_has_line_numbers=False
+    patch_result = await _patch_script(
+        ctx, file_path, "delete", line_number_start, line_number_end,
+        missing_file_message=f"File {file_path} does not exist. To create a new file, call the write_file tool.",
+        apply_to_cached_content=lambda content: delete_lines_from_script(
+            content, line_number_start, line_number_end, script_has_line_numbers=False)
     )
 
-    await ctx.deps.sandbox.write_file(file_path, updated_content)
-
-    # Track the modified file
-    ctx.deps.modified_files[file_path] = updated_content
-
-    script_with_line_numbers = add_line_numbers_to_script(updated_content)
-    out = f"UPDATED SCRIPT: \n\n <file path={file_path}>\n\n {script_with_line_numbers}\n\n </file>"
+    out = f"UPDATED SCRIPT: \n\n{_format_patch_excerpt(file_path, patch_result)}"
     out += "\n\nThe script is not automatically run and validated, you must call the final_result tool to submit the script for validation and feedback."
 
     await ctx.deps.callbacks.log(ctx.deps.user_id, ctx.deps.run_id, f"Deleted lines {line_number_start}-{line_number_end} from {file_path}", "result")
@@ -250,3 +215,51 @@ def _validate_path_permissions(ctx: RunContext[SWEDeps], path: str | Path) -> bo
             return False
 
     return True
+
+
+async def _patch_script(
+    ctx: RunContext[SWEDeps],
+    file_path: str,
+    operation: LinePatchOperation,
+    line_number_start: int,
+    line_number_end: int,
+    new_code: str = "",
+    *,
+    apply_to_cached_content: Callable[[str], str],
+    missing_file_message: str = ""
+) -> LinePatchResult:
+    # The edit is applied inside the sandbox. The file's content is tracked in modified_files, so after the first
+    # edit the same edit is applied to the tracked content instead of reading the file back.
+    cached_content = ctx.deps.modified_files.get(file_path)
+    try:
+        patch_result = await ctx.deps.sandbox.patch_lines(
+            file_path,
+            operation,
+            line_number_start,
+            line_number_end,
+            new_code,
+            expected_content=cached_content
+        )
+    except RuntimeError:
+        if not await ctx.deps.sandbox.check_file_exists(file_path):
+            raise ModelRetry(missing_file_message)
+        raise
+
+    # Track the modified file
+    if patch_result.content is not None:
+        ctx.deps.modified_files[file_path] = patch_result.content
+    else:
+        ctx.deps.modified_files[file_path] = apply_to_cached_content(
+            cached_content)
+
+    return patch_result
+
+
+def _format_patch_excerpt(file_path: str, patch_result: LinePatchResult) -> str:
+    excerpt_end = patch_result.excerpt_start + len(patch_result.excerpt) - 1
+    excerpt_with_line_numbers = add_line_numbers_to_lines(
+        patch_result.excerpt, patch_result.excerpt_start)
+    return (
+        f"<file path={file_path} lines={patch_result.excerpt_start}-{excerpt_end} total_lines={patch_result.total_lines}>\n\n"
+        f"{excerpt_with_line_numbers}\n\n</file>"
+    )
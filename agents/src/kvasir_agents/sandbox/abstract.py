@@ -1,9 +1,24 @@
+import posixpath
 from uuid import UUID
 from pathlib import Path
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator, Tuple, Optional, Any
+from typing import AsyncGenerator, Dict, List, Tuple, Optional, Any
 
 from kvasir_agents.app_secrets import CODEBASE_DIR, SANDBOX_PYPROJECT_PATH
+from kvasir_agents.sandbox.kernel import PythonKernel
+from kvasir_agents.sandbox.file_index import FileSnapshot, create_file_index_code, apply_file_index_output
+from kvasir_agents.sandbox.file_reader import FileReadResult, create_read_files_code, parse_read_files_output
+from kvasir_agents.sandbox.line_patch import LinePatchOperation, LinePatchResult, create_line_patch_code, parse_line_patch_output
+from kvasir_agents.sandbox.output_spool import OutputPage, create_read_output_code, parse_read_output_output
+from kvasir_agents.sandbox.scheduler import ExecLimits, SandboxScheduler, get_sandbox_scheduler
+
+
+# Files are read from the sandbox in chunks of at most this size
+FILE_STREAM_CHUNK_SIZE = 1024 * 1024
+
+# The last file snapshot of each (project, directory, depth), the next one is only sent as a diff against it
+MAX_FILE_SNAPSHOTS = 256
+_file_snapshots: Dict[Tuple[UUID, str, int], FileSnapshot] = {}
 
 
 def create_empty_project_package_local(project_id: UUID, package_name: str) -> Path:
@@ -44,21 +59,57 @@ class AbstractSandbox(ABC):
     async def delete_container_if_exists(self):
         pass
 
-    @abstractmethod
     async def run_python_code(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None) -> Tuple[str, str]:
-        """Returns (stdout, stderr)."""
+        """
+        Returns (stdout, stderr).
+        When truncating, the output is spooled to a file in the sandbox and only its head and tail are returned,
+        with the file's path in the truncation message so the rest can be paged with read_output.
+        Waits for a slot in the sandbox's scheduler, the timeout only starts once the code runs.
+        """
+        async with self.scheduler.slot() as limits:
+            return await self._run_python_code(code, truncate_output, max_output_length, timeout, limits)
+
+    @abstractmethod
+    async def _run_python_code(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None, limits: Optional[ExecLimits] = None) -> Tuple[str, str]:
+        """Runs the code right away, internal operations use it directly so they don't queue behind user code."""
         pass
 
     @abstractmethod
-    async def run_shell_code(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None) -> Tuple[str, str]:
-        """Returns (stdout, stderr)."""
+    def create_python_kernel(self) -> PythonKernel:
+        """Returns a kernel that keeps its state between code cells, its process is started on first use."""
         pass
 
+    async def run_shell_code(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None) -> Tuple[str, str]:
+        """Returns (stdout, stderr), truncated and scheduled the same way as run_python_code."""
+        async with self.scheduler.slot() as limits:
+            return await self._run_shell_code(code, truncate_output, max_output_length, timeout, limits)
+
     @abstractmethod
+    async def _run_shell_code(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None, limits: Optional[ExecLimits] = None) -> Tuple[str, str]:
+        pass
+
+    async def read_output(self, path: str, offset: int = 0, length: int = 20000) -> OutputPage:
+        """Reads length bytes from offset of an output spooled by a truncated run_python_code or run_shell_code."""
+        out, err = await self._run_python_code(create_read_output_code(path, offset, length), truncate_output=False)
+        if err:
+            raise RuntimeError(f"Failed to read output {path}: {err}")
+
+        return parse_read_output_output(path, out)
+
     async def run_shell_code_streaming(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None) -> AsyncGenerator[Tuple[str, str], None]:
-        """Yields (stream_type, content) tuples."""
+        """Yields (stream_type, content) tuples, holding a slot in the sandbox's scheduler until the command is done."""
+        async with self.scheduler.slot() as limits:
+            async for item in self._run_shell_code_streaming(code, truncate_output, max_output_length, timeout, limits):
+                yield item
+
+    @abstractmethod
+    async def _run_shell_code_streaming(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None, limits: Optional[ExecLimits] = None) -> AsyncGenerator[Tuple[str, str], None]:
         pass
 
+    @property
+    def scheduler(self) -> SandboxScheduler:
+        return get_sandbox_scheduler(self.project_id)
+
     @abstractmethod
     async def read_file(self, path: str, truncate: bool = True, max_output_length: int = 20000) -> str:
         pass
@@ -67,6 +118,57 @@ class AbstractSandbox(ABC):
     async def write_file(self, path: str, content: str):
         pass
 
+    @abstractmethod
+    async def open_stream(self, path: str, chunk_size: int = FILE_STREAM_CHUNK_SIZE) -> AsyncGenerator[bytes, None]:
+        """Yields the file's content in chunks of at most chunk_size bytes."""
+        pass
+
+    @abstractmethod
+    async def write_bytes(self, path: str, content: bytes) -> None:
+        """Writes the file as is, creating its parent directories."""
+        pass
+
+    async def read_bytes(self, path: str) -> bytes:
+        return b"".join([chunk async for chunk in self.open_stream(path)])
+
+    async def read_files(self, paths: List[str], max_lines: int = 5000) -> List[FileReadResult]:
+        """
+        Reads the first max_lines lines of each file and counts all their lines, in one call to the sandbox.
+        Returns a result per path, in order, with the error for files that could not be read.
+        """
+        if not paths:
+            return []
+
+        out, err = await self._run_python_code(create_read_files_code(paths, max_lines), truncate_output=False)
+        if err:
+            raise RuntimeError(f"Failed to read files: {err}")
+
+        return parse_read_files_output(out)
+
+    async def patch_lines(
+        self,
+        path: str,
+        operation: LinePatchOperation,
+        line_number_start: int,
+        line_number_end: int,
+        new_code: str = "",
+        expected_content: Optional[str] = None,
+        context_lines: int = 20
+    ) -> LinePatchResult:
+        """
+        Replaces, inserts or deletes a line range in the file inside the sandbox, without moving the file across.
+        The new content only comes back if the file's content before the edit was not expected_content.
+        """
+        out, err = await self._run_python_code(
+            create_line_patch_code(path, operation, line_number_start,
+                                   line_number_end, new_code, expected_content, context_lines),
+            truncate_output=False
+        )
+        if err:
+            raise RuntimeError(f"Failed to edit file {path}: {err}")
+
+        return parse_line_patch_output(path, out)
+
     @abstractmethod
     async def delete_file(self, path: str):
         """Deletes file or directory."""
@@ -91,10 +193,49 @@ class AbstractSandbox(ABC):
         """Returns (stdout, stderr)."""
         pass
 
-    @abstractmethod
+    async def snapshot_files(self, path: Optional[str] = None, n_levels: int = 5, since: Optional[FileSnapshot] = None) -> FileSnapshot:
+        """
+        Index the files under path (the working directory by default) in one pass in the sandbox.
+        Only the changes since the given snapshot are transferred, or since the last snapshot of the same directory
+        taken in this process if none is given.
+        """
+        root = path or "."
+        key = (self.project_id, root, n_levels)
+        if since is None:
+            since = _file_snapshots.pop(key, None)
+
+        out, err = await self._run_python_code(create_file_index_code(root, n_levels, since), truncate_output=False)
+        if err:
+            raise RuntimeError(f"Failed to index files: {err}")
+
+        snapshot = apply_file_index_output(root, n_levels, since, out)
+        _file_snapshots[key] = snapshot
+        while len(_file_snapshots) > MAX_FILE_SNAPSHOTS:
+            del _file_snapshots[next(iter(_file_snapshots))]
+
+        return snapshot
+
     async def get_folder_structure(self, path: Optional[str] = None, n_levels: int = 5, max_lines: int = 100) -> str:
         """Get folder structure description. Returns formatted string."""
-        pass
+        try:
+            snapshot = await self.snapshot_files(path, n_levels)
+        except RuntimeError as e:
+            return f"folder structure {n_levels} levels down:\n\nError: {e}"
+
+        leaf_paths = snapshot.get_leaf_paths()
+        if not leaf_paths:
+            return f"folder structure {n_levels} levels down:\n\n(empty or does not exist)"
+
+        if len(leaf_paths) > max_lines:
+            result = '\n'.join(leaf_paths[:max_lines])
+            return f"folder structure {n_levels} levels down:\n\n{result}\n\n[truncated - output exceeded {max_lines} lines]"
+
+        result = '\n'.join(leaf_paths)
+        return f"folder structure {n_levels} levels down:\n\n{result}"
+
+    def get_absolute_path(self, path: str) -> str:
+        # Relative paths are relative to the working directory, as they are for the shell commands
+        return posixpath.normpath(posixpath.join(self.workdir, path))
 
     def is_subpath(self, child: Path, parent: Path) -> bool:
         try:
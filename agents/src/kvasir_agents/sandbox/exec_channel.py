@@ -0,0 +1,218 @@
+import json
+import asyncio
+import itertools
+from typing import Dict, List, NamedTuple, Optional
+
+
+# Runs inside the container. Each request line starts a command in its own thread and process group, replies
+# are written as the commands finish so they can come back out of order, matched to their request by id.
+EXEC_SERVER_CODE = '''
+import os
+import json
+import signal
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+requests = os.fdopen(os.dup(0), "r")
+replies = os.fdopen(os.dup(1), "w")
+devnull = os.open(os.devnull, os.O_RDWR)
+os.dup2(devnull, 0)
+os.dup2(devnull, 1)
+
+reply_lock = threading.Lock()
+processes = {}
+processes_lock = threading.Lock()
+
+
+def reply(message):
+    with reply_lock:
+        replies.write(json.dumps(message) + "\\n")
+        replies.flush()
+
+
+def kill(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def run(request):
+    stdin = request["stdin"].encode("utf-8") if request["stdin"] is not None else None
+    try:
+        process = subprocess.Popen(
+            request["args"],
+            cwd=request["cwd"],
+            stdin=subprocess.PIPE if stdin is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True
+        )
+    except OSError as e:
+        reply({"id": request["id"], "stdout": "", "stderr": str(e), "returncode": 127, "timed_out": False})
+        return
+
+    with processes_lock:
+        processes[request["id"]] = process
+
+    timed_out = False
+    try:
+        stdout, stderr = process.communicate(stdin, timeout=request["timeout"])
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        kill(process)
+        stdout, stderr = process.communicate()
+    finally:
+        with processes_lock:
+            processes.pop(request["id"], None)
+
+    reply({
+        "id": request["id"],
+        "stdout": stdout.decode("utf-8", "replace"),
+        "stderr": stderr.decode("utf-8", "replace"),
+        "returncode": process.returncode,
+        "timed_out": timed_out
+    })
+
+
+executor = ThreadPoolExecutor(max_workers=64)
+
+for line in requests:
+    request = json.loads(line)
+    if request["op"] == "cancel":
+        with processes_lock:
+            process = processes.get(request["id"])
+        if process is not None:
+            kill(process)
+    else:
+        executor.submit(run, request)
+'''
+
+
+# Replies carry a command's whole output on one line
+EXEC_CHANNEL_STREAM_LIMIT = 256 * 1024 * 1024
+
+
+class ExecResult(NamedTuple):
+    stdout: str
+    stderr: str
+    returncode: int
+    timed_out: bool
+
+
+class ExecChannel:
+    """
+    A long-lived process in a container that runs commands for the sandbox, so a command costs a fork in the
+    container instead of a docker exec. Concurrent commands are multiplexed over its stdin and stdout by request id.
+    The process is started on first use and restarted on the next command if it exits, e.g. when the container does.
+    """
+
+    def __init__(self, container_name: str):
+        self.container_name = container_name
+        # The process and its pipes belong to the loop the channel is created on
+        self.loop = asyncio.get_running_loop()
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.request_ids = itertools.count()
+        self._reader_task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+
+    async def exec(
+        self,
+        args: List[str],
+        cwd: Optional[str] = None,
+        stdin: Optional[str] = None,
+        timeout: float | None = None
+    ) -> ExecResult:
+        await self._ensure_started()
+
+        process, pending = self.process, self.pending
+        request_id = next(self.request_ids)
+        future = asyncio.get_running_loop().create_future()
+        pending[request_id] = future
+
+        try:
+            await self._send(process, {
+                "id": request_id,
+                "op": "exec",
+                "args": args,
+                "cwd": cwd,
+                "stdin": stdin,
+                "timeout": timeout
+            })
+            return await future
+        except asyncio.CancelledError:
+            # Don't leave the command running in the container when the caller gives up on it
+            if process.returncode is None:
+                await self._send(process, {"id": request_id, "op": "cancel"})
+            raise
+        finally:
+            pending.pop(request_id, None)
+
+    async def close(self) -> None:
+        if self.process is None:
+            return
+
+        process, self.process = self.process, None
+        if process.returncode is None:
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5.0)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+
+        if self._reader_task is not None:
+            await self._reader_task
+
+    async def _ensure_started(self) -> None:
+        async with self._start_lock:
+            if self.process is not None and self.process.returncode is None:
+                return
+
+            self.process = await asyncio.create_subprocess_exec(
+                "docker", "exec", "-i", self.container_name,
+                "python", "-u", "-c", EXEC_SERVER_CODE,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                limit=EXEC_CHANNEL_STREAM_LIMIT
+            )
+            # Requests still waiting on a previous process are failed by that process' reader
+            self.pending = {}
+            self._reader_task = asyncio.create_task(
+                self._read_replies(self.process, self.pending))
+
+    async def _send(self, process: asyncio.subprocess.Process, message: dict) -> None:
+        process.stdin.write(f"{json.dumps(message)}\n".encode("utf-8"))
+        await process.stdin.drain()
+
+    async def _read_replies(self, process: asyncio.subprocess.Process, pending: Dict[int, asyncio.Future]) -> None:
+        error: Optional[Exception] = None
+        try:
+            while True:
+                line = await process.stdout.readline()
+                if not line:
+                    break
+
+                reply = json.loads(line)
+                future = pending.get(reply.pop("id"))
+                if future is not None and not future.done():
+                    future.set_result(ExecResult(**reply))
+        except Exception as e:
+            # E.g. a reply over the stream limit or a malformed line, the replies after it can't be matched up
+            error = e
+        finally:
+            # Killed so the next command starts a new process, rather than waiting on this one's replies
+            if process.returncode is None:
+                process.kill()
+            await process.wait()
+            for future in pending.values():
+                if not future.done():
+                    if error is not None:
+                        future.set_exception(RuntimeError(
+                            f"Exec channel to container {self.container_name} failed to read a reply: {error}"))
+                    else:
+                        future.set_exception(RuntimeError(
+                            f"Exec channel to container {self.container_name} exited with code {process.returncode}"))
@@ -0,0 +1,137 @@
+import json
+import posixpath
+from typing import Dict, List, NamedTuple, Optional
+
+
+# Runs inside the sandbox. Walks the directory once, keeps the snapshot in the sandbox under a new token and prints
+# only what changed since the snapshot of the requested token, or everything if that snapshot is not there anymore.
+FILE_INDEX_CODE = '''
+import os
+import json
+import uuid
+
+SNAPSHOT_DIR = "/tmp/kvasir-file-index"
+MAX_SNAPSHOTS = 16
+PRUNED_SUFFIXES = (".egg-info",)
+PRUNED_NAMES = ("__pycache__",)
+
+
+def walk(root, n_levels):
+    entries = {}
+    stack = [("", 1)]
+    while stack:
+        relative_dir, depth = stack.pop()
+        try:
+            scanner = os.scandir(os.path.join(root, relative_dir))
+        except OSError:
+            continue
+        with scanner:
+            for entry in scanner:
+                if entry.name in PRUNED_NAMES or entry.name.endswith(PRUNED_SUFFIXES):
+                    continue
+                relative_path = os.path.join(relative_dir, entry.name)
+                try:
+                    is_dir = entry.is_dir()
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries[relative_path] = [is_dir, stat.st_mtime, 0 if is_dir else stat.st_size]
+                if is_dir and depth < n_levels:
+                    stack.append((relative_path, depth + 1))
+    return entries
+
+
+def main(request):
+    root, n_levels, since = request["root"], request["n_levels"], request["since"]
+    if not os.path.isdir(root):
+        print(json.dumps({"token": None, "base": None, "changed": {}, "removed": []}))
+        return
+
+    entries = walk(root, n_levels)
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    previous = None
+    if since is not None:
+        try:
+            with open(os.path.join(SNAPSHOT_DIR, os.path.basename(since))) as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = None
+
+    token = uuid.uuid4().hex
+    with open(os.path.join(SNAPSHOT_DIR, token), "w") as f:
+        json.dump(entries, f)
+
+    # Other indexing runs may be removing old snapshots at the same time
+    snapshots = []
+    for snapshot in os.scandir(SNAPSHOT_DIR):
+        try:
+            snapshots.append((snapshot.stat().st_mtime, snapshot.path))
+        except OSError:
+            pass
+    for _, snapshot_path in sorted(snapshots, reverse=True)[MAX_SNAPSHOTS:]:
+        try:
+            os.remove(snapshot_path)
+        except OSError:
+            pass
+
+    if previous is None:
+        print(json.dumps({"token": token, "base": None, "changed": entries, "removed": []}))
+        return
+
+    changed = {path: entry for path, entry in entries.items() if previous.get(path) != entry}
+    removed = [path for path in previous if path not in entries]
+    print(json.dumps({"token": token, "base": since, "changed": changed, "removed": removed}))
+'''
+
+
+class FileEntry(NamedTuple):
+    is_dir: bool
+    mtime: float
+    size: int
+
+
+class FileSnapshot:
+    """
+    The files and directories under a root, down to n_levels levels, by their path relative to the root.
+    The token names the snapshot in the sandbox, so the next one can be sent as a diff against it.
+    """
+
+    def __init__(self, root: str, n_levels: int, token: Optional[str], entries: Dict[str, FileEntry]):
+        self.root = root
+        self.n_levels = n_levels
+        self.token = token
+        self.entries = entries
+
+    def get_leaf_paths(self) -> List[str]:
+        """Files and empty directories, sorted, with the root prefixed like find prints them."""
+        has_children = {posixpath.dirname(path) for path in self.entries}
+        return [
+            posixpath.join(self.root, path)
+            for path in sorted(self.entries)
+            if not (self.entries[path].is_dir and path in has_children)
+        ]
+
+
+def create_file_index_code(root: str, n_levels: int, since: Optional[FileSnapshot]) -> str:
+    request = {
+        "root": root,
+        "n_levels": n_levels,
+        "since": since.token if since is not None and since.root == root and since.n_levels == n_levels else None
+    }
+    # run_python_code treats ``` as the start of a markdown code block, so backticks are sent escaped
+    request_json = json.dumps(request).replace("`", "\\u0060")
+    return f"{FILE_INDEX_CODE}\nmain(json.loads({json.dumps(request_json)}))"
+
+
+def apply_file_index_output(root: str, n_levels: int, since: Optional[FileSnapshot], output: str) -> FileSnapshot:
+    reply = json.loads(output)
+    changed = {path: FileEntry(*entry) for path, entry in reply["changed"].items()}
+
+    if reply["base"] is None:
+        return FileSnapshot(root, n_levels, reply["token"], changed)
+
+    entries = {**since.entries, **changed}
+    for path in reply["removed"]:
+        entries.pop(path, None)
+    return FileSnapshot(root, n_levels, reply["token"], entries)
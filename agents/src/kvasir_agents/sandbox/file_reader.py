@@ -0,0 +1,40 @@
+import json
+from typing import List, NamedTuple, Optional
+
+
+# Runs inside the sandbox. Reads the first lines of every requested file and counts the rest without keeping them,
+# printing one JSON list with a result per path.
+READ_FILES_CODE = '''
+import json
+from itertools import islice
+
+
+def main(request):
+    results = []
+    for path in request["paths"]:
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                lines = list(islice(f, request["max_lines"]))
+                total_lines = len(lines) + sum(1 for _ in f)
+            results.append({"content": "".join(lines), "total_lines": total_lines, "error": None})
+        except OSError as e:
+            results.append({"content": "", "total_lines": 0, "error": e.strerror or str(e)})
+    print(json.dumps(results))
+'''
+
+
+class FileReadResult(NamedTuple):
+    content: str
+    total_lines: int
+    error: Optional[str]
+
+
+def create_read_files_code(paths: List[str], max_lines: int) -> str:
+    request = {"paths": paths, "max_lines": max_lines}
+    # run_python_code treats ``` as the start of a markdown code block, so backticks are sent escaped
+    request_json = json.dumps(request).replace("`", "\\u0060")
+    return f"{READ_FILES_CODE}\nmain(json.loads({json.dumps(request_json)}))"
+
+
+def parse_read_files_output(output: str) -> List[FileReadResult]:
+    return [FileReadResult(**result) for result in json.loads(output)]
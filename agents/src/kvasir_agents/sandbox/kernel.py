@@ -0,0 +1,159 @@
+import json
+import asyncio
+import contextlib
+from abc import ABC, abstractmethod
+from typing import AsyncContextManager, List, Optional, Tuple
+
+from kvasir_agents.sandbox.scheduler import SandboxScheduler
+from kvasir_agents.utils.code_utils import parse_code, remove_print_statements_from_code
+
+
+# Runs inside the sandbox. Requests and replies are single JSON lines on the process' own stdin and stdout,
+# the code cells get fresh stdout/stderr buffers and fd 0/1 are pointed at /dev/null so nothing they do can
+# interleave with the protocol.
+KERNEL_SERVER_CODE = '''
+import io
+import os
+import sys
+import json
+import traceback
+import contextlib
+
+requests = os.fdopen(os.dup(0), "r")
+replies = os.fdopen(os.dup(1), "w")
+devnull = os.open(os.devnull, os.O_RDWR)
+os.dup2(devnull, 0)
+os.dup2(devnull, 1)
+sys.stdin = open(os.devnull, "r")
+
+replies.write(json.dumps({"pid": os.getpid()}) + "\\n")
+replies.flush()
+
+namespace = {"__name__": "__main__"}
+
+for line in requests:
+    request = json.loads(line)
+    stdout, stderr = io.StringIO(), io.StringIO()
+    error = False
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            exec(compile(request["code"], "<cell>", "exec"), namespace)
+        except BaseException as e:
+            error = True
+            # Leave the kernel's own frame out of the traceback
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+    replies.write(json.dumps({"stdout": stdout.getvalue(), "stderr": stderr.getvalue(), "error": error}) + "\\n")
+    replies.flush()
+'''
+
+
+class PythonKernel(ABC):
+    """
+    A long-lived Python process in the sandbox where each code cell runs against the state left by the previous ones.
+    The process is started on first use and restarted, replaying the previous cells, whenever its state no longer
+    comes from exactly those cells (a cell was edited, deleted or failed, or the process died).
+    """
+
+    def __init__(self, scheduler: Optional[SandboxScheduler] = None):
+        # Each cell takes a slot in the sandbox's scheduler while it runs
+        self.scheduler = scheduler
+        # The cells whose state the process holds, None if there is no process or its state is unknown
+        self.executed_cells: Optional[List[str]] = None
+        # The kernel's pid inside the sandbox, killing it there is the only way to stop a cell that hangs
+        self.pid: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    @abstractmethod
+    async def _start_process(self) -> None:
+        pass
+
+    @abstractmethod
+    async def _stop_process(self) -> None:
+        """Kills the kernel by its pid if it has one, and cleans up the process running it."""
+        pass
+
+    @abstractmethod
+    async def _send(self, line: str) -> None:
+        pass
+
+    @abstractmethod
+    async def _receive(self) -> Optional[str]:
+        """Returns the next reply line, or None if the process exited."""
+        pass
+
+    async def run_cell(
+        self,
+        code: str,
+        previous_cells: List[str],
+        truncate_output: bool = True,
+        max_output_length: int = 20000,
+        timeout: int | None = None
+    ) -> Tuple[str, str]:
+        """Returns (stdout, stderr) of the cell, stderr is empty unless it raised."""
+        async with self._lock, self._slot():
+            try:
+                async with asyncio.timeout(timeout):
+                    if self.executed_cells != previous_cells:
+                        await self._replay(previous_cells)
+                    out_str, err_str = await self._execute(code)
+            except asyncio.TimeoutError:
+                await self._shutdown()
+                return "", f"Process exceeded timeout of {timeout}s and was terminated"
+            except _KernelCellError as e:
+                return "", f"Error re-running previous cells in a new Python kernel: {e}"
+
+        if truncate_output and len(out_str) > max_output_length:
+            keep_chars = max_output_length // 2
+            truncation_msg = f"\n\n... [Output truncated: removed {len(out_str) - max_output_length:,} characters from middle, showing {max_output_length:,} of {len(out_str):,} total] ...\n\n"
+            out_str = out_str[:keep_chars] + \
+                truncation_msg + out_str[-keep_chars:]
+
+        return out_str, err_str
+
+    def _slot(self) -> AsyncContextManager:
+        return self.scheduler.slot() if self.scheduler is not None else contextlib.nullcontext()
+
+    async def shutdown(self) -> None:
+        async with self._lock:
+            await self._shutdown()
+
+    async def _replay(self, cells: List[str]) -> None:
+        await self._shutdown()
+        await self._start_process()
+        ready = await self._receive()
+        if ready is None:
+            await self._shutdown()
+            raise _KernelCellError("Python kernel failed to start")
+
+        self.pid = json.loads(ready)["pid"]
+        self.executed_cells = []
+        for cell in cells:
+            # The outputs are discarded, so skip printing them
+            _, err = await self._execute(cell, remove_print_statements_from_code(cell))
+            if err:
+                raise _KernelCellError(err)
+
+    async def _execute(self, cell: str, code: Optional[str] = None) -> Tuple[str, str]:
+        await self._send(json.dumps({"code": parse_code(code if code is not None else cell)}))
+        reply = await self._receive()
+        if reply is None:
+            await self._shutdown()
+            return "", "Python kernel exited unexpectedly, its state has been lost"
+
+        reply = json.loads(reply)
+        if reply["error"]:
+            # The cell may have run partway, so the state no longer matches any list of cells
+            self.executed_cells = None
+            return reply["stdout"], reply["stderr"]
+
+        self.executed_cells.append(cell)
+        return reply["stdout"], ""
+
+    async def _shutdown(self) -> None:
+        self.executed_cells = None
+        await self._stop_process()
+        self.pid = None
+
+
+class _KernelCellError(Exception):
+    pass
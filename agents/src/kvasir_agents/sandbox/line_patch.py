@@ -0,0 +1,102 @@
+import json
+import hashlib
+from typing import List, Literal, NamedTuple, Optional
+
+
+LinePatchOperation = Literal["replace", "insert", "delete"]
+
+
+# Runs inside the sandbox. Edits a line range of a file in place, the same way as the script editing functions in
+# code_utils, and prints the lines around the edit. The whole new content is only sent back when the file did not
+# have the content the caller expected, e.g. the first time the caller edits it.
+LINE_PATCH_CODE = '''
+import json
+import hashlib
+
+
+def main(request):
+    path = request["path"]
+    try:
+        with open(path, encoding="utf-8") as f:
+            script = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        print(json.dumps({"error": getattr(e, "strerror", None) or str(e)}))
+        return
+
+    current_sha256 = hashlib.sha256(script.encode("utf-8")).hexdigest()
+    lines = script.strip().splitlines()
+    new_lines = request["new_code"].splitlines()
+    start, end = request["line_number_start"], request["line_number_end"]
+
+    if request["operation"] == "replace":
+        edit_start = max(0, min(start - 1, len(lines)))
+        lines[start - 1:end] = new_lines
+        edit_length = len(new_lines)
+    elif request["operation"] == "insert":
+        edit_start = max(0, min(start - 1, len(lines)))
+        lines[edit_start:edit_start] = new_lines
+        edit_length = len(new_lines)
+    else:
+        edit_start = max(0, min(start - 1, len(lines) - 1))
+        edit_end = max(edit_start, min(end - 1, len(lines) - 1))
+        del lines[edit_start:edit_end + 1]
+        edit_length = 0
+
+    updated_script = "\\n".join(lines)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(updated_script)
+
+    excerpt_start = max(0, edit_start - request["context_lines"])
+    excerpt_end = min(len(lines), edit_start + edit_length + request["context_lines"])
+    print(json.dumps({
+        "total_lines": len(lines),
+        "excerpt_start": excerpt_start + 1,
+        "excerpt": lines[excerpt_start:excerpt_end],
+        "content": None if current_sha256 == request["expected_sha256"] else updated_script,
+        "error": None
+    }))
+'''
+
+
+class LinePatchResult(NamedTuple):
+    total_lines: int
+    # Line number of the first excerpt line
+    excerpt_start: int
+    excerpt: List[str]
+    # The file's new content, None if the file had the expected content before the edit
+    content: Optional[str]
+
+
+def get_content_sha256(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def create_line_patch_code(
+    path: str,
+    operation: LinePatchOperation,
+    line_number_start: int,
+    line_number_end: int,
+    new_code: str,
+    expected_content: Optional[str],
+    context_lines: int
+) -> str:
+    request = {
+        "path": path,
+        "operation": operation,
+        "line_number_start": line_number_start,
+        "line_number_end": line_number_end,
+        "new_code": new_code,
+        "expected_sha256": get_content_sha256(expected_content) if expected_content is not None else None,
+        "context_lines": context_lines
+    }
+    # run_python_code treats ``` as the start of a markdown code block, so backticks are sent escaped
+    request_json = json.dumps(request).replace("`", "\\u0060")
+    return f"{LINE_PATCH_CODE}\nmain(json.loads({json.dumps(request_json)}))"
+
+
+def parse_line_patch_output(path: str, output: str) -> LinePatchResult:
+    reply = json.loads(output)
+    error = reply.pop("error")
+    if error:
+        raise RuntimeError(f"Failed to edit file {path}: {error}")
+    return LinePatchResult(**reply)
@@ -1,19 +1,289 @@
+import io
+import os
+import uuid
+import logging
+import shutil
 import asyncio
+import tarfile
 import docker
 from uuid import UUID
-from pathlib import Path
-from typing import AsyncGenerator, Tuple
-from docker.errors import NotFound, ImageNotFound
-
-from kvasir_agents.sandbox.abstract import AbstractSandbox, create_empty_project_package_local
+from pathlib import Path, PurePosixPath
+from collections import defaultdict
+from typing import AsyncGenerator, Iterator, Tuple, Optional, Dict, List
+from docker.errors import NotFound, ImageNotFound, APIError
+from docker.models.containers import Container
+
+from kvasir_agents.sandbox.abstract import AbstractSandbox, FILE_STREAM_CHUNK_SIZE, create_empty_project_package_local
+from kvasir_agents.sandbox.kernel import PythonKernel, KERNEL_SERVER_CODE
+from kvasir_agents.sandbox.exec_channel import ExecChannel, ExecResult
+from kvasir_agents.sandbox.scheduler import ExecLimits, get_sandbox_scheduler, limit_command
+from kvasir_agents.sandbox.output_spool import (
+    OUTPUT_SPOOL_CODE,
+    create_output_spool_request,
+    parse_output_spool_output,
+    format_spooled_stream
+)
 from kvasir_agents.utils.code_utils import parse_code
 from kvasir_agents.app_secrets import (
+    CODEBASE_DIR,
     CODEBASE_HOST_DIR,
     PROJECTS_HOST_DIR,
     PROJECTS_DIR
 )
 
 
+# Kernel replies carry a cell's whole output on one line
+KERNEL_STREAM_LIMIT = 256 * 1024 * 1024
+
+# Prefix and label of warm pool containers that have not been claimed by a project yet
+WARM_POOL_CONTAINER_PREFIX = "warm-sandbox-"
+WARM_POOL_LABEL = "kvasir.warm-pool"
+# Slots must be on the same filesystem as the project directories they are renamed to
+WARM_POOL_HOST_DIR = CODEBASE_HOST_DIR / ".warm-pool"
+# Containers kept started per image, set per deployment through the environment, 0 disables the pool
+WARM_POOL_SIZE = int(os.getenv("KVASIR_SANDBOX_WARM_POOL_SIZE") or 0)
+
+logger = logging.getLogger("kvasir")
+
+# The docker SDK is blocking, so the client is only used from worker threads
+_docker_client: Optional[docker.DockerClient] = None
+_container_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+_warm_pools: Dict[str, "WarmPool"] = {}
+
+
+def _get_docker_client() -> docker.DockerClient:
+    global _docker_client
+    if _docker_client is None:
+        _docker_client = docker.from_env()
+    return _docker_client
+
+
+def _create_sandbox_container(image_name: str, container_name: str, host_dir: Path, labels: Optional[Dict[str, str]] = None) -> Container:
+    docker_client = _get_docker_client()
+
+    if not host_dir.exists():
+        host_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        docker_client.images.get(image_name)
+    except ImageNotFound as e:
+        raise RuntimeError(
+            f"Sandbox image {image_name} not found, the image must be built first") from e
+
+    container = docker_client.containers.create(
+        image=image_name,
+        name=container_name,
+        detach=True,
+        tty=True,
+        stdin_open=True,
+        working_dir="/app",
+        labels=labels or {},
+        volumes={str(host_dir): {"bind": "/app", "mode": "rw"},
+                 str(PROJECTS_HOST_DIR): {"bind": str(PROJECTS_DIR), "mode": "ro"}}
+    )
+    container.start()
+    return container
+
+
+def _write_host_file(host_path: Path, content: bytes) -> None:
+    host_path.parent.mkdir(parents=True, exist_ok=True)
+    host_path.write_bytes(content)
+
+
+class _ChunkStream(io.RawIOBase):
+    """
+    A readable file over an iterator of byte chunks, such as the archive stream from the docker API.
+    """
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self.chunks = chunks
+        self.buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self.buffer:
+            self.buffer = next(self.chunks, None)
+            if self.buffer is None:
+                self.buffer = b""
+                return 0
+
+        n = min(len(b), len(self.buffer))
+        b[:n] = self.buffer[:n]
+        self.buffer = self.buffer[n:]
+        return n
+
+
+class WarmPool:
+    """
+    Containers of an image started ahead of time, each mounted on an empty slot directory. A new project claims one by
+    renaming its slot directory to the project directory, which the running container's mount follows, and the
+    container to the project's container name, so it doesn't wait for a container to be created and started.
+    Docker keeps the slot path as the mount source, so a claimed container is recreated on the project directory
+    rather than restarted once it has stopped.
+    """
+
+    def __init__(self, image_name: str, size: int):
+        self.image_name = image_name
+        self.size = size
+        self.containers: List[Tuple[Container, Path]] = []
+        self._fill_task: Optional[asyncio.Task] = None
+
+    async def fill(self) -> None:
+        if not self.containers:
+            self.containers = await asyncio.to_thread(self._adopt_existing_containers)
+
+        while len(self.containers) < self.size:
+            slot_dir = WARM_POOL_HOST_DIR / str(uuid.uuid4())
+            container = await asyncio.to_thread(
+                _create_sandbox_container,
+                self.image_name,
+                f"{WARM_POOL_CONTAINER_PREFIX}{slot_dir.name}",
+                slot_dir,
+                {WARM_POOL_LABEL: self.image_name}
+            )
+            self.containers.append((container, slot_dir))
+
+    async def claim(self, container_name: str, project_dir: Path) -> bool:
+        """Returns False if there was no container to claim or the project directory already exists."""
+        if not self.containers or project_dir.exists():
+            return False
+
+        container, slot_dir = self.containers.pop()
+        try:
+            await asyncio.to_thread(self._claim, container, slot_dir, container_name, project_dir)
+            return True
+        except (OSError, APIError):
+            await asyncio.to_thread(self._remove, container, slot_dir)
+            return False
+        finally:
+            self.fill_in_background()
+
+    def fill_in_background(self) -> None:
+        if self._fill_task is None or self._fill_task.done():
+            self._fill_task = asyncio.create_task(self._fill_logging_errors())
+
+    async def _fill_logging_errors(self) -> None:
+        try:
+            await self.fill()
+        except Exception:
+            logger.exception(f"Failed to fill the warm pool of {self.image_name}")
+
+    def _claim(self, container: Container, slot_dir: Path, container_name: str, project_dir: Path) -> None:
+        slot_dir.rename(project_dir)
+        container.rename(container_name)
+
+    def _remove(self, container: Container, slot_dir: Path) -> None:
+        container.remove(force=True)
+        shutil.rmtree(slot_dir, ignore_errors=True)
+
+    def _adopt_existing_containers(self) -> List[Tuple[Container, Path]]:
+        # Unclaimed containers left by a previous process are reused if they are still running
+        containers = _get_docker_client().containers.list(
+            all=True, filters={"label": f"{WARM_POOL_LABEL}={self.image_name}"})
+
+        adopted = []
+        for container in containers:
+            if not container.name.startswith(WARM_POOL_CONTAINER_PREFIX):
+                continue
+            slot_dir = WARM_POOL_HOST_DIR / \
+                container.name.removeprefix(WARM_POOL_CONTAINER_PREFIX)
+            if container.status == "running" and slot_dir.exists():
+                adopted.append((container, slot_dir))
+            else:
+                self._remove(container, slot_dir)
+
+        return adopted
+
+
+def start_warm_pool(image_name: str = "research-sandbox", size: int = WARM_POOL_SIZE) -> Optional[WarmPool]:
+    """
+    Keep a number of containers of the image started, for LocalSandboxes of new projects to claim. The pool fills in
+    the background, None if it is disabled.
+    """
+    if size <= 0:
+        return None
+
+    pool = _warm_pools.get(image_name)
+    if pool is None:
+        pool = WarmPool(image_name, size)
+        _warm_pools[image_name] = pool
+
+    pool.size = size
+    pool.fill_in_background()
+    return pool
+
+
+def stop_warm_pools() -> None:
+    # The started containers are left running, the next process adopts them
+    for pool in _warm_pools.values():
+        if pool._fill_task is not None:
+            pool._fill_task.cancel()
+
+
+# Sandboxes on the same project share the exec channel to its container
+_exec_channels: Dict[str, ExecChannel] = {}
+
+
+def _get_exec_channel(container_name: str) -> ExecChannel:
+    channel = _exec_channels.get(container_name)
+    if channel is None or channel.loop is not asyncio.get_running_loop():
+        channel = ExecChannel(container_name)
+        _exec_channels[container_name] = channel
+    return channel
+
+
+class LocalPythonKernel(PythonKernel):
+    def __init__(self, sandbox: "LocalSandbox"):
+        super().__init__(get_sandbox_scheduler(sandbox.project_id))
+        self.sandbox = sandbox
+        self.process: Optional[asyncio.subprocess.Process] = None
+
+    async def _start_process(self) -> None:
+        await self.sandbox.create_container_if_not_exists()
+        self.process = await asyncio.create_subprocess_exec(
+            "docker", "exec", "-i", "-w", self.sandbox.workdir,
+            self.sandbox.container_name,
+            *limit_command(["python", "-u", "-c", KERNEL_SERVER_CODE], self.scheduler.limits),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=KERNEL_STREAM_LIMIT
+        )
+
+    async def _stop_process(self) -> None:
+        if self.process is None:
+            return
+
+        process, self.process = self.process, None
+
+        # Killing docker exec does not kill the process it started in the container
+        if self.pid is not None:
+            kill_process = await asyncio.create_subprocess_exec(
+                "docker", "exec", self.sandbox.container_name, "kill", "-9", str(self.pid),
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            await kill_process.wait()
+
+        if process.returncode is None:
+            process.stdin.close()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=5.0)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+
+    async def _send(self, line: str) -> None:
+        self.process.stdin.write(f"{line}\n".encode("utf-8"))
+        await self.process.stdin.drain()
+
+    async def _receive(self) -> Optional[str]:
+        line = await self.process.stdout.readline()
+        return line.decode("utf-8") if line else None
+
+
 class LocalSandbox(AbstractSandbox):
     def __init__(self, project_id: UUID, package_name: str, image_name: str = "research-sandbox"):
         self.project_id = project_id
@@ -21,40 +291,67 @@ class LocalSandbox(AbstractSandbox):
         self.workdir = f"/app/{package_name}"
         self.image_name = image_name
         self.container_name = str(project_id)
-        self.create_container_if_not_exists()
+        # The container is started on first use
+        self.container_ready = False
 
-    def create_container_if_not_exists(self):
-        docker_client = docker.from_env()
+    async def create_container_if_not_exists(self) -> bool:
+        # Return True if the container already existed, False otherwise
+        if self.container_ready:
+            return True
 
+        async with _container_locks[self.container_name]:
+            project_dir = CODEBASE_HOST_DIR / str(self.project_id)
+            existing_container = await asyncio.to_thread(self._get_existing_container)
+            if existing_container is not None and not self._mounts_project_dir(existing_container, project_dir):
+                # A claimed warm container that stopped, starting it would mount its old slot directory at /app
+                await asyncio.to_thread(existing_container.remove, force=True)
+                await asyncio.to_thread(
+                    _create_sandbox_container, self.image_name, self.container_name, project_dir)
+                self.container_ready = True
+                # The package was installed in the old container, its files are still in the project directory
+                await self._reinstall_package()
+                return True
+
+            existed = existing_container is not None
+            if existed:
+                if existing_container.status != "running":
+                    await asyncio.to_thread(existing_container.start)
+            else:
+                pool = _warm_pools.get(self.image_name)
+                if pool is None or not await pool.claim(self.container_name, project_dir):
+                    await asyncio.to_thread(
+                        _create_sandbox_container, self.image_name, self.container_name, project_dir)
+
+            self.container_ready = True
+            return existed
+
+    def _get_existing_container(self) -> Optional[Container]:
         try:
-            existing_container = docker_client.containers.get(
-                self.container_name)
-            if existing_container.status != "running":
-                existing_container.start()
+            return _get_docker_client().containers.get(self.container_name)
         except NotFound:
-            project_dir = CODEBASE_HOST_DIR / str(self.project_id)
-            if not project_dir.exists():
-                project_dir.mkdir(parents=True, exist_ok=True)
+            return None
+
+    def _mounts_project_dir(self, container: Container, project_dir: Path) -> bool:
+        # A running container's mount follows a renamed source directory, so only a stopped one can be stale
+        if container.status == "running":
+            return True
+        return any(
+            mount.get("Destination") == "/app" and mount.get("Source") == str(project_dir)
+            for mount in container.attrs.get("Mounts", [])
+        )
 
-            try:
-                docker_client.images.get(self.image_name)
-            except ImageNotFound as e:
-                raise RuntimeError(
-                    f"Sandbox image {self.image_name} not found, the image must be built first") from e
-
-            container = docker_client.containers.create(
-                image=self.image_name,
-                name=self.container_name,
-                detach=True,
-                tty=True,
-                stdin_open=True,
-                working_dir="/app",
-                volumes={str(project_dir): {"bind": "/app", "mode": "rw"},
-                         str(PROJECTS_HOST_DIR): {"bind": str(PROJECTS_DIR), "mode": "ro"}}
-            )
-            container.start()
+    async def _reinstall_package(self) -> None:
+        if not (CODEBASE_HOST_DIR / str(self.project_id) / self.package_name).exists():
+            return
+
+        _, err = await self.run_shell_code("pip install -e .")
+        if err:
+            raise RuntimeError(
+                f"Failed to install package in container: {err}")
 
     async def setup_project(self) -> Path:
+        # Start the container first, a new project can only claim a warm container before its directory exists
+        await self.create_container_if_not_exists()
         create_empty_project_package_local(self.project_id, self.package_name)
 
         _, err = await self.run_shell_code(
@@ -68,10 +365,16 @@ class LocalSandbox(AbstractSandbox):
         return Path(f"/app/{self.package_name}")
 
     async def delete_container_if_exists(self):
-        docker_client = docker.from_env()
+        await asyncio.to_thread(self._delete_container_if_exists)
+        self.container_ready = False
 
+        channel = _exec_channels.pop(self.container_name, None)
+        if channel is not None and channel.loop is asyncio.get_running_loop():
+            await channel.close()
+
+    def _delete_container_if_exists(self) -> None:
         try:
-            existing_container = docker_client.containers.get(
+            existing_container = _get_docker_client().containers.get(
                 self.container_name)
             if existing_container:
                 existing_container.stop()
@@ -79,119 +382,68 @@ class LocalSandbox(AbstractSandbox):
         except NotFound:
             pass
 
-    async def run_python_code(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None) -> Tuple[str, str]:
-        python_code_parsed = parse_code(code)
+    async def _exec(self, args: List[str], stdin: Optional[str] = None, timeout: float | None = None) -> ExecResult:
+        await self.create_container_if_not_exists()
+        return await _get_exec_channel(self.container_name).exec(args, cwd=self.workdir, stdin=stdin, timeout=timeout)
 
-        cmd = [
-            "docker", "exec", "-i",
-            self.container_name,
-            "bash", "-c", f"cd {self.workdir} && python -c 'import sys; exec(sys.stdin.read())'"
-        ]
-
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+    async def _run_spooled(self, args: List[str], stdin: Optional[str], timeout: float | None, max_output_length: int) -> ExecResult:
+        # The command's output goes to files in the container and only its head and tail come back over the channel,
+        # the wrapper enforces the timeout and its command dies with it if the request is cancelled
+        result = await self._exec(
+            ["python", "-c", OUTPUT_SPOOL_CODE],
+            stdin=create_output_spool_request(args, stdin, timeout, max_output_length)
+        )
+        if result.returncode != 0:
+            # Returned as the command's error, like when the command itself fails
+            return ExecResult(stdout="", stderr=result.stderr, returncode=result.returncode, timed_out=False)
+
+        spooled = parse_output_spool_output(result.stdout)
+        return ExecResult(
+            stdout=format_spooled_stream(spooled.stdout),
+            stderr=format_spooled_stream(spooled.stderr),
+            returncode=spooled.returncode,
+            timed_out=spooled.timed_out
         )
 
-        try:
-            if timeout is not None:
-                try:
-                    out, err = await asyncio.wait_for(
-                        process.communicate(
-                            python_code_parsed.encode('utf-8')),
-                        timeout=timeout
-                    )
-                except asyncio.TimeoutError:
-                    # Timeout occurred - kill the process
-                    process.terminate()
-                    try:
-                        await asyncio.wait_for(process.wait(), timeout=5.0)
-                    except asyncio.TimeoutError:
-                        process.kill()
-                        await process.wait()
-
-                    timeout_msg = f"Process exceeded timeout of {timeout}s and was terminated"
-                    return "", timeout_msg
-            else:
-                out, err = await process.communicate(python_code_parsed.encode('utf-8'))
-        finally:
-            # Ensure process is cleaned up
-            if process.returncode is None:
-                try:
-                    process.kill()
-                    await process.wait()
-                except ProcessLookupError:
-                    pass
+    async def _run_python_code(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None, limits: Optional[ExecLimits] = None) -> Tuple[str, str]:
+        python_code_parsed = parse_code(code)
+        args = limit_command(["python", "-c", "import sys; exec(sys.stdin.read())"], limits or ExecLimits())
 
-        err_str = err.decode("utf-8") if process.returncode != 0 else ""
-        out_str = out.decode("utf-8")
+        if truncate_output:
+            result = await self._run_spooled(args, python_code_parsed, timeout, max_output_length)
+        else:
+            result = await self._exec(args, stdin=python_code_parsed, timeout=timeout)
 
-        # Truncate output if requested and too long
-        if truncate_output and len(out_str) > max_output_length:
-            # Keep beginning and end, truncate middle
-            keep_chars = max_output_length // 2
-            truncation_msg = f"\n\n... [Output truncated: removed {len(out_str) - max_output_length:,} characters from middle, showing {max_output_length:,} of {len(out_str):,} total] ...\n\n"
-            out_str = out_str[:keep_chars] + \
-                truncation_msg + out_str[-keep_chars:]
+        if result.timed_out:
+            timeout_msg = f"Process exceeded timeout of {timeout}s and was terminated"
+            return "", timeout_msg
 
-        return out_str, err_str
+        err_str = result.stderr if result.returncode != 0 else ""
+        return result.stdout, err_str
 
-    async def run_shell_code(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None) -> Tuple[str, str]:
-        cmd = [
-            "docker", "exec", "-i",
-            self.container_name,
-            "bash", "-c", f"cd {self.workdir} && set -e; set -o pipefail;\n{code}"
-        ]
+    def create_python_kernel(self) -> LocalPythonKernel:
+        return LocalPythonKernel(self)
 
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+    async def _run_shell_code(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None, limits: Optional[ExecLimits] = None) -> Tuple[str, str]:
+        args = limit_command(["bash", "-c", f"set -e; set -o pipefail;\n{code}"], limits or ExecLimits())
 
-        try:
-            if timeout:
-                try:
-                    out, err = await asyncio.wait_for(process.communicate(), timeout=timeout)
-                except asyncio.TimeoutError:
-                    process.terminate()
-                    try:
-                        await asyncio.wait_for(process.wait(), timeout=5.0)
-                    except asyncio.TimeoutError:
-                        process.kill()
-                        await process.wait()
-                    return "", f"Process exceeded timeout of {timeout}s and was terminated"
-            else:
-                out, err = await process.communicate()
-        finally:
-            if process.returncode is None:
-                try:
-                    process.kill()
-                    await process.wait()
-                except ProcessLookupError:
-                    pass
-
-        err_str = None if process.returncode == 0 else err.decode("utf-8")
-        out_str = out.decode("utf-8")
+        if truncate_output:
+            result = await self._run_spooled(args, None, timeout or None, max_output_length)
+        else:
+            result = await self._exec(args, timeout=timeout or None)
 
-        # Truncate output if requested and too long
-        if truncate_output and len(out_str) > max_output_length:
-            # Keep beginning and end, truncate middle
-            keep_chars = max_output_length // 2
-            truncation_msg = f"\n\n... [Output truncated: removed {len(out_str) - max_output_length:,} characters from middle, showing {max_output_length:,} of {len(out_str):,} total] ...\n\n"
-            out_str = out_str[:keep_chars] + \
-                truncation_msg + out_str[-keep_chars:]
+        if result.timed_out:
+            return "", f"Process exceeded timeout of {timeout}s and was terminated"
 
-        return out_str, err_str
+        err_str = None if result.returncode == 0 else result.stderr
+        return result.stdout, err_str
 
-    async def run_shell_code_streaming(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None) -> AsyncGenerator[Tuple[str, str], None]:
+    async def _run_shell_code_streaming(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None, limits: Optional[ExecLimits] = None) -> AsyncGenerator[Tuple[str, str], None]:
+        await self.create_container_if_not_exists()
         cmd = [
             "docker", "exec", "-i",
             self.container_name,
-            "bash", "-c", f"cd {self.workdir} && set -e; set -o pipefail;\n{code}"
+            *limit_command(["bash", "-c", f"cd {self.workdir} && set -e; set -o pipefail;\n{code}"], limits or ExecLimits())
         ]
 
         process = await asyncio.create_subprocess_exec(
@@ -291,26 +543,7 @@ class LocalSandbox(AbstractSandbox):
                     pass
 
     async def read_file(self, path: str, truncate: bool = True, max_output_length: int = 20000) -> str:
-        cmd = [
-            "docker", "exec", "-i",
-            self.container_name,
-            "bash", "-c", f"cd {self.workdir} && cat {path}"
-        ]
-
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-
-        out, err = await process.communicate()
-
-        if process.returncode != 0:
-            raise RuntimeError(
-                f"Failed to read file from container: {err.decode('utf-8')}")
-
-        content = out.decode("utf-8")
+        content = (await self.read_bytes(path)).decode("utf-8", "replace")
 
         # Truncate output if requested and too long
         if truncate and len(content) > max_output_length:
@@ -323,158 +556,120 @@ class LocalSandbox(AbstractSandbox):
         return content
 
     async def write_file(self, path: str, content: str):
-        escaped_content = content.replace("'", "'\\''")
+        await self.write_bytes(path, content.encode("utf-8"))
 
-        cmd = [
-            "docker", "exec", "-i",
-            self.container_name,
-            "bash", "-c", f"cd {self.workdir} && mkdir -p $(dirname {path}) && touch {path} && echo '{escaped_content}' > {path}"
-        ]
+    async def open_stream(self, path: str, chunk_size: int = FILE_STREAM_CHUNK_SIZE) -> AsyncGenerator[bytes, None]:
+        await self.create_container_if_not_exists()
+        host_path = self._get_host_path(path)
+        if host_path is None:
+            async for chunk in self._open_archive_stream(path, chunk_size):
+                yield chunk
+            return
 
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+        try:
+            file = await asyncio.to_thread(open, host_path, "rb")
+        except OSError as e:
+            raise RuntimeError(
+                f"Failed to read file from container: {e}") from e
 
-        out, err = await process.communicate()
+        try:
+            while chunk := await asyncio.to_thread(file.read, chunk_size):
+                yield chunk
+        finally:
+            file.close()
 
-        if process.returncode != 0:
+    async def write_bytes(self, path: str, content: bytes) -> None:
+        await self.create_container_if_not_exists()
+        host_path = self._get_host_path(path)
+        try:
+            if host_path is None:
+                await asyncio.to_thread(self._put_file_archive, path, content)
+            else:
+                await asyncio.to_thread(_write_host_file, host_path, content)
+        except (OSError, APIError) as e:
             raise RuntimeError(
-                f"Failed to write file to container: {err.decode('utf-8')}")
-
-        return out.decode("utf-8")
+                f"Failed to write file to container: {e}") from e
+
+    def _get_host_path(self, path: str) -> Optional[Path]:
+        # /app is bind mounted from the project's directory, so its files are read and written there directly
+        # instead of through the container. Other paths, or links out of /app, go through docker's archive API.
+        container_path = PurePosixPath(self.get_absolute_path(path))
+        if container_path != PurePosixPath("/app") and PurePosixPath("/app") not in container_path.parents:
+            return None
+
+        project_dir = CODEBASE_DIR / str(self.project_id)
+        host_path = project_dir / container_path.relative_to("/app")
+        if not self.is_subpath(host_path, project_dir):
+            return None
+        return host_path
+
+    async def _open_archive_stream(self, path: str, chunk_size: int) -> AsyncGenerator[bytes, None]:
+        container = await asyncio.to_thread(_get_docker_client().containers.get, self.container_name)
+        try:
+            archive, _ = await asyncio.to_thread(container.get_archive, self.get_absolute_path(path), chunk_size)
+        except NotFound as e:
+            raise RuntimeError(
+                f"Failed to read file from container: {path} does not exist") from e
 
-    async def delete_file(self, path: str):
-        cmd = [
-            "docker", "exec", "-i",
-            self.container_name,
-            "bash", "-c", f"cd {self.workdir} && rm -rf {path}"
-        ]
+        # The archive is read as it arrives, with blocking reads off the event loop
+        tar = await asyncio.to_thread(tarfile.open, fileobj=_ChunkStream(archive), mode="r|")
+        try:
+            member = await asyncio.to_thread(tar.next)
+            if member is None or not member.isfile():
+                raise RuntimeError(
+                    f"Failed to read file from container: {path} is not a file")
 
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+            file = tar.extractfile(member)
+            while chunk := await asyncio.to_thread(file.read, chunk_size):
+                yield chunk
+        finally:
+            tar.close()
 
-        out, err = await process.communicate()
+    def _put_file_archive(self, path: str, content: bytes) -> None:
+        container_path = PurePosixPath(self.get_absolute_path(path))
+        container = _get_docker_client().containers.get(self.container_name)
 
-        return out.decode("utf-8"), err.decode("utf-8")
+        exit_code, output = container.exec_run(
+            ["mkdir", "-p", str(container_path.parent)])
+        if exit_code != 0:
+            raise OSError(output.decode("utf-8", "replace"))
 
-    async def rename_file(self, old_path: str, new_path: str):
-        cmd = [
-            "docker", "exec", "-i",
-            self.container_name,
-            "bash", "-c", f"cd {self.workdir} && mv {old_path} {new_path}"
-        ]
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode="w") as tar:
+            info = tarfile.TarInfo(container_path.name)
+            info.size = len(content)
+            info.mode = 0o644
+            tar.addfile(info, io.BytesIO(content))
 
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+        container.put_archive(str(container_path.parent), archive.getvalue())
 
-        out, err = await process.communicate()
+    async def delete_file(self, path: str):
+        result = await self._exec(["bash", "-c", f"rm -rf {path}"])
 
-        return out.decode("utf-8"), err.decode("utf-8")
+        return result.stdout, result.stderr
 
-    async def check_file_exists(self, path: str) -> bool:
-        cmd = [
-            "docker", "exec", "-i",
-            self.container_name,
-            "bash", "-c", f"cd {self.workdir} && test -f {path} && echo 'exists' || echo 'not_exists'"
-        ]
+    async def rename_file(self, old_path: str, new_path: str):
+        result = await self._exec(["bash", "-c", f"mv {old_path} {new_path}"])
 
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+        return result.stdout, result.stderr
 
-        out, _ = await process.communicate()
+    async def check_file_exists(self, path: str) -> bool:
+        result = await self._exec(["bash", "-c", f"test -f {path}"])
 
-        return out.decode("utf-8").strip() == "exists"
+        return result.returncode == 0
 
     async def get_working_directory(self) -> Tuple[str, str]:
-        cmd = [
-            "docker", "exec", "-i",
-            self.container_name,
-            "bash", "-c", f"cd {self.workdir} && pwd"
-        ]
-
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-
-        out, err = await process.communicate()
+        result = await self._exec(["pwd"])
 
-        return out.decode("utf-8"), err.decode("utf-8")
+        return result.stdout, result.stderr
 
     async def list_directory_contents(self, path: str = None) -> Tuple[str, str]:
         if path is None:
-            cmd = [
-                "docker", "exec", "-i",
-                self.container_name,
-                "bash", "-c", f"cd {self.workdir} && ls -la"
-            ]
+            result = await self._exec(["bash", "-c", "ls -la"])
         else:
-            cmd = [
-                "docker", "exec", "-i",
-                self.container_name,
-                "bash", "-c", f"cd {self.workdir} && ls -la {path}"
-            ]
+            result = await self._exec(["bash", "-c", f"ls -la {path}"])
 
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdin=asyncio.subprocess.PIPE,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-
-        out, err = await process.communicate()
-
-        return out.decode("utf-8"), err.decode("utf-8")
+        return result.stdout, result.stderr
 
     async def get_folder_structure(self, path: str = "/app", n_levels: int = 5, max_lines: int = 100) -> str:
-        find_cmd = f"find {path} -maxdepth {n_levels} \\( -name '__pycache__' -o -name '*.egg-info' \\) -prune -o -print 2>/dev/null | sort"
-        out, err = await self.run_shell_code(find_cmd)
-
-        if err:
-            return f"folder structure {n_levels} levels down:\n\nError: {err}"
-
-        if not out.strip():
-            return f"folder structure {n_levels} levels down:\n\n(empty or does not exist)"
-
-        all_paths = [line.rstrip('/')
-                     for line in out.split('\n') if line.strip()]
-
-        leaf_paths = []
-        for current_path in all_paths:
-            is_parent = False
-            for other_path in all_paths:
-                if other_path != current_path:
-                    # Check if other_path is a child of current_path
-                    if other_path.startswith(current_path + '/'):
-                        is_parent = True
-                        break
-
-            if not is_parent:
-                leaf_paths.append(current_path)
-
-        was_truncated = len(leaf_paths) > max_lines
-
-        if was_truncated:
-            result_lines = leaf_paths[:max_lines]
-            result = '\n'.join(result_lines)
-            return f"folder structure {n_levels} levels down:\n\n{result}\n\n[truncated - output exceeded {max_lines} lines]"
-        else:
-            result = '\n'.join(leaf_paths)
-            return f"folder structure {n_levels} levels down:\n\n{result}"
+        return await super().get_folder_structure(path, n_levels, max_lines)
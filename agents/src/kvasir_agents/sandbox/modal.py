@@ -1,19 +1,172 @@
+import time
 import modal
 import shlex
 import asyncio
 import shutil
-from pathlib import Path
-from typing import AsyncGenerator, Tuple, Optional
+from pathlib import Path, PurePosixPath
+from collections import defaultdict
+from typing import AsyncGenerator, AsyncIterator, BinaryIO, List, Tuple, Optional, Dict
 from typing_extensions import Self
 from uuid import UUID
 
 from kvasir_agents.app_secrets import MODAL_APP_NAME, SANDBOX_DOCKERFILE_PATH
-from kvasir_agents.sandbox.abstract import AbstractSandbox, create_empty_project_package_local
+from kvasir_agents.sandbox.abstract import AbstractSandbox, FILE_STREAM_CHUNK_SIZE, create_empty_project_package_local
+from kvasir_agents.sandbox.kernel import PythonKernel, KERNEL_SERVER_CODE
+from kvasir_agents.sandbox.scheduler import ExecLimits, get_sandbox_scheduler, limit_command
+from kvasir_agents.sandbox.output_spool import (
+    OUTPUT_SPOOL_CODE,
+    SpooledOutput,
+    create_output_spool_request,
+    parse_output_spool_output,
+    format_spooled_stream,
+    create_failed_spool_output
+)
 from kvasir_agents.utils.code_utils import parse_code
 
 
 app = modal.App.lookup(MODAL_APP_NAME, create_if_missing=True)
 
+# Live sandbox handles by project id, shared by every ModalSandbox in the process so operations don't look the
+# sandbox up by name each time. A handle older than the TTL is health checked before it is used again.
+SANDBOX_HANDLE_TTL = 60
+_sandbox_handles: Dict[UUID, Tuple[modal.Sandbox, float]] = {}
+_sandbox_locks: Dict[UUID, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+# Seconds a spooled command's exec may outlive the command's own timeout, for the wrapper to kill it and reply
+SPOOLED_EXEC_TIMEOUT_GRACE = 30
+
+# Every project's sandbox runs the same image, built once per process
+_sandbox_image: Optional[modal.Image] = None
+_sandbox_image_lock = asyncio.Lock()
+
+
+async def _get_sandbox_handle(project_id: UUID) -> Optional[modal.Sandbox]:
+    cached = _sandbox_handles.get(project_id)
+    if cached is None:
+        return None
+
+    sb, checked_at = cached
+    if time.monotonic() - checked_at > SANDBOX_HANDLE_TTL:
+        if await sb.poll.aio() is not None:
+            _sandbox_handles.pop(project_id, None)
+            return None
+        _sandbox_handles[project_id] = (sb, time.monotonic())
+
+    return sb
+
+
+def _set_sandbox_handle(project_id: UUID, sb: modal.Sandbox) -> None:
+    now = time.monotonic()
+    # Drop handles that have not been used within a TTL, they would be health checked before use anyway
+    for expired_project_id in [pid for pid, (_, checked_at) in _sandbox_handles.items() if now - checked_at > SANDBOX_HANDLE_TTL]:
+        del _sandbox_handles[expired_project_id]
+    _sandbox_handles[project_id] = (sb, now)
+
+
+def _evict_sandbox_handle(project_id: UUID) -> None:
+    _sandbox_handles.pop(project_id, None)
+
+
+async def _get_running_sandbox_handle(project_id: UUID) -> Optional[modal.Sandbox]:
+    # The project's sandbox if one is running, looked up by name if this process has no handle, but never started
+    sb = await _get_sandbox_handle(project_id)
+    if sb is not None:
+        return sb
+
+    try:
+        sb = await modal.Sandbox.from_name.aio(MODAL_APP_NAME, str(project_id))
+    except modal.exception.NotFoundError:
+        return None
+    _set_sandbox_handle(project_id, sb)
+    return sb
+
+
+async def read_project_file(project_id: UUID, path: str) -> bytes:
+    """
+    Read an absolute path under /app from the project's running sandbox, as the volume only sees the sandbox's writes
+    once they are committed. Without a running sandbox it is read from the volume, rather than starting one to read it.
+    """
+    sb = await _get_running_sandbox_handle(project_id)
+    if sb is not None:
+        try:
+            process = await sb.exec.aio("cat", path, text=False)
+            content = await process.stdout.read.aio()
+            await process.wait.aio()
+        except modal.exception.SandboxTerminatedError:
+            # Stopped since it was looked up, its writes are on the volume now
+            _evict_sandbox_handle(project_id)
+        else:
+            if process.returncode != 0:
+                err_str = await process.stderr.read.aio()
+                raise RuntimeError(
+                    f"Failed to read file: {err_str.decode('utf-8', 'replace') if err_str else 'Unknown error'}")
+            return content
+
+    vol = modal.Volume.from_name(str(project_id), create_if_missing=True)
+    chunks = []
+    async for chunk in vol.read_file.aio(path.removeprefix("/app")):
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def build_sandbox_image(force_build: bool = False) -> modal.Image:
+    """
+    Build the sandbox image ahead of time, e.g. on startup, so creating a new project's sandbox doesn't wait for it.
+    """
+    global _sandbox_image
+    async with _sandbox_image_lock:
+        if _sandbox_image is None or force_build:
+            image = modal.Image.from_dockerfile(
+                str(SANDBOX_DOCKERFILE_PATH), force_build=force_build)
+            with modal.enable_output():
+                _sandbox_image = await image.build.aio(app)
+
+    return _sandbox_image
+
+
+class ModalPythonKernel(PythonKernel):
+    def __init__(self, sandbox: "ModalSandbox"):
+        super().__init__(get_sandbox_scheduler(sandbox.project_id))
+        self.sandbox = sandbox
+        self.process: Optional[modal.container_process.ContainerProcess] = None
+        self.stdout_lines: Optional[AsyncIterator[str]] = None
+
+    async def _start_process(self) -> None:
+        self.process = await self.sandbox._exec(
+            *limit_command(["python", "-u", "-c", KERNEL_SERVER_CODE], self.scheduler.limits),
+            workdir=self.sandbox.workdir,
+            stderr=modal.stream_type.StreamType.DEVNULL,
+            bufsize=1
+        )
+        self.stdout_lines = aiter(self.process.stdout)
+
+    async def _stop_process(self) -> None:
+        if self.process is None:
+            return
+
+        process, self.process = self.process, None
+
+        # Modal has no way to kill an exec'd process, so kill it from inside the sandbox
+        if self.pid is not None:
+            try:
+                kill_process = await self.sandbox.sb.exec.aio("kill", "-9", str(self.pid))
+                await kill_process.wait.aio()
+            except modal.exception.SandboxTerminatedError:
+                # The kernel went down with its sandbox
+                return
+        else:
+            process.stdin.write_eof()
+            await process.stdin.drain.aio()
+
+        await process.wait.aio()
+
+    async def _send(self, line: str) -> None:
+        self.process.stdin.write(f"{line}\n".encode("utf-8"))
+        await self.process.stdin.drain.aio()
+
+    async def _receive(self) -> Optional[str]:
+        return await anext(self.stdout_lines, None)
+
 
 class ModalSandbox(AbstractSandbox):
 
@@ -24,7 +177,7 @@ class ModalSandbox(AbstractSandbox):
         self.sb: modal.Sandbox | None = None
 
     async def _verify_package_is_installed(self) -> None:
-        _, err = await self.run_shell_code(f"python -c 'import {self.package_name}'")
+        _, err = await self._run_shell_code(f"python -c 'import {self.package_name}'")
         if err:
             raise RuntimeError(
                 f"Failed to import package {self.package_name}: {err}")
@@ -41,15 +194,15 @@ class ModalSandbox(AbstractSandbox):
         finally:
             shutil.rmtree(local_project_package_dir)
 
-        sandbox_image = modal.Image.from_dockerfile(
-            str(SANDBOX_DOCKERFILE_PATH), force_build=force_build
-        ).run_commands(f"pip install -e /app/{local_project_package_dir.name}", volumes={"/app": self.vol})
+        sandbox_image = await build_sandbox_image(force_build=force_build)
 
         self.sb = await modal.Sandbox.create.aio(
             image=sandbox_image,
             app=app,
             name=str(self.project_id),
             volumes={"/app": self.vol},
+            # The package is on the volume, putting its src on the path replaces installing it into a per-project image
+            env={"PYTHONPATH": f"/app/{local_project_package_dir.name}/src"},
             timeout=24*60*60,  # 24 hours
             workdir=f"/app/{local_project_package_dir.name}"
 
@@ -59,15 +212,28 @@ class ModalSandbox(AbstractSandbox):
 
     async def create_container_if_not_exists(self, force_build: bool = False) -> bool:
         # Return True if the container already existed, False otherwise
-        with modal.enable_output():
-            try:
-                self.sb = await modal.Sandbox.from_name.aio(MODAL_APP_NAME, str(self.project_id))
+        self.sb = await _get_sandbox_handle(self.project_id)
+        if self.sb is not None:
+            return True
+
+        async with _sandbox_locks[self.project_id]:
+            self.sb = await _get_sandbox_handle(self.project_id)
+            if self.sb is not None:
                 return True
-            except modal.exception.NotFoundError:
-                await self._initialize_sandbox(force_build=force_build)
-                return False
+
+            with modal.enable_output():
+                try:
+                    self.sb = await modal.Sandbox.from_name.aio(MODAL_APP_NAME, str(self.project_id))
+                    existed = True
+                except modal.exception.NotFoundError:
+                    await self._initialize_sandbox(force_build=force_build)
+                    existed = False
+
+            _set_sandbox_handle(self.project_id, self.sb)
+            return existed
 
     async def reload_container(self) -> None:
+        _evict_sandbox_handle(self.project_id)
         try:
             self.sb = await modal.Sandbox.from_name.aio(MODAL_APP_NAME, str(self.project_id))
             await self.sb.terminate.aio()
@@ -76,19 +242,96 @@ class ModalSandbox(AbstractSandbox):
             pass
         finally:
             self.sb = None
-            await self._initialize_sandbox()
+            await self.create_container_if_not_exists()
+
+    async def upload_files(self, files: List[Tuple[BinaryIO, str]]) -> None:
+        """
+        Upload (file, volume path) pairs in one batch and make them visible in the running sandbox.
+        Paths that already exist in the volume, or repeat within the batch, keep their first file.
+        """
+        files = [(file, f"/{path.lstrip('/')}") for file, path in files]
+
+        existing_paths = set()
+        for directory in {PurePosixPath(path).parent.as_posix() for _, path in files}:
+            try:
+                entries = await self.vol.listdir.aio(directory)
+            except modal.exception.NotFoundError:
+                continue
+            existing_paths.update(f"/{entry.path.lstrip('/')}" for entry in entries)
+
+        # Modal streams the files from their handles, uploading large ones in parallel chunks
+        async with self.vol.batch_upload.aio() as batch:
+            for file, path in files:
+                if path not in existing_paths:
+                    batch.put_file(file, path)
+                    existing_paths.add(path)
+
+        await self.reload_volume()
+
+    async def reload_volume(self) -> None:
+        # Make files uploaded to the volume visible in the running sandbox, without restarting it
+        if not await self.create_container_if_not_exists():
+            # A new sandbox mounts the volume as it is now
+            return
+
+        try:
+            await self.sb.reload_volumes.aio()
+        except modal.exception.SandboxTerminatedError:
+            _evict_sandbox_handle(self.project_id)
+            await self.create_container_if_not_exists()
 
     async def delete_container_if_exists(self) -> None:
+        _evict_sandbox_handle(self.project_id)
         if self.sb:
             await self.sb.terminate.aio()
             self.sb = None
 
-    async def run_python_code(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None) -> Tuple[str, str]:
+    async def _exec(self, *args: str, **kwargs) -> modal.container_process.ContainerProcess:
+        await self.create_container_if_not_exists()
+        try:
+            return await self.sb.exec.aio(*args, **kwargs)
+        except modal.exception.SandboxTerminatedError:
+            # The cached handle outlived its sandbox, e.g. it hit its timeout, so start a new one and retry once
+            _evict_sandbox_handle(self.project_id)
+            await self.create_container_if_not_exists()
+            return await self.sb.exec.aio(*args, **kwargs)
+
+    async def _run_spooled(self, args: List[str], stdin: Optional[str], timeout: int | None, max_output_length: int) -> SpooledOutput:
+        # The command's output goes to files in the sandbox and only its head and tail come back. The wrapper
+        # enforces the timeout, the exec timeout is a backstop in case the wrapper itself hangs
+        process = await self._exec(
+            "python", "-c", OUTPUT_SPOOL_CODE,
+            timeout=timeout + SPOOLED_EXEC_TIMEOUT_GRACE if timeout else None,
+            workdir=self.workdir
+        )
+
+        process.stdin.write(create_output_spool_request(
+            args, stdin, timeout, max_output_length).encode('utf-8'))
+        process.stdin.write_eof()
+        await process.stdin.drain.aio()
+        await process.wait.aio()
+
+        if process.returncode != 0:
+            # Returned as the command's error, like when the command itself fails
+            return create_failed_spool_output(process.returncode, process.stderr.read())
+
+        return parse_output_spool_output(process.stdout.read())
+
+    async def _run_python_code(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None, limits: Optional[ExecLimits] = None) -> Tuple[str, str]:
         await self.create_container_if_not_exists()
         python_code_parsed = parse_code(code)
 
-        process = await self.sb.exec.aio(
-            "python", "-c", "import sys; exec(sys.stdin.read())",
+        args = limit_command(["python", "-c", "import sys; exec(sys.stdin.read())"], limits or ExecLimits())
+
+        if truncate_output:
+            spooled = await self._run_spooled(args, python_code_parsed, timeout, max_output_length)
+            if spooled.timed_out:
+                return "", f"Process exceeded timeout of {timeout}s and was terminated"
+            err_str = format_spooled_stream(spooled.stderr) if spooled.returncode != 0 else ""
+            return format_spooled_stream(spooled.stdout), err_str
+
+        process = await self._exec(
+            *args,
             timeout=timeout,
             workdir=self.workdir
         )
@@ -105,19 +348,24 @@ class ModalSandbox(AbstractSandbox):
         else:
             err_str = ""
 
-        if truncate_output and len(out_str) > max_output_length:
-            keep_chars = max_output_length // 2
-            truncation_msg = f"\n\n... [Output truncated: removed {len(out_str) - max_output_length:,} characters from middle, showing {max_output_length:,} of {len(out_str):,} total] ...\n\n"
-            out_str = out_str[:keep_chars] + \
-                truncation_msg + out_str[-keep_chars:]
-
         return out_str, err_str
 
-    async def run_shell_code(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None) -> Tuple[str, str]:
+    def create_python_kernel(self) -> ModalPythonKernel:
+        return ModalPythonKernel(self)
+
+    async def _run_shell_code(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None, limits: Optional[ExecLimits] = None) -> Tuple[str, str]:
         await self.create_container_if_not_exists()
-        shell_cmd = f"set -e; set -o pipefail;\n{code}"
-        process = await self.sb.exec.aio(
-            "bash", "-c", shell_cmd,
+        args = limit_command(["bash", "-c", f"set -e; set -o pipefail;\n{code}"], limits or ExecLimits())
+
+        if truncate_output:
+            spooled = await self._run_spooled(args, None, timeout, max_output_length)
+            if spooled.timed_out:
+                return "", f"Process exceeded timeout of {timeout}s and was terminated"
+            err_str = None if spooled.returncode == 0 else format_spooled_stream(spooled.stderr)
+            return format_spooled_stream(spooled.stdout), err_str
+
+        process = await self._exec(
+            *args,
             timeout=timeout,
             workdir=self.workdir
         )
@@ -131,19 +379,12 @@ class ModalSandbox(AbstractSandbox):
         else:
             err_str = err_str if err_str else ""
 
-        if truncate_output and len(out_str) > max_output_length:
-            keep_chars = max_output_length // 2
-            truncation_msg = f"\n\n... [Output truncated: removed {len(out_str) - max_output_length:,} characters from middle, showing {max_output_length:,} of {len(out_str):,} total] ...\n\n"
-            out_str = out_str[:keep_chars] + \
-                truncation_msg + out_str[-keep_chars:]
-
         return out_str, err_str
 
-    async def run_shell_code_streaming(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None) -> AsyncGenerator[Tuple[str, str], None]:
+    async def _run_shell_code_streaming(self, code: str, truncate_output: bool = True, max_output_length: int = 20000, timeout: int | None = None, limits: Optional[ExecLimits] = None) -> AsyncGenerator[Tuple[str, str], None]:
         await self.create_container_if_not_exists()
-        shell_cmd = f"set -e; set -o pipefail;\n{code}"
-        process = await self.sb.exec.aio(
-            "bash", "-c", shell_cmd,
+        process = await self._exec(
+            *limit_command(["bash", "-c", f"set -e; set -o pipefail;\n{code}"], limits or ExecLimits()),
             timeout=timeout,
             workdir=self.workdir
         )
@@ -238,47 +479,47 @@ class ModalSandbox(AbstractSandbox):
                     pass
 
     async def read_file(self, path: str, truncate: bool = True, max_output_length: int = 20000) -> str:
-        await self.create_container_if_not_exists()
-        quoted_path = shlex.quote(path)
-        out, err = await self.run_shell_code(
-            f"cat {quoted_path}",
-            truncate_output=truncate,
-            max_output_length=max_output_length
-        )
+        out = (await self.read_bytes(path)).decode("utf-8", "replace")
 
-        if err:
-            raise RuntimeError(f"Failed to read file: {err}")
+        if truncate and len(out) > max_output_length:
+            keep_chars = max_output_length // 2
+            truncation_msg = f"\n\n... [Output truncated: removed {len(out) - max_output_length:,} characters from middle, showing {max_output_length:,} of {len(out):,} total] ...\n\n"
+            out = out[:keep_chars] + \
+                truncation_msg + out[-keep_chars:]
 
         return out
 
     async def write_file(self, path: str, content: str) -> None:
-        await self.create_container_if_not_exists()
-        quoted_path = shlex.quote(path)
-        dir_path = shlex.quote(str(Path(path).parent))
-
-        _, err = await self.run_shell_code(f"mkdir -p {dir_path}")
-        if err:
-            raise RuntimeError(f"Failed to create directory: {err}")
+        await self.write_bytes(path, content.encode("utf-8"))
 
-        process = await self.sb.exec.aio(
-            "bash", "-c", f"cat > {quoted_path}",
-            workdir=self.workdir
+    async def open_stream(self, path: str, chunk_size: int = FILE_STREAM_CHUNK_SIZE) -> AsyncGenerator[bytes, None]:
+        process = await self._exec(
+            "cat", self.get_absolute_path(path),
+            text=False
         )
 
-        process.stdin.write(content.encode('utf-8'))
-        process.stdin.write_eof()
-        await process.stdin.drain.aio()
-        await process.wait.aio()
+        async for chunk in process.stdout:
+            for start in range(0, len(chunk), chunk_size):
+                yield chunk[start:start + chunk_size]
 
-        err_str = process.stderr.read()
+        await process.wait.aio()
         if process.returncode != 0:
+            err_str = await process.stderr.read.aio()
             raise RuntimeError(
-                f"Failed to write file: {err_str.decode('utf-8') if err_str else 'Unknown error'}")
+                f"Failed to read file: {err_str.decode('utf-8', 'replace') if err_str else 'Unknown error'}")
+
+    async def write_bytes(self, path: str, content: bytes) -> None:
+        await self.create_container_if_not_exists()
+        # The sandbox filesystem API streams the content in and creates the parent directories
+        try:
+            await self.sb.filesystem.write_bytes.aio(content, self.get_absolute_path(path))
+        except modal.exception.SandboxFilesystemError as e:
+            raise RuntimeError(f"Failed to write file: {e}") from e
 
     async def delete_file(self: Self, path: str) -> None:
         await self.create_container_if_not_exists()
         quoted_path = shlex.quote(path)
-        _, err = await self.run_shell_code(f"rm -rf {quoted_path}")
+        _, err = await self._run_shell_code(f"rm -rf {quoted_path}")
 
         if err:
             raise RuntimeError(f"Failed to delete file: {err}")
@@ -289,7 +530,7 @@ class ModalSandbox(AbstractSandbox):
         quoted_new_path = shlex.quote(new_path)
         # Create directory for new path if it doesn't exist
         dir_path = shlex.quote(str(Path(new_path).parent))
-        _, err = await self.run_shell_code(
+        _, err = await self._run_shell_code(
             f"mkdir -p {dir_path} && mv {quoted_old_path} {quoted_new_path}"
         )
 
@@ -299,7 +540,7 @@ class ModalSandbox(AbstractSandbox):
     async def check_file_exists(self: Self, path: str) -> bool:
         await self.create_container_if_not_exists()
         quoted_path = shlex.quote(path)
-        out, _ = await self.run_shell_code(
+        out, _ = await self._run_shell_code(
             f"test -f {quoted_path} && echo 'exists' || echo 'not_exists'",
             truncate_output=False
         )
@@ -312,49 +553,8 @@ class ModalSandbox(AbstractSandbox):
     async def list_directory_contents(self: Self, path: Optional[str] = None) -> Tuple[str, str]:
         await self.create_container_if_not_exists()
         if path is None:
-            out, err = await self.run_shell_code("ls -la", truncate_output=False)
+            out, err = await self._run_shell_code("ls -la", truncate_output=False)
         else:
             quoted_path = shlex.quote(path)
-            out, err = await self.run_shell_code(f"ls -la {quoted_path}", truncate_output=False)
+            out, err = await self._run_shell_code(f"ls -la {quoted_path}", truncate_output=False)
         return out, err if err is not None else ""
-
-    async def get_folder_structure(self: Self, path: Optional[str] = None, n_levels: int = 5, max_lines: int = 100) -> str:
-        await self.create_container_if_not_exists()
-        if path:
-            quoted_path = shlex.quote(path)
-        else:
-            quoted_path = "."
-
-        find_cmd = f"find {quoted_path} -maxdepth {n_levels} \\( -name '__pycache__' -o -name '*.egg-info' \\) -prune -o -print 2>/dev/null | sort"
-        out, err = await self.run_shell_code(find_cmd)
-
-        if err:
-            return f"folder structure {n_levels} levels down:\n\nError: {err}"
-
-        if not out.strip():
-            return f"folder structure {n_levels} levels down:\n\n(empty or does not exist)"
-
-        all_paths = [line.rstrip('/')
-                     for line in out.split('\n') if line.strip()]
-
-        leaf_paths = []
-        for current_path in all_paths:
-            is_parent = False
-            for other_path in all_paths:
-                if other_path != current_path:
-                    if other_path.startswith(current_path + '/'):
-                        is_parent = True
-                        break
-
-            if not is_parent:
-                leaf_paths.append(current_path)
-
-        was_truncated = len(leaf_paths) > max_lines
-
-        if was_truncated:
-            result_lines = leaf_paths[:max_lines]
-            result = '\n'.join(result_lines)
-            return f"folder structure {n_levels} levels down:\n\n{result}\n\n[truncated - output exceeded {max_lines} lines]"
-        else:
-            result = '\n'.join(leaf_paths)
-            return f"folder structure {n_levels} levels down:\n\n{result}"
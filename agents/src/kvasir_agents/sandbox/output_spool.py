@@ -0,0 +1,204 @@
+import json
+from typing import List, NamedTuple, Optional
+
+
+# Runs inside the sandbox. Runs the command with its stdout and stderr written straight to files, so the output is
+# never held in memory, and prints only the head and tail windows of each. The files of outputs that fit in the
+# windows are removed, the others are kept for paging, up to MAX_SPOOLED_OUTPUTS of them.
+OUTPUT_SPOOL_CODE = '''
+import os
+import sys
+import json
+import uuid
+import signal
+import subprocess
+
+SPOOL_DIR = "/tmp/kvasir-output"
+MAX_SPOOLED_OUTPUTS = 64
+
+
+def kill_command():
+    # The command shares our process group, so killing the group on cancellation kills it with us. On timeout its
+    # processes are found by group instead, to spare ourselves
+    group = os.getpgrp()
+    for name in os.listdir("/proc"):
+        if not name.isdigit() or int(name) == os.getpid():
+            continue
+        try:
+            if os.getpgid(int(name)) == group:
+                os.kill(int(name), signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def read_windows(path, window):
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if size <= 2 * window:
+            return {"head": f.read().decode("utf-8", "replace"), "tail": None, "size": size, "removed": 0, "path": None}
+        head = f.read(window)
+        f.seek(size - window)
+        tail = f.read()
+    return {
+        "head": head.decode("utf-8", "replace"),
+        "tail": tail.decode("utf-8", "replace"),
+        "size": size,
+        "removed": size - 2 * window,
+        "path": path
+    }
+
+
+def prune():
+    # Counted by output, not file, an output's stdout and stderr go together. Other commands may be removing old
+    # outputs at the same time
+    outputs = {}
+    for output_file in os.scandir(SPOOL_DIR):
+        try:
+            mtime = output_file.stat().st_mtime
+        except OSError:
+            continue
+        output_id = output_file.name.split(".")[0]
+        previous_mtime, paths = outputs.get(output_id, (mtime, []))
+        outputs[output_id] = (max(previous_mtime, mtime), paths + [output_file.path])
+    for _, paths in sorted(outputs.values(), reverse=True)[MAX_SPOOLED_OUTPUTS:]:
+        for output_path in paths:
+            try:
+                os.remove(output_path)
+            except OSError:
+                pass
+
+
+def main(request):
+    try:
+        os.setsid()
+    except OSError:
+        # Already leading our own group, as when started by the exec channel
+        pass
+
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    output_id = uuid.uuid4().hex
+    paths = {name: os.path.join(SPOOL_DIR, f"{output_id}.{name}") for name in ("stdout", "stderr")}
+    stdin = request["stdin"].encode("utf-8") if request["stdin"] is not None else None
+
+    timed_out = False
+    with open(paths["stdout"], "wb") as stdout, open(paths["stderr"], "wb") as stderr:
+        process = subprocess.Popen(
+            request["args"],
+            stdin=subprocess.PIPE if stdin is not None else subprocess.DEVNULL,
+            stdout=stdout,
+            stderr=stderr
+        )
+        try:
+            process.communicate(stdin, timeout=request["timeout"])
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            kill_command()
+            process.wait()
+
+    streams = {name: read_windows(path, request["window"]) for name, path in paths.items()}
+    for name, stream in streams.items():
+        if stream["path"] is None:
+            os.remove(paths[name])
+    prune()
+
+    print(json.dumps({**streams, "returncode": process.returncode, "timed_out": timed_out}))
+
+
+main(json.loads(sys.stdin.read()))
+'''
+
+
+# Runs inside the sandbox. Reads a byte range of a spooled output.
+READ_OUTPUT_CODE = '''
+import os
+import json
+
+
+def main(request):
+    try:
+        with open(request["path"], "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            f.seek(request["offset"])
+            content = f.read(request["length"])
+    except OSError as e:
+        print(json.dumps({"error": e.strerror or str(e)}))
+        return
+    print(json.dumps({
+        "content": content.decode("utf-8", "replace"),
+        "next_offset": request["offset"] + len(content),
+        "size": size,
+        "error": None
+    }))
+'''
+
+
+class SpooledStream(NamedTuple):
+    head: str
+    # None if the whole output is in the head
+    tail: Optional[str]
+    # In bytes, as is the part removed from the middle
+    size: int
+    removed: int
+    # The file in the sandbox with the full output, None if it was not truncated
+    path: Optional[str]
+
+
+class SpooledOutput(NamedTuple):
+    stdout: SpooledStream
+    stderr: SpooledStream
+    returncode: int
+    timed_out: bool
+
+
+class OutputPage(NamedTuple):
+    content: str
+    # Offset of the byte after the page, equal to size at the end of the output
+    next_offset: int
+    size: int
+
+
+def create_output_spool_request(args: List[str], stdin: Optional[str], timeout: float | None, max_output_length: int) -> str:
+    return json.dumps({"args": args, "stdin": stdin, "timeout": timeout, "window": max_output_length // 2})
+
+
+def parse_output_spool_output(output: str) -> SpooledOutput:
+    reply = json.loads(output)
+    return SpooledOutput(
+        stdout=SpooledStream(**reply["stdout"]),
+        stderr=SpooledStream(**reply["stderr"]),
+        returncode=reply["returncode"],
+        timed_out=reply["timed_out"]
+    )
+
+
+def format_spooled_stream(stream: SpooledStream) -> str:
+    if stream.tail is None:
+        return stream.head
+
+    truncation_msg = f"\n\n... [Output truncated: removed {stream.removed:,} bytes from middle, showing {stream.size - stream.removed:,} of {stream.size:,} total, full output in {stream.path}, page through it with read_output_tool] ...\n\n"
+    return stream.head + truncation_msg + stream.tail
+
+
+def create_failed_spool_output(returncode: int, stderr: str) -> SpooledOutput:
+    """The output of a wrapper that failed before running the command, e.g. in a missing working directory."""
+    return SpooledOutput(
+        stdout=SpooledStream(head="", tail=None, size=0, removed=0, path=None),
+        stderr=SpooledStream(head=stderr, tail=None, size=len(stderr.encode("utf-8")), removed=0, path=None),
+        returncode=returncode,
+        timed_out=False
+    )
+
+
+def create_read_output_code(path: str, offset: int, length: int) -> str:
+    request = {"path": path, "offset": offset, "length": length}
+    # run_python_code treats ``` as the start of a markdown code block, so backticks are sent escaped
+    request_json = json.dumps(request).replace("`", "\\u0060")
+    return f"{READ_OUTPUT_CODE}\nmain(json.loads({json.dumps(request_json)}))"
+
+
+def parse_read_output_output(path: str, output: str) -> OutputPage:
+    reply = json.loads(output)
+    error = reply.pop("error")
+    if error:
+        raise RuntimeError(f"Failed to read output {path}: {error}")
+    return OutputPage(**reply)
@@ -0,0 +1,197 @@
+import os
+import time
+import logging
+import heapq
+import asyncio
+import itertools
+from uuid import UUID
+from enum import IntEnum
+from contextvars import ContextVar
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, NamedTuple, Optional
+
+
+class ExecPriority(IntEnum):
+    # Waiting executions are admitted lowest value first
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+
+# How much background executions are niced in the sandbox, so they also lose out for CPU once they run
+BACKGROUND_NICENESS = 10
+
+
+def _get_int_env(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+# Set per deployment through the environment, the CPU and memory limits apply to each execution
+MAX_CONCURRENT_EXECS = _get_int_env("KVASIR_SANDBOX_MAX_CONCURRENT_EXECS") or 4
+EXEC_CPUS = _get_int_env("KVASIR_SANDBOX_EXEC_CPUS")
+EXEC_MEMORY_BYTES = _get_int_env("KVASIR_SANDBOX_EXEC_MEMORY_BYTES")
+
+SCHEDULER_METRICS_LOG_INTERVAL = 60
+
+logger = logging.getLogger("kvasir")
+
+# The priority of the executions started from the current task, tasks created from it inherit it
+_exec_priority: ContextVar[ExecPriority] = ContextVar("exec_priority", default=ExecPriority.NORMAL)
+
+
+@contextmanager
+def exec_priority(priority: ExecPriority) -> Iterator[None]:
+    token = _exec_priority.set(priority)
+    try:
+        yield
+    finally:
+        _exec_priority.reset(token)
+
+
+class ExecLimits(NamedTuple):
+    # Caps the threads of the common numeric libraries, the sandbox has no per-process cgroups to set a CPU quota in
+    cpus: Optional[int] = None
+    # Caps the address space of each process the execution starts
+    memory_bytes: Optional[int] = None
+    niceness: int = 0
+
+
+class SchedulerMetrics(NamedTuple):
+    max_concurrency: int
+    running: int
+    queued: int
+    queued_by_priority: Dict[ExecPriority, int]
+    admitted: int
+    # Summed over the admitted executions
+    wait_seconds: float
+
+
+def limit_command(args: List[str], limits: ExecLimits) -> List[str]:
+    """Wraps the command so it runs with the limits, in place of the wrapping shell so its pid stays the same."""
+    setup = []
+    if limits.memory_bytes is not None:
+        setup.append(f"ulimit -v {limits.memory_bytes // 1024}")
+    if limits.cpus is not None:
+        threads = max(1, limits.cpus)
+        setup.append(
+            f"export OMP_NUM_THREADS={threads} MKL_NUM_THREADS={threads} OPENBLAS_NUM_THREADS={threads} NUMEXPR_NUM_THREADS={threads}")
+
+    if not setup and not limits.niceness:
+        return args
+
+    run = f'exec nice -n {limits.niceness} "$@"' if limits.niceness else 'exec "$@"'
+    return ["bash", "-c", "; ".join([*setup, run]), "kvasir-exec", *args]
+
+
+class SandboxScheduler:
+    """
+    Admits executions against one sandbox, at most max_concurrency at a time. Waiting executions are admitted by
+    priority, then in the order they arrived.
+
+    Admission is per process: chat runs in the API process, where its executions go ahead of the chart downloads,
+    while background charts and the agent runs are executed by the workers, each with its own scheduler. Across
+    processes background executions only lose out for CPU in the sandbox, through their niceness.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENT_EXECS, limits: Optional[ExecLimits] = None):
+        self.max_concurrency = max_concurrency
+        self.limits = limits or ExecLimits()
+        self.running = 0
+        self.admitted = 0
+        self.wait_seconds = 0.0
+        self._waiters: List[tuple] = []
+        self._queued_by_priority: Counter = Counter()
+        self._order = itertools.count()
+
+    def configure(self, max_concurrency: Optional[int] = None, limits: Optional[ExecLimits] = None) -> None:
+        if max_concurrency is not None:
+            self.max_concurrency = max_concurrency
+            # Admit whoever a higher limit now lets in
+            while self.running < self.max_concurrency and self._admit_next():
+                self.running += 1
+        if limits is not None:
+            self.limits = limits
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[ExecPriority] = None) -> AsyncIterator[ExecLimits]:
+        """Waits for a slot and holds it for the block, yields the limits to run the execution with."""
+        priority = priority if priority is not None else _exec_priority.get()
+        start = time.monotonic()
+
+        if self.running < self.max_concurrency and not self._waiters:
+            self.running += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._order), future))
+            self._queued_by_priority[priority] += 1
+            try:
+                await future
+            except asyncio.CancelledError:
+                # The slot may have been handed over just before the cancellation
+                if future.done() and not future.cancelled():
+                    self._release()
+                raise
+            finally:
+                self._queued_by_priority[priority] -= 1
+
+        self.admitted += 1
+        self.wait_seconds += time.monotonic() - start
+        try:
+            niceness = BACKGROUND_NICENESS if priority == ExecPriority.BACKGROUND else 0
+            yield self.limits._replace(niceness=niceness)
+        finally:
+            self._release()
+
+    def get_metrics(self) -> SchedulerMetrics:
+        return SchedulerMetrics(
+            max_concurrency=self.max_concurrency,
+            running=self.running,
+            queued=sum(self._queued_by_priority.values()),
+            queued_by_priority={priority: n for priority, n in self._queued_by_priority.items() if n},
+            admitted=self.admitted,
+            wait_seconds=self.wait_seconds
+        )
+
+    def _release(self) -> None:
+        # The slot goes straight to the next waiter, if there is one
+        if not self._admit_next():
+            self.running -= 1
+
+    def _admit_next(self) -> bool:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return True
+        return False
+
+
+# Shared by every sandbox object of a project in the process, the agents of a run each create their own
+_schedulers: Dict[UUID, SandboxScheduler] = {}
+
+
+def get_sandbox_scheduler(project_id: UUID) -> SandboxScheduler:
+    scheduler = _schedulers.get(project_id)
+    if scheduler is None:
+        scheduler = SandboxScheduler(MAX_CONCURRENT_EXECS, ExecLimits(cpus=EXEC_CPUS, memory_bytes=EXEC_MEMORY_BYTES))
+        _schedulers[project_id] = scheduler
+    return scheduler
+
+
+def get_scheduler_metrics() -> Dict[UUID, SchedulerMetrics]:
+    return {project_id: scheduler.get_metrics() for project_id, scheduler in _schedulers.items()}
+
+
+async def log_scheduler_metrics_periodically(interval: float = SCHEDULER_METRICS_LOG_INTERVAL) -> None:
+    """Logs the executions running and queued in the process, for the sandboxes that have any."""
+    while True:
+        await asyncio.sleep(interval)
+        for project_id, metrics in get_scheduler_metrics().items():
+            if not metrics.running and not metrics.queued:
+                continue
+            queued_by_priority = ", ".join(f"{priority.name.lower()}={n}" for priority, n in metrics.queued_by_priority.items())
+            logger.info(
+                f"Sandbox {project_id}: {metrics.running}/{metrics.max_concurrency} running, {metrics.queued} queued "
+                f"({queued_by_priority or 'none'}), {metrics.admitted} admitted, {metrics.wait_seconds:.1f}s waited in total")
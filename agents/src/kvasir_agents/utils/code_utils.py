@@ -1,4 +1,5 @@
 import re
+from typing import List
 from pathlib import Path
 
 from kvasir_agents.app_secrets import READABLE_EXTENSIONS
@@ -19,6 +20,11 @@ def add_line_numbers_to_script(script: str) -> str:
     return "\n".join(f"{str(i+1).rjust(max_width)}. {line}" for i, line in enumerate(lines))
 
 
+def add_line_numbers_to_lines(lines: List[str], first_line_number: int = 1) -> str:
+    max_width = len(str(first_line_number + len(lines) - 1))
+    return "\n".join(f"{str(i).rjust(max_width)}. {line}" for i, line in enumerate(lines, start=first_line_number))
+
+
 def remove_line_numbers_from_script(script: str) -> str:
     lines = [line for line in script.splitlines()]
     cleaned_lines = []
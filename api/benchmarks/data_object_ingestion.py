@@ -0,0 +1,114 @@
+import io
+import sys
+import json
+import uuid
+import asyncio
+import jsonschema
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+
+from kvasir_api.auth.models import users
+from kvasir_api.database.service import insert_df
+from kvasir_api.modules.data_objects.models import dataset, object_group, data_object, time_series
+from kvasir_api.modules.data_objects.service import _prepare_data_objects
+from kvasir_ontology.entities.dataset.data_model import DataObjectCreate
+from benchmarks.utils import timer, seed_rows, delete_rows
+
+
+# Times turning an uploaded time series objects file into data_object/time_series rows, against the previous
+# per-cell conversion, and the insert of the prepared rows. The file goes through parquet like an upload does.
+# Run from the api directory with: python -m benchmarks.data_object_ingestion [sizes...]
+
+OBJECT_COUNTS = [100_000, 1_000_000]
+
+
+def _build_objects_file(n_objects: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    num_timestamps = rng.integers(10, 10_000, n_objects)
+    df = pd.DataFrame({
+        "name": [f"Series {i}" for i in range(n_objects)],
+        "original_id": [f"series_{i}" for i in range(n_objects)],
+        "description": "benchmark series",
+        "modality_fields": [{
+            "start_timestamp": "2024-01-01T00:00:00Z",
+            "end_timestamp": "2024-06-01T00:00:00Z",
+            "num_timestamps": int(num_timestamps[i]),
+            "sampling_frequency": "h",
+            "timezone": "UTC",
+            "features_schema": {"value": {"dtype": "float64", "range": [0.0, float(i)]}},
+        } for i in range(n_objects)],
+    })
+    buffer = io.BytesIO()
+    df.to_parquet(buffer)
+    buffer.seek(0)
+    return pd.read_parquet(buffer)
+
+
+def _legacy_prepare(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    def convert(obj):
+        if isinstance(obj, np.ndarray):
+            return convert(obj.item()) if obj.size == 1 else [convert(item) for item in obj.tolist()]
+        if isinstance(obj, dict):
+            return {key: convert(value) for key, value in obj.items()}
+        if isinstance(obj, list):
+            return [convert(item) for item in obj]
+        if isinstance(obj, (np.integer, np.floating)):
+            return obj.item()
+        return obj
+
+    df = df.map(convert)
+    jsonschema.validate(df.iloc[0].to_dict(), DataObjectCreate.model_json_schema())
+    parent_df = df[["name", "original_id", "description"]].copy()
+    modality_fields_df = pd.DataFrame(df["modality_fields"].tolist())
+    for col in modality_fields_df.columns:
+        modality_fields_df[col] = modality_fields_df[col].apply(
+            lambda x: json.dumps(x) if isinstance(x, dict) else x)
+    return parent_df, modality_fields_df
+
+
+async def run(n_objects: int) -> None:
+    timestamp = datetime.now(timezone.utc)
+    stamps = {"created_at": timestamp, "updated_at": timestamp}
+    user_id, dataset_id, group_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    await seed_rows({
+        users: [{"id": user_id, "email": f"{user_id}@benchmark", "name": "benchmark", **stamps}],
+        dataset: [{"id": dataset_id, "user_id": user_id, "name": "benchmark", "description": "benchmark", **stamps}],
+        object_group: [{"id": group_id, "dataset_id": dataset_id, "name": "benchmark", "description": "benchmark",
+                        "modality": "time_series", **stamps}],
+    })
+    df = _build_objects_file(n_objects)
+
+    try:
+        with timer() as legacy_elapsed:
+            _legacy_prepare(df)
+        with timer() as prepare_elapsed:
+            parent_df, modality_fields_df, object_ids = _prepare_data_objects(df, "time_series", group_id)
+        with timer() as insert_elapsed:
+            await insert_df(parent_df, table_name="data_object", schema_name="data_objects")
+            await insert_df(modality_fields_df, table_name="time_series", schema_name="data_objects")
+
+        print(
+            f"{n_objects:>10} {legacy_elapsed['seconds']:>12.2f} {prepare_elapsed['seconds']:>12.2f} "
+            f"{insert_elapsed['seconds']:>10.2f}"
+        )
+    finally:
+        await delete_rows({
+            time_series: time_series.c.id.in_(
+                data_object.select().with_only_columns(data_object.c.id).where(data_object.c.group_id == group_id)),
+            data_object: data_object.c.group_id == group_id,
+            object_group: object_group.c.id == group_id,
+            dataset: dataset.c.id == dataset_id,
+            users: users.c.id == user_id,
+        })
+
+
+async def main():
+    object_counts = [int(arg) for arg in sys.argv[1:]] or OBJECT_COUNTS
+    print(f"{'objects':>10} {'legacy (s)':>12} {'prepare (s)':>12} {'insert (s)':>10}")
+    for n_objects in object_counts:
+        await run(n_objects)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
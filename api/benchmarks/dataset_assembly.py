@@ -0,0 +1,92 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+from kvasir_api.auth.models import users
+from kvasir_api.modules.data_objects.service import Datasets
+from kvasir_api.modules.data_objects.models import (
+    dataset,
+    object_group,
+    time_series_group,
+    data_object,
+    time_series,
+)
+from benchmarks.utils import count_queries, timer, seed_rows, delete_rows
+
+
+# Times Datasets.get_datasets and get_object_groups for one dataset as its number of object groups grows.
+# Run from the api directory with: python -m benchmarks.dataset_assembly
+
+GROUP_COUNTS = [10, 1_000, 10_000]
+OBJECTS_PER_GROUP = 3
+N_REPEATS = 3
+
+
+def _build_dataset_rows(user_id: uuid.UUID, n_groups: int) -> tuple[uuid.UUID, dict]:
+    timestamp = datetime.now(timezone.utc)
+    stamps = {"created_at": timestamp, "updated_at": timestamp}
+    dataset_id = uuid.uuid4()
+    rows = {table: [] for table in [users, dataset, object_group, time_series_group, data_object, time_series]}
+    rows[users].append({"id": user_id, "email": f"{user_id}@benchmark", "name": "benchmark", **stamps})
+    rows[dataset].append(
+        {"id": dataset_id, "user_id": user_id, "name": "benchmark", "description": "benchmark", **stamps})
+
+    for i in range(n_groups):
+        group_id = uuid.uuid4()
+        rows[object_group].append({
+            "id": group_id, "dataset_id": dataset_id, "name": f"group_{i}", "description": "benchmark",
+            "modality": "time_series", **stamps
+        })
+        rows[time_series_group].append({
+            "id": group_id, "total_timestamps": 100 * OBJECTS_PER_GROUP, "number_of_series": OBJECTS_PER_GROUP,
+            "sampling_frequency": "h", "earliest_timestamp": timestamp, "latest_timestamp": timestamp, **stamps
+        })
+        for j in range(OBJECTS_PER_GROUP):
+            object_id = uuid.uuid4()
+            rows[data_object].append({
+                "id": object_id, "group_id": group_id, "original_id": f"series_{i}_{j}", "name": f"Series {j}", **stamps
+            })
+            rows[time_series].append({
+                "id": object_id, "num_timestamps": 100, "start_timestamp": timestamp, "end_timestamp": timestamp,
+                "sampling_frequency": "h", "features_schema": {"value": "float"}, **stamps
+            })
+
+    return dataset_id, rows
+
+
+async def main():
+    print(f"{'groups':>8} {'method':>18} {'queries':>8} {'seconds':>8}")
+    for n_groups in GROUP_COUNTS:
+        user_id = uuid.uuid4()
+        dataset_id, rows = _build_dataset_rows(user_id, n_groups)
+        await seed_rows(rows)
+
+        try:
+            service = Datasets(user_id)
+            methods = {
+                "get_datasets": lambda: service.get_datasets([dataset_id]),
+                "get_object_groups": lambda: service.get_object_groups(dataset_id=dataset_id, include_objects=True),
+            }
+            for name, method in methods.items():
+                # Warm up the connection pool
+                await method()
+
+                with count_queries() as counter, timer() as elapsed:
+                    for _ in range(N_REPEATS):
+                        await method()
+
+                print(f"{n_groups:>8} {name:>18} {counter.count // N_REPEATS:>8} {elapsed['seconds'] / N_REPEATS:>8.3f}")
+        finally:
+            group_ids = [row["id"] for row in rows[object_group]]
+            await delete_rows({
+                time_series: time_series.c.id.in_([row["id"] for row in rows[data_object]]),
+                data_object: data_object.c.group_id.in_(group_ids),
+                time_series_group: time_series_group.c.id.in_(group_ids),
+                object_group: object_group.c.dataset_id == dataset_id,
+                dataset: dataset.c.id == dataset_id,
+                users: users.c.id == user_id,
+            })
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
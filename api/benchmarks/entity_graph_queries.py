@@ -0,0 +1,103 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+from kvasir_api.modules.entity_graph.service import EntityGraphs
+from kvasir_api.modules.entity_graph.models import (
+    entity_node,
+    node_group,
+    node_in_group,
+    dataset_from_data_source,
+    dataset_supported_in_pipeline,
+    dataset_in_analysis,
+    dataset_in_pipeline_run,
+    pipeline_run_output_dataset,
+)
+from kvasir_api.modules.pipeline.models import pipeline_run
+from benchmarks.utils import count_queries, timer, seed_rows, delete_rows
+
+
+# Shows that EntityGraphs.get_entity_graph issues a constant number of queries as the mount group grows.
+# Run from the api directory with: python -m benchmarks.entity_graph_queries
+
+GRAPH_SIZES = [10, 100, 1000]
+
+
+def _build_graph_rows(n_chains: int) -> tuple[uuid.UUID, dict]:
+    """
+    Each chain is data_source -> dataset -> pipeline (with one run reading and writing the dataset) plus an analysis.
+    """
+    timestamp = datetime.now(timezone.utc)
+    stamps = {"created_at": timestamp, "updated_at": timestamp}
+    group_id = uuid.uuid4()
+    rows = {table: [] for table in [
+        node_group, entity_node, node_in_group, pipeline_run, dataset_from_data_source,
+        dataset_supported_in_pipeline, dataset_in_analysis, dataset_in_pipeline_run, pipeline_run_output_dataset
+    ]}
+    rows[node_group].append({"id": group_id, "name": "benchmark", **stamps})
+
+    for i in range(n_chains):
+        ids = {entity_type: uuid.uuid4() for entity_type in ["data_source", "dataset", "pipeline", "analysis"]}
+        run_id = uuid.uuid4()
+
+        for entity_type, entity_id in ids.items():
+            rows[entity_node].append({
+                "id": entity_id, "name": f"{entity_type}_{i}", "entity_type": entity_type,
+                "x_position": 0.0, "y_position": 0.0, **stamps
+            })
+            rows[node_in_group].append({"node_id": entity_id, "node_group_id": group_id, **stamps})
+
+        rows[pipeline_run].append({
+            "id": run_id, "pipeline_id": ids["pipeline"], "name": f"run_{i}", "status": "completed",
+            "start_time": timestamp, **stamps
+        })
+        rows[dataset_from_data_source].append(
+            {"data_source_id": ids["data_source"], "dataset_id": ids["dataset"], **stamps})
+        rows[dataset_supported_in_pipeline].append(
+            {"dataset_id": ids["dataset"], "pipeline_id": ids["pipeline"], **stamps})
+        rows[dataset_in_analysis].append(
+            {"dataset_id": ids["dataset"], "analysis_id": ids["analysis"], **stamps})
+        rows[dataset_in_pipeline_run].append(
+            {"dataset_id": ids["dataset"], "pipeline_run_id": run_id, **stamps})
+        rows[pipeline_run_output_dataset].append(
+            {"dataset_id": ids["dataset"], "pipeline_run_id": run_id, **stamps})
+
+    return group_id, rows
+
+
+async def _cleanup(rows: dict) -> None:
+    node_ids = [row["id"] for row in rows[entity_node]]
+    run_ids = [row["id"] for row in rows[pipeline_run]]
+    conditions = {
+        table: table.c.pipeline_run_id.in_(run_ids)
+        for table in [dataset_in_pipeline_run, pipeline_run_output_dataset]
+    }
+    conditions.update({
+        table: table.c.dataset_id.in_(node_ids)
+        for table in [dataset_from_data_source, dataset_supported_in_pipeline, dataset_in_analysis]
+    })
+    conditions[pipeline_run] = pipeline_run.c.id.in_(run_ids)
+    conditions[node_in_group] = node_in_group.c.node_id.in_(node_ids)
+    conditions[entity_node] = entity_node.c.id.in_(node_ids)
+    conditions[node_group] = node_group.c.id == rows[node_group][0]["id"]
+    await delete_rows(conditions)
+
+
+async def main():
+    graphs = EntityGraphs(uuid.uuid4())
+    print(f"{'chains':>8} {'nodes':>8} {'queries':>8} {'seconds':>10}")
+
+    for n_chains in GRAPH_SIZES:
+        group_id, rows = _build_graph_rows(n_chains)
+        await seed_rows(rows)
+        try:
+            with count_queries() as counter, timer() as elapsed:
+                entity_graph = await graphs.get_entity_graph(root_group_id=group_id)
+            assert len(entity_graph.datasets) == n_chains
+            print(f"{n_chains:>8} {len(rows[entity_node]):>8} {counter.count:>8} {elapsed['seconds']:>10.4f}")
+        finally:
+            await _cleanup(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+import sys
+import uuid
+import asyncio
+import resource
+import subprocess
+import pandas as pd
+from io import StringIO, BytesIO
+from datetime import datetime, timezone
+
+from kvasir_api.auth.models import users
+from kvasir_api.database.core import open_asyncpg_pool, close_asyncpg_pool, get_asyncpg_connection
+from kvasir_api.database.service import insert_df
+from kvasir_api.modules.data_objects.models import dataset, object_group, data_object
+from benchmarks.utils import timer, seed_rows, delete_rows
+
+
+# Bulk loads data_object rows through insert_df (pooled connection, binary COPY) and through the previous
+# per-call connection + CSV COPY, reporting rows/s and peak RSS. Each mode runs in its own process so peak RSS is comparable.
+# Run from the api directory with: python -m benchmarks.insert_df_throughput
+
+N_ROWS = 1_000_000
+MODES = ["csv", "binary"]
+
+
+def _build_data_objects(group_id: uuid.UUID, n_rows: int) -> pd.DataFrame:
+    timestamp = datetime.now(timezone.utc)
+    return pd.DataFrame({
+        "id": [uuid.uuid4() for _ in range(n_rows)],
+        "group_id": group_id,
+        "original_id": [f"series_{i}" for i in range(n_rows)],
+        "name": [f"Series {i}" for i in range(n_rows)],
+        "description": "benchmark object",
+        "additional_variables": [{"index": i, "source": "benchmark"} for i in range(n_rows)],
+        "created_at": timestamp,
+        "updated_at": timestamp,
+    })
+
+
+async def _insert_df_csv(df: pd.DataFrame, table_name: str, schema_name: str, chunk_size: int = 10000) -> None:
+    connection = await get_asyncpg_connection()
+    try:
+        df = df.assign(additional_variables=df["additional_variables"].map(pd.io.json.ujson_dumps))
+        async with connection.transaction():
+            for chunk in df.groupby(df.index // chunk_size):
+                string_buffer = StringIO()
+                chunk[1].to_csv(string_buffer, index=False, header=False)
+                buffer = BytesIO(string_buffer.getvalue().encode('utf-8'))
+                await connection.copy_to_table(
+                    table_name, schema_name=schema_name, source=buffer, columns=list(df.columns), format="csv")
+    finally:
+        await connection.close()
+
+
+async def run_mode(mode: str, n_rows: int) -> None:
+    timestamp = datetime.now(timezone.utc)
+    stamps = {"created_at": timestamp, "updated_at": timestamp}
+    user_id, dataset_id, group_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    await seed_rows({
+        users: [{"id": user_id, "email": f"{user_id}@benchmark", "name": "benchmark", **stamps}],
+        dataset: [{"id": dataset_id, "user_id": user_id, "name": "benchmark", "description": "benchmark", **stamps}],
+        object_group: [{"id": group_id, "dataset_id": dataset_id, "name": "benchmark", "description": "benchmark",
+                        "modality": "time_series", **stamps}],
+    })
+    df = _build_data_objects(group_id, n_rows)
+
+    try:
+        if mode == "binary":
+            await open_asyncpg_pool()
+        with timer() as elapsed:
+            if mode == "binary":
+                await insert_df(df, table_name="data_object", schema_name="data_objects")
+            else:
+                await _insert_df_csv(df, table_name="data_object", schema_name="data_objects")
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"{mode:>8} {n_rows:>10} {n_rows / elapsed['seconds']:>12.0f} {peak_rss_mb:>14.1f}")
+    finally:
+        await close_asyncpg_pool()
+        await delete_rows({
+            data_object: data_object.c.group_id == group_id,
+            object_group: object_group.c.id == group_id,
+            dataset: dataset.c.id == dataset_id,
+            users: users.c.id == user_id,
+        })
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else N_ROWS
+    print(f"{'mode':>8} {'rows':>10} {'rows/s':>12} {'peak RSS (MB)':>14}")
+    for mode in MODES:
+        subprocess.run([sys.executable, "-m", "benchmarks.insert_df_throughput", "--mode", mode, str(n_rows)], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--mode":
+        asyncio.run(run_mode(sys.argv[2], int(sys.argv[3])))
+    else:
+        main()
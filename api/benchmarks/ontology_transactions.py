@@ -0,0 +1,69 @@
+import asyncio
+import uuid
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+from kvasir_api.auth.models import users
+from kvasir_api.modules.entity_graph.models import node_group
+from kvasir_api.modules.ontology.service import create_ontology_for_user
+from kvasir_ontology.ontology import Ontology
+from kvasir_ontology.entities.data_source.data_model import DataSourceCreate
+from kvasir_ontology.entities.analysis.data_model import AnalysisCreate
+from kvasir_ontology.entities.pipeline.data_model import PipelineCreate
+from benchmarks.utils import count_queries, timer, seed_rows, delete_rows
+
+
+# Compares Ontology inserts/deletes committing after every statement against running each one in a single transaction.
+# One operation is an insert followed by a delete of the same entity.
+# Run from the api directory with: python -m benchmarks.ontology_transactions
+
+N_OPERATIONS = 50
+
+
+async def _insert_and_delete(ontology: Ontology, entity_type: str) -> None:
+    if entity_type == "data_source":
+        obj = await ontology.insert_data_source(
+            DataSourceCreate(name="benchmark.csv", description="benchmark", type="file"), [])
+        await ontology.delete_data_source(obj.id)
+    elif entity_type == "analysis":
+        obj = await ontology.insert_analysis(AnalysisCreate(name="benchmark"), [])
+        await ontology.delete_analysis(obj.id)
+    elif entity_type == "pipeline":
+        obj = await ontology.insert_pipeline(PipelineCreate(name="benchmark"), [])
+        await ontology.delete_pipeline(obj.id)
+
+
+async def main():
+    timestamp = datetime.now(timezone.utc)
+    user_id, group_id = uuid.uuid4(), uuid.uuid4()
+    await seed_rows({
+        users: [{"id": user_id, "email": f"{user_id}@benchmark", "name": "benchmark",
+                 "created_at": timestamp, "updated_at": timestamp}],
+        node_group: [{"id": group_id, "name": "benchmark", "created_at": timestamp, "updated_at": timestamp}],
+    })
+
+    try:
+        print(f"{'entity':>12} {'mode':>12} {'commits/op':>11} {'ms/op':>8}")
+        for entity_type in ["data_source", "analysis", "pipeline"]:
+            for mode in ["per-statement", "transaction"]:
+                ontology = create_ontology_for_user(user_id, group_id)
+                if mode == "per-statement":
+                    ontology.unit_of_work = nullcontext
+
+                # Warm up the connection pool
+                await _insert_and_delete(ontology, entity_type)
+
+                with count_queries() as counter, timer() as elapsed:
+                    for _ in range(N_OPERATIONS):
+                        await _insert_and_delete(ontology, entity_type)
+
+                print(
+                    f"{entity_type:>12} {mode:>12} {counter.commits / N_OPERATIONS:>11.1f} "
+                    f"{elapsed['seconds'] * 1000 / N_OPERATIONS:>8.2f}"
+                )
+    finally:
+        await delete_rows({node_group: node_group.c.id == group_id, users: users.c.id == user_id})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+import time
+from contextlib import contextmanager
+from sqlalchemy import event, text, insert, delete
+
+from kvasir_api.database.core import engine
+
+
+# Benchmarks run against the database configured in app_secrets and create (and clean up) their own rows.
+# Foreign key triggers are disabled on the seeding connection so graphs can be seeded without creating
+# the full entities behind them, which requires a superuser role on the benchmark database.
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.commits = 0
+
+    def _on_execute(self, *_):
+        self.count += 1
+
+    def _on_commit(self, *_):
+        self.commits += 1
+
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter._on_execute)
+    event.listen(engine.sync_engine, "commit", counter._on_commit)
+    try:
+        yield counter
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", counter._on_execute)
+        event.remove(engine.sync_engine, "commit", counter._on_commit)
+
+
+@contextmanager
+def timer():
+    result = {"seconds": 0.0}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - start
+
+
+async def seed_rows(rows_by_table: dict) -> None:
+    async with engine.connect() as connection:
+        await connection.execute(text("SET session_replication_role = replica"))
+        for table, rows in rows_by_table.items():
+            if rows:
+                await connection.execute(insert(table), rows)
+        await connection.commit()
+
+
+async def delete_rows(conditions_by_table: dict) -> None:
+    async with engine.connect() as connection:
+        await connection.execute(text("SET session_replication_role = replica"))
+        for table, condition in conditions_by_table.items():
+            await connection.execute(delete(table).where(condition))
+        await connection.commit()
+
@@ -40,6 +40,33 @@ async def get_db_connection() -> AsyncGenerator[AsyncConnection, None]:
         await connection.close()
 
 
-async def get_asyncpg_connection() -> asyncpg.Pool:
+# Raw asyncpg pool for bulk COPY, opened by the FastAPI lifespan and the taskiq worker startup
+asyncpg_pool: asyncpg.Pool | None = None
+
+
+async def get_asyncpg_connection() -> asyncpg.Connection:
     con = await asyncpg.connect(user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT, database=DB_NAME)
     return con
+
+
+async def open_asyncpg_pool() -> asyncpg.Pool:
+    global asyncpg_pool
+    if asyncpg_pool is None:
+        asyncpg_pool = await asyncpg.create_pool(
+            user=DB_USER,
+            password=DB_PASSWORD,
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            min_size=1,
+            max_size=DATABASE_POOL_SIZE,
+            max_inactive_connection_lifetime=DATABASE_POOL_TTL,
+        )
+    return asyncpg_pool
+
+
+async def close_asyncpg_pool() -> None:
+    global asyncpg_pool
+    if asyncpg_pool is not None:
+        await asyncpg_pool.close()
+        asyncpg_pool = None
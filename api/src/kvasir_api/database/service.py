@@ -1,15 +1,79 @@
+import json
+import asyncio
 import asyncpg
 import pandas as pd
-from typing import Any
-from io import StringIO, BytesIO
+from typing import Any, AsyncGenerator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from sqlalchemy import (
     CursorResult,
     Insert,
     Select,
     Update,
+    DateTime,
+    Integer,
+    JSON,
+    text,
 )
+from sqlalchemy.types import TypeEngine
 from sqlalchemy.ext.asyncio import AsyncConnection
-from kvasir_api.database.core import engine, get_asyncpg_connection
+from kvasir_api.database import core
+from kvasir_api.database.core import engine, metadata, get_asyncpg_connection
+
+
+class UnitOfWork:
+    """
+    One connection and one transaction shared by every query made inside a `transaction()` block.
+    """
+
+    def __init__(self, connection: AsyncConnection):
+        self.connection = connection
+        # asyncpg connections can only run one operation at a time, so tasks spawned inside the block take turns
+        self.lock = asyncio.Lock()
+        self.after_commit_callbacks: list[Callable[[], Awaitable[None]]] = []
+
+
+_unit_of_work: ContextVar[UnitOfWork | None] = ContextVar(
+    "unit_of_work", default=None)
+
+
+@asynccontextmanager
+async def transaction() -> AsyncGenerator[AsyncConnection, None]:
+    """
+    Run every fetch_one/fetch_all/execute/insert_df call without an explicit connection on one shared connection,
+    committing once when the block exits and rolling everything back if it raises.
+    commit_after is ignored inside the block, and nested blocks join the outermost one.
+    """
+    unit_of_work = _unit_of_work.get()
+    if unit_of_work is not None:
+        yield unit_of_work.connection
+        return
+
+    async with engine.connect() as connection:
+        unit_of_work = UnitOfWork(connection)
+        token = _unit_of_work.set(unit_of_work)
+        try:
+            yield connection
+            await connection.commit()
+        except BaseException:
+            await connection.rollback()
+            raise
+        finally:
+            _unit_of_work.reset(token)
+
+    for callback in unit_of_work.after_commit_callbacks:
+        await callback()
+
+
+async def after_commit(callback: Callable[[], Awaitable[None]]) -> None:
+    """
+    Run the callback once the current unit of work has committed, or right away if there is none.
+    """
+    unit_of_work = _unit_of_work.get()
+    if unit_of_work is None:
+        await callback()
+    else:
+        unit_of_work.after_commit_callbacks.append(callback)
 
 
 async def fetch_one(
@@ -18,8 +82,8 @@ async def fetch_one(
     commit_after: bool = False,
 ) -> dict[str, Any] | None:
     if not connection:
-        async with engine.connect() as connection:
-            cursor = await _execute_query(select_query, connection, commit_after)
+        async with _connect() as (connection, commit_after_allowed):
+            cursor = await _execute_query(select_query, connection, commit_after and commit_after_allowed)
             return cursor.first()._asdict() if cursor.rowcount > 0 else None
 
     cursor = await _execute_query(select_query, connection, commit_after)
@@ -32,8 +96,8 @@ async def fetch_all(
     commit_after: bool = False,
 ) -> list[dict[str, Any]]:
     if not connection:
-        async with engine.connect() as connection:
-            cursor = await _execute_query(select_query, connection, commit_after)
+        async with _connect() as (connection, commit_after_allowed):
+            cursor = await _execute_query(select_query, connection, commit_after and commit_after_allowed)
             return [r._asdict() for r in cursor.all()]
 
     cursor = await _execute_query(select_query, connection, commit_after)
@@ -46,12 +110,24 @@ async def execute(
     commit_after: bool = False,
 ) -> None:
     if not connection:
-        async with engine.connect() as connection:
-            return await _execute_query(query, connection, commit_after)
+        async with _connect() as (connection, commit_after_allowed):
+            return await _execute_query(query, connection, commit_after and commit_after_allowed)
 
     return await _execute_query(query, connection, commit_after)
 
 
+@asynccontextmanager
+async def _connect() -> AsyncGenerator[tuple[AsyncConnection, bool], None]:
+    unit_of_work = _unit_of_work.get()
+    if unit_of_work is None:
+        async with engine.connect() as connection:
+            yield connection, True
+        return
+
+    async with unit_of_work.lock:
+        yield unit_of_work.connection, False
+
+
 async def _execute_query(
     query: Select | Insert | Update,
     connection: AsyncConnection,
@@ -71,26 +147,73 @@ async def insert_df(
     connection: asyncpg.Connection = None,
     chunk_size: int = 10000
 ) -> None:
+    unit_of_work = _unit_of_work.get()
+    if not connection and unit_of_work is not None:
+        # Copy through the unit of work's driver connection so the rows join its transaction (as a savepoint)
+        async with unit_of_work.lock:
+            raw_connection = await unit_of_work.connection.get_raw_connection()
+            if not raw_connection.driver_connection.is_in_transaction():
+                # The transaction is only opened by the first statement, a copy on its own would commit immediately
+                await unit_of_work.connection.execute(text("SELECT 1"))
+            await _copy_df(df, table_name, schema_name, raw_connection.driver_connection, chunk_size)
+        return
+
+    if not connection and core.asyncpg_pool is not None:
+        async with core.asyncpg_pool.acquire() as connection:
+            await _copy_df(df, table_name, schema_name, connection, chunk_size)
+        return
+
+    # Scripts running outside the app or a worker have no pool
     own_connection = False
     if not connection:
         connection = await get_asyncpg_connection()
         own_connection = True
 
     try:
-        async with connection.transaction():
-            for chunk in df.groupby(df.index // chunk_size):
-                string_buffer = StringIO()
-                chunk[1].to_csv(string_buffer, index=False, header=False)
-                csv_data = string_buffer.getvalue().encode('utf-8')
-                buffer = BytesIO(csv_data)
-
-                await connection.copy_to_table(
-                    table_name,
-                    schema_name=schema_name,
-                    source=buffer,
-                    columns=list(df.columns),
-                    format="csv"
-                )
+        await _copy_df(df, table_name, schema_name, connection, chunk_size)
     finally:
         if own_connection:
             await connection.close()
+
+
+async def _copy_df(
+    df: pd.DataFrame,
+    table_name: str,
+    schema_name: str,
+    connection: asyncpg.Connection,
+    chunk_size: int
+) -> None:
+    table = metadata.tables.get(f"{schema_name}.{table_name}")
+    column_types = {
+        column: table.c[column].type if table is not None and column in table.c else None
+        for column in df.columns
+    }
+
+    async with connection.transaction():
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            records = zip(*[_to_copy_values(chunk[column], column_types[column]) for column in df.columns])
+
+            await connection.copy_records_to_table(
+                table_name,
+                schema_name=schema_name,
+                records=records,
+                columns=list(df.columns)
+            )
+
+
+def _to_copy_values(series: pd.Series, column_type: TypeEngine | None) -> list[Any]:
+    """
+    Convert a column to the Python values asyncpg's binary COPY encodes for the target column type.
+    The CSV path let Postgres parse text, so strings are still accepted for timestamps and dicts for JSON.
+    """
+    if isinstance(column_type, DateTime):
+        # asyncpg encodes pandas Timestamps several times slower than plain datetimes
+        series = pd.Series(pd.to_datetime(series, utc=True).array.to_pydatetime(), index=series.index, dtype=object)
+    elif isinstance(column_type, Integer) and pd.api.types.is_float_dtype(series):
+        series = series.astype("Int64")
+    elif isinstance(column_type, JSON) and series.dtype == object:
+        series = series.map(
+            lambda value: json.dumps(value) if isinstance(value, (dict, list)) else value)
+
+    return series.astype(object).where(series.notna(), None).tolist()
@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
@@ -15,11 +16,31 @@ from kvasir_api.modules.visualization.router import router as visualization_rout
 from kvasir_api.modules.waitlist.router import router as waitlist_router
 from kvasir_api.modules.project.router import router as project_router
 from kvasir_api.modules.codebase.router import router as codebase_router
+from kvasir_api.database.core import open_asyncpg_pool, close_asyncpg_pool
+from kvasir_api.modules.kvasir_v1.stream_retention import compact_streams_periodically
+from kvasir_api.modules.kvasir_v1.callbacks import ApplicationCallbacks
+from kvasir_agents.sandbox.modal import build_sandbox_image
+from kvasir_agents.sandbox.scheduler import log_scheduler_metrics_periodically
+from kvasir_agents.sandbox.local import start_warm_pool, stop_warm_pools
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await open_asyncpg_pool()
+    # Build the sandbox image in the background so the first project created doesn't wait for it
+    build_sandbox_image_task = asyncio.create_task(build_sandbox_image())
+    compact_streams_task = asyncio.create_task(compact_streams_periodically())
+    log_scheduler_metrics_task = asyncio.create_task(log_scheduler_metrics_periodically())
+    # Local sandbox containers for new projects, if KVASIR_SANDBOX_WARM_POOL_SIZE is set
+    start_warm_pool()
     yield
+    stop_warm_pools()
+    build_sandbox_image_task.cancel()
+    compact_streams_task.cancel()
+    log_scheduler_metrics_task.cancel()
+    # Write the logs still buffered, e.g. of chats run in the API process
+    await ApplicationCallbacks().flush_logs()
+    await close_asyncpg_pool()
 
 
 app = FastAPI(
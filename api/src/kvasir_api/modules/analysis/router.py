@@ -3,8 +3,8 @@ import time
 import redis
 import json
 from datetime import datetime, timezone
-from typing import Annotated, List, Union
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Annotated, List, Optional, Union
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from pydantic import BaseModel
@@ -43,6 +43,7 @@ SSE_MAX_TIMEOUT = 3600
 async def analysis_agent_sse(
     run_id: uuid.UUID,
     timeout: int = SSE_MAX_TIMEOUT,
+    last_event_id: Annotated[Optional[str], Header()] = None,
     user: Annotated[User, Depends(get_current_user)] = None,
     analysis_service: Annotated[AnalysisInterface,
                                 Depends(get_analysis_service)] = None
@@ -57,9 +58,9 @@ async def analysis_agent_sse(
     async def stream_run_updates():
         start_time = time.time()
 
-        async for item in analysis_service.listen_to_analysis_stream(run_id):
+        async for event_id, item in analysis_service.listen_to_analysis_stream(run_id, last_event_id):
             if isinstance(item, (Section, AnalysisCell)):
-                yield f"data: {item.model_dump_json(by_alias=True)}\n\n"
+                yield f"id: {event_id}\ndata: {item.model_dump_json(by_alias=True)}\n\n"
 
             # Check timeout
             if time.time() - start_time > timeout:
@@ -1,12 +1,13 @@
 import uuid
 import json
 from datetime import datetime, timezone
-from typing import List, Annotated, AsyncGenerator, Union, Optional
+from typing import List, Annotated, AsyncGenerator, Union, Optional, Tuple
 from sqlalchemy import select, insert, delete, update, func
 from fastapi import HTTPException, Depends
 
 from kvasir_api.database.service import fetch_all, execute, fetch_one
 from kvasir_api.redis import get_redis
+from kvasir_api.stream_hub import get_stream_hub, format_stream_event_id, parse_stream_event_id
 from kvasir_api.modules.analysis.models import (
     analysis,
     analysis_section,
@@ -19,6 +20,7 @@ from kvasir_api.modules.analysis.models import (
     result_table,
 )
 from kvasir_api.modules.kvasir_v1.models import analysis_run
+from kvasir_api.modules.kvasir_v1.stream_retention import ANALYSIS_STREAM_MAXLEN
 from kvasir_api.modules.visualization.service import Visualizations
 from kvasir_ontology.entities.analysis.data_model import (
     AnalysisBase,
@@ -1053,35 +1055,29 @@ class Analyses(AnalysisInterface):
     async def write_to_analysis_stream(self, run_id: uuid.UUID, message: Union[Section, AnalysisCell]) -> None:
         redis_stream = get_redis()
         message_json = message.model_dump_json(exclude_none=True)
-        await redis_stream.xadd(str(run_id) + "-analysis", {"data": message_json})
+        await redis_stream.xadd(
+            str(run_id) + "-analysis", {"data": message_json}, maxlen=ANALYSIS_STREAM_MAXLEN, approximate=True)
 
-    async def listen_to_analysis_stream(self, run_id: uuid.UUID) -> AsyncGenerator[Union[Section, AnalysisCell], None]:
-        redis_stream = get_redis()
+    async def listen_to_analysis_stream(self, run_id: uuid.UUID, last_event_id: Optional[str] = None) -> AsyncGenerator[Tuple[str, Union[Section, AnalysisCell]], None]:
         stream_key = str(run_id) + "-analysis"
+        # Resume after the last message the client got, if it is reconnecting
+        positions = {stream_key: parse_stream_event_id(last_event_id).get(stream_key) if last_event_id else None}
 
-        last_id = "$"
-        while True:
-            response = await redis_stream.xread({stream_key: last_id}, count=1, block=1000)
+        async for entry in get_stream_hub().listen(positions):
+            positions[stream_key] = entry.id
 
-            if not response:
+            message_json = entry.fields.get("data")
+            if not message_json:
                 continue
 
-            for _, messages in response:
-                for message_id, message_data in messages:
-                    last_id = message_id
-
-                    message_json = message_data.get("data")
-                    if not message_json:
-                        continue
+            parsed_data = json.loads(message_json)
 
-                    parsed_data = json.loads(message_json)
-
-                    if "type" in parsed_data and parsed_data["type"] in ["code", "markdown"]:
-                        cell = AnalysisCell.model_validate(parsed_data)
-                        yield cell
-                    else:
-                        section = Section.model_validate(parsed_data)
-                        yield section
+            if "type" in parsed_data and parsed_data["type"] in ["code", "markdown"]:
+                cell = AnalysisCell.model_validate(parsed_data)
+                yield format_stream_event_id(positions), cell
+            else:
+                section = Section.model_validate(parsed_data)
+                yield format_stream_event_id(positions), section
 
 
 # For dependency injection
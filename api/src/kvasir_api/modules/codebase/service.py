@@ -1,94 +1,40 @@
+import shlex
+import posixpath
 from uuid import UUID
-from typing import Annotated, List, Dict
-from pathlib import Path
+from typing import Annotated, Dict
 from fastapi import Depends
-import shlex
 
 from kvasir_ontology.code.data_model import CodebaseFile, CodebasePath, CodebaseFilePaginated
 from kvasir_ontology.code.interface import CodeInterface
 from kvasir_api.modules.entity_graph.service import EntityGraphs
 from kvasir_agents.sandbox.modal import ModalSandbox
+from kvasir_agents.sandbox.file_index import FileSnapshot
 from kvasir_api.auth.service import get_current_user
 from kvasir_api.auth.schema import User
 
 
-def _is_likely_file(path: str) -> bool:
-    path_obj = Path(path)
-    return bool(path_obj.suffix)
-
-
-def _parse_folder_structure_to_tree(folder_structure_output: str) -> CodebasePath:
-    lines = folder_structure_output.split('\n')
-    paths: List[str] = []
-
-    for line in lines:
-        line = line.strip()
-        # Skip header, empty lines, and truncation message
-        if (not line or
-            line.startswith('folder structure') or
-            line.startswith('[truncated') or
-            line.startswith('Error:') or
-                line == '(empty or does not exist)'):
-            continue
-        paths.append(line)
-
-    if not paths:
-        # Return empty root structure
-        return CodebasePath(path="/", is_file=False, sub_paths=[])
-
-    # Create root node
+def _build_codebase_tree(snapshot: FileSnapshot, max_leaves: int) -> CodebasePath:
     root_node = CodebasePath(path="/", is_file=False, sub_paths=[])
 
-    # Track all nodes by their full path for quick lookup
-    # Key: full path string, Value: CodebasePath node
-    path_nodes: Dict[str, CodebasePath] = {"/": root_node}
-
-    def get_or_create_node(full_path: str, parent_node: CodebasePath, component_name: str, is_file: bool) -> CodebasePath:
-        if full_path in path_nodes:
-            return path_nodes[full_path]
-
-        node = CodebasePath(
-            path=component_name,
-            is_file=is_file,
-            sub_paths=[]
-        )
-        path_nodes[full_path] = node
-        parent_node.sub_paths.append(node)
-        return node
-
-    # Process each path and create intermediate nodes
-    for path_str in paths:
-        # Normalize path - remove leading ./ or /
-        normalized = path_str.lstrip('./')
-        if not normalized:
-            continue
-
-        # Split into components
-        path_obj = Path(normalized)
-        components = path_obj.parts
-
-        # Navigate/create the tree path
-        current_node = root_node
-        current_path = "/"
-
-        for i, component in enumerate(components):
-            # Build full path up to this component
-            if current_path == "/":
-                current_path = component
-            else:
-                current_path = f"{current_path}/{component}"
-
-            # Determine if this is a file (only the last component can be a file)
-            is_file = (i == len(components) -
-                       1) and _is_likely_file(normalized)
-
-            # Get or create the node
-            current_node = get_or_create_node(
-                current_path,
-                current_node,
-                component,
-                is_file
+    # Track all nodes by their path relative to the snapshot root for quick lookup
+    path_nodes: Dict[str, CodebasePath] = {"": root_node}
+
+    for leaf_path in snapshot.get_leaf_paths()[:max_leaves]:
+        # Create the leaf and the directories above it that are not in the tree yet
+        missing_paths = []
+        current_path = posixpath.relpath(leaf_path, snapshot.root)
+        while current_path not in path_nodes:
+            missing_paths.append(current_path)
+            current_path = posixpath.dirname(current_path)
+
+        for current_path in reversed(missing_paths):
+            node = CodebasePath(
+                path=posixpath.basename(current_path),
+                is_file=not snapshot.entries[current_path].is_dir,
+                sub_paths=[]
             )
+            path_nodes[posixpath.dirname(current_path)].sub_paths.append(node)
+            path_nodes[current_path] = node
 
     return root_node
 
@@ -106,16 +52,13 @@ class Codebase(CodeInterface):
         sandbox = ModalSandbox(self.mount_group_id,
                                mount_group.python_package_name)
 
-        # Get folder structure from sandbox with high depth
-        folder_structure_output = await sandbox.get_folder_structure(
-            path=None,  # Use working directory
-            n_levels=20,  # High depth to get full structure
-            max_lines=10000  # High line limit
-        )
+        # Index the working directory with high depth, repeated requests only transfer what changed
+        try:
+            snapshot = await sandbox.snapshot_files(path=None, n_levels=20)
+        except RuntimeError:
+            return CodebasePath(path="/", is_file=False, sub_paths=[])
 
-        # Parse the output into CodebasePath tree
-        tree = _parse_folder_structure_to_tree(folder_structure_output)
-        return tree
+        return _build_codebase_tree(snapshot, max_leaves=10000)
 
     async def get_codebase_file(self, file_path: str) -> CodebaseFile:
         mount_group = await self.graph_service.get_node_group(self.mount_group_id)
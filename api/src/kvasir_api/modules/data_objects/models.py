@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table, UUID
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table, UUID, Index
 from sqlalchemy.dialects.postgresql import JSONB
 from kvasir_api.database.core import metadata
 
@@ -39,6 +39,8 @@ data_object = Table(
            default=datetime.now(timezone.utc), nullable=False),
     Column("updated_at", DateTime(timezone=True), default=datetime.now(timezone.utc),
            onupdate=datetime.now(timezone.utc), nullable=False),
+    # Objects are listed group by group, paginated on (group_id, id)
+    Index(None, "group_id", "id"),
     schema="data_objects",
 )
 
@@ -1,11 +1,13 @@
-import io
 import json
-import pandas as pd
+import asyncio
+import pyarrow as pa
+import pyarrow.parquet as pq
 from uuid import UUID
-from typing import Annotated, List, Union, Dict
+from typing import Annotated, List, Union, Dict, Optional
 from fastapi import APIRouter, Depends, HTTPException, Form, UploadFile, Query
+from fastapi.responses import StreamingResponse
 
-from kvasir_api.modules.data_objects.service import get_datasets_service
+from kvasir_api.modules.data_objects.service import get_datasets_service, ObjectsFileSource
 from kvasir_ontology.entities.dataset.interface import DatasetInterface
 from kvasir_ontology.entities.dataset.data_model import (
     Dataset,
@@ -13,6 +15,7 @@ from kvasir_ontology.entities.dataset.data_model import (
     ObjectGroup,
     ObjectGroupWithObjects,
     DataObject,
+    DataObjectsPage,
     ObjectsFile,
     ObjectGroupCreate,
 )
@@ -24,24 +27,29 @@ from kvasir_api.auth.schema import User
 router = APIRouter()
 
 
-async def _convert_upload_files_to_dataframes(files: List[UploadFile]) -> Dict[str, pd.DataFrame]:
-
+async def _convert_upload_files_to_dataframes(files: List[UploadFile]) -> Dict[str, ObjectsFileSource]:
+    """
+    Open the uploads as parquet files without reading them, the service reads them batch by batch from the spooled file.
+    """
     filename_to_dataframe = {}
     for file in files:
-        content = await file.read()
-        df = pd.read_parquet(io.BytesIO(content))
-        filename_to_dataframe[file.filename] = df
+        try:
+            # Reading the footer is blocking
+            filename_to_dataframe[file.filename] = await asyncio.to_thread(pq.ParquetFile, file.file)
+        except pa.ArrowInvalid as e:
+            raise HTTPException(
+                status_code=400, detail=f"Invalid parquet file {file.filename}: {e}")
     return filename_to_dataframe
 
 
 async def _get_matched_dataframes(
     files: List[UploadFile],
     objects_files: List[ObjectsFile]
-) -> Dict[str, pd.DataFrame]:
+) -> Dict[str, ObjectsFileSource]:
     filename_to_dataframe = await _convert_upload_files_to_dataframes(files)
 
     # Verify all required files are present and create filtered mapping
-    matched_dataframes = {}
+    matched_dataframes: Dict[str, ObjectsFileSource] = {}
     for objects_file in objects_files:
         if objects_file.filename not in filename_to_dataframe:
             raise HTTPException(
@@ -99,7 +107,7 @@ async def post_object_group(
     return await dataset_service.add_object_group(dataset_id, group_create, group_filename_to_dataframe)
 
 
-@router.post("/objects/{group_id}", response_model=List[DataObject])
+@router.post("/objects/{group_id}", response_model=List[UUID])
 async def post_objects(
     group_id: UUID,
     files: List[UploadFile] = None,
@@ -107,7 +115,7 @@ async def post_objects(
     user: Annotated[User, Depends(get_current_user)] = None,
     dataset_service: Annotated[DatasetInterface,
                                Depends(get_datasets_service)] = None
-) -> List[DataObject]:
+) -> List[UUID]:
 
     if not files or len(files) == 0:
         raise HTTPException(
@@ -168,23 +176,71 @@ async def fetch_object_group(
     return groups[0]
 
 
-@router.get("/object-groups-in-dataset/{dataset_id}", response_model=List[ObjectGroupWithObjects])
+@router.get("/object-groups-in-dataset/{dataset_id}", response_model=List[Union[ObjectGroupWithObjects, ObjectGroup]])
 async def fetch_object_groups_in_dataset(
     dataset_id: UUID,
+    include_objects: bool = True,
     user: Annotated[User, Depends(get_current_user)] = None,
     dataset_service: Annotated[DatasetInterface,
                                Depends(get_datasets_service)] = None
-) -> List[ObjectGroupWithObjects]:
-    """Get all object groups in a dataset"""
+) -> List[Union[ObjectGroupWithObjects, ObjectGroup]]:
+    """Get all object groups in a dataset, page through the objects with /data-objects-in-dataset for large datasets"""
 
     if not await user_owns_dataset(user.id, dataset_id):
         raise HTTPException(
             status_code=403, detail="Not authorized to access this dataset")
 
-    groups = await dataset_service.get_object_groups(dataset_id=dataset_id, include_objects=True)
+    groups = await dataset_service.get_object_groups(dataset_id=dataset_id, include_objects=include_objects)
     return groups
 
 
+@router.get("/data-objects-in-dataset/{dataset_id}", response_model=DataObjectsPage)
+async def fetch_data_objects_in_dataset(
+    dataset_id: UUID,
+    group_ids: Optional[List[UUID]] = Query(None),
+    limit: int = Query(1000, ge=1, le=10000),
+    cursor: Optional[str] = Query(None),
+    user: Annotated[User, Depends(get_current_user)] = None,
+    dataset_service: Annotated[DatasetInterface,
+                               Depends(get_datasets_service)] = None
+) -> DataObjectsPage:
+    """Get a page of the data objects in a dataset, pass next_cursor back to get the next page"""
+
+    if not await user_owns_dataset(user.id, dataset_id):
+        raise HTTPException(
+            status_code=403, detail="Not authorized to access this dataset")
+
+    return await dataset_service.get_data_objects_page(group_ids=group_ids, dataset_id=dataset_id, limit=limit, cursor=cursor)
+
+
+@router.get("/data-objects-in-dataset/{dataset_id}/stream")
+async def stream_data_objects_in_dataset(
+    dataset_id: UUID,
+    group_ids: Optional[List[UUID]] = Query(None),
+    page_size: int = Query(1000, ge=1, le=10000),
+    user: Annotated[User, Depends(get_current_user)] = None,
+    dataset_service: Annotated[DatasetInterface,
+                               Depends(get_datasets_service)] = None
+) -> StreamingResponse:
+    """Stream all data objects in a dataset as newline-delimited JSON, one object per line"""
+
+    if not await user_owns_dataset(user.id, dataset_id):
+        raise HTTPException(
+            status_code=403, detail="Not authorized to access this dataset")
+
+    async def stream_data_objects():
+        cursor = None
+        while True:
+            page = await dataset_service.get_data_objects_page(
+                group_ids=group_ids, dataset_id=dataset_id, limit=page_size, cursor=cursor)
+            yield "".join(f"{obj.model_dump_json()}\n" for obj in page.objects)
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+
+    return StreamingResponse(stream_data_objects(), media_type="application/x-ndjson")
+
+
 @router.get("/data-object/{object_id}", response_model=DataObject)
 async def fetch_data_object(
     object_id: UUID,
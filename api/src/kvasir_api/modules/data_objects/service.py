@@ -1,11 +1,15 @@
 import json
 import uuid
+import asyncio
 import numpy as np
 import pandas as pd
-import jsonschema
-from typing import List, Optional, Union, Any, Annotated, Tuple, Dict
+import pyarrow.parquet as pq
+from collections import defaultdict
+from typing import List, Optional, Union, Any, Annotated, Tuple, Dict, Literal, AsyncGenerator, get_args, get_origin
 from datetime import datetime, timezone
-from sqlalchemy import insert, select, update, delete
+from pydantic import BaseModel
+from sqlalchemy import insert, select, update, delete, tuple_
+from sqlalchemy.dialects.postgresql import JSONB
 from fastapi import HTTPException, Depends
 
 from kvasir_api.auth.service import get_current_user
@@ -20,7 +24,7 @@ from kvasir_api.modules.data_objects.models import (
     tabular,
 )
 from kvasir_api.modules.visualization.service import Visualizations
-from kvasir_api.database.service import execute, fetch_all, insert_df
+from kvasir_api.database.service import execute, fetch_all, insert_df, transaction
 from kvasir_api.app_secrets import API_URL
 from kvasir_ontology.entities.dataset.data_model import (
     DatasetBase,
@@ -34,10 +38,13 @@ from kvasir_ontology.entities.dataset.data_model import (
     DataObject,
     ObjectGroup,
     ObjectGroupWithObjects,
+    DataObjectsPage,
     DatasetCreate,
     ObjectGroupCreate,
     DataObjectCreate,
     ObjectsFile,
+    TimeSeriesCreate,
+    TabularRowCreate,
 )
 from kvasir_ontology.entities.dataset.interface import DatasetInterface
 from kvasir_ontology.visualization.data_model import EchartCreate
@@ -53,6 +60,17 @@ OBJECT_MODALITY_TABLE_MAPPING = {
     "tabular": tabular,
 }
 
+OBJECT_MODALITY_CREATE_MAPPING = {
+    "time_series": TimeSeriesCreate,
+    "tabular": TabularRowCreate,
+}
+
+# Objects files are validated and inserted this many rows at a time, which bounds memory for parquet uploads
+OBJECTS_FILE_BATCH_SIZE = 50_000
+
+# Objects files are either in memory or uploaded parquet files that are read batch by batch
+ObjectsFileSource = Union[pd.DataFrame, pq.ParquetFile]
+
 
 def _get_modality_table_and_model(modality: str, entity_type: str):
     """Helper to get table, table name, and model class for a modality"""
@@ -80,23 +98,155 @@ def _get_modality_table_and_model(modality: str, entity_type: str):
     return table, table_name, model_class
 
 
-def _convert_numpy_to_native(obj: Any) -> Any:
+def _to_json_native(obj: Any) -> Any:
     """
-    Recursively convert all numpy arrays in a data structure to native Python types.
+    json.dumps default for the numpy values parquet columns are read as, size 1 arrays become scalars.
     """
     if isinstance(obj, np.ndarray):
-        if obj.size == 1:
-            return _convert_numpy_to_native(obj.item())
-        else:
-            return [_convert_numpy_to_native(item) for item in obj.tolist()]
-    elif isinstance(obj, dict):
-        return {key: _convert_numpy_to_native(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [_convert_numpy_to_native(item) for item in obj]
-    elif isinstance(obj, (np.integer, np.floating)):
+        return obj.item() if obj.size == 1 else obj.tolist()
+    if isinstance(obj, np.generic):
         return obj.item()
-    else:
-        return obj
+    raise TypeError(
+        f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _serialize_json_column(series: pd.Series) -> pd.Series:
+    encoder = json.JSONEncoder(default=_to_json_native)
+    values = [None if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value))
+              else encoder.encode(value) for value in series.tolist()]
+    return pd.Series(values, index=series.index, dtype=object)
+
+
+def _validate_columns(df: pd.DataFrame, model_class: type[BaseModel], column_prefix: str = "") -> None:
+    """
+    Check every row of the columns against the field types of the model, one vectorized check per column.
+    """
+    for field_name, field in model_class.model_fields.items():
+        column_name = f"{column_prefix}{field_name}"
+        annotation = field.annotation
+        nullable = not field.is_required()
+        if get_origin(annotation) is Union and type(None) in get_args(annotation):
+            nullable = True
+            annotation = next(
+                arg for arg in get_args(annotation) if arg is not type(None))
+
+        if field_name not in df.columns:
+            if field.is_required():
+                raise HTTPException(
+                    status_code=400, detail=f"'{column_name}' is a required property")
+            continue
+
+        series = df[field_name]
+        null_mask = series.isna()
+        if not nullable and null_mask.any():
+            raise HTTPException(
+                status_code=400,
+                detail=f"'{column_name}' must not be null (row {null_mask.idxmax()})"
+            )
+        values = series[~null_mask]
+        if values.empty:
+            continue
+
+        inferred_type = pd.api.types.infer_dtype(values)
+        if annotation is str:
+            valid = inferred_type == "string"
+        elif annotation is int:
+            valid = inferred_type == "integer" or (
+                inferred_type in ("floating", "mixed-integer-float") and bool((pd.to_numeric(values) % 1 == 0).all()))
+        elif annotation is datetime:
+            valid = not pd.to_datetime(values, utc=True, format="ISO8601", errors="coerce").isna().any()
+        elif get_origin(annotation) is Literal:
+            valid = bool(values.isin(get_args(annotation)).all())
+        elif annotation is dict or get_origin(annotation) is dict:
+            valid = bool(values.map(lambda value: isinstance(value, dict)).all())
+        else:
+            continue
+
+        if not valid:
+            expected = f"one of {list(get_args(annotation))}" if get_origin(annotation) is Literal \
+                else getattr(annotation, "__name__", str(annotation))
+            raise HTTPException(
+                status_code=400, detail=f"'{column_name}' has values that are not {expected}")
+
+
+async def _iter_objects_file_batches(source: ObjectsFileSource) -> AsyncGenerator[pd.DataFrame, None]:
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), OBJECTS_FILE_BATCH_SIZE):
+            yield source.iloc[start:start + OBJECTS_FILE_BATCH_SIZE]
+        return
+
+    # Parquet decoding is blocking, so each batch is read off the event loop
+    batches = source.iter_batches(batch_size=OBJECTS_FILE_BATCH_SIZE)
+    while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+        yield batch.to_pandas()
+
+
+def _data_objects_cursor(obj: DataObject) -> str:
+    return f"{obj.group_id}:{obj.id}"
+
+
+def _parse_data_objects_cursor(cursor: str) -> Tuple[uuid.UUID, uuid.UUID]:
+    try:
+        group_id, object_id = cursor.split(":")
+        return uuid.UUID(group_id), uuid.UUID(object_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid cursor: {cursor}")
+
+
+def _prepare_data_objects(
+    df: pd.DataFrame,
+    modality: str,
+    object_group_id: uuid.UUID
+) -> Tuple[pd.DataFrame, pd.DataFrame, List[uuid.UUID]]:
+    """
+    Validate an objects file and split it into the data_object rows and the modality table rows, ready for insert_df.
+    """
+    if "modality_fields" not in df.columns:
+        raise HTTPException(
+            status_code=400,
+            detail=f"DataFrame missing required 'modality_fields' column"
+        )
+    if not df["modality_fields"].map(lambda value: isinstance(value, dict)).all():
+        raise HTTPException(
+            status_code=400, detail="'modality_fields' must be an object in every row")
+
+    _validate_columns(df, DataObjectCreate)
+
+    # Get parent fields from DataObjectBase, excluding auto-generated fields
+    parent_fields = set(DataObjectBase.model_fields.keys()) - \
+        {"id", "created_at", "updated_at", "group_id"}
+    parent_df = df[[
+        col for col in parent_fields if col in df.columns]].reset_index(drop=True)
+
+    # Flatten the nested modality_fields column into one column per field
+    modality_fields_df = pd.DataFrame.from_records(
+        df["modality_fields"].tolist())
+    _validate_columns(
+        modality_fields_df, OBJECT_MODALITY_CREATE_MAPPING[modality], column_prefix="modality_fields.")
+
+    # Serialize the JSONB columns in one pass each, numpy values included
+    for frame, table in [(parent_df, data_object), (modality_fields_df, OBJECT_MODALITY_TABLE_MAPPING[modality])]:
+        for col in frame.columns:
+            if col in table.c and isinstance(table.c[col].type, JSONB):
+                try:
+                    frame[col] = _serialize_json_column(frame[col])
+                except (TypeError, ValueError) as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+
+    object_ids = [uuid.uuid4() for _ in range(len(parent_df))]
+    now = datetime.now(timezone.utc)
+
+    parent_df["id"] = object_ids
+    parent_df["created_at"] = now
+    parent_df["updated_at"] = now
+    parent_df["group_id"] = object_group_id
+
+    modality_fields_df["id"] = object_ids
+    modality_fields_df["created_at"] = now
+    modality_fields_df["updated_at"] = now
+
+    return parent_df, modality_fields_df, object_ids
 
 
 class Datasets(DatasetInterface):
@@ -104,7 +254,7 @@ class Datasets(DatasetInterface):
         super().__init__(user_id, bearer_token)
         self.visualization_service = Visualizations(user_id)
 
-    async def create_dataset(self, dataset_create: DatasetCreate, filename_to_dataframe: Optional[Dict[str, pd.DataFrame]] = None) -> Dataset:
+    async def create_dataset(self, dataset_create: DatasetCreate, filename_to_dataframe: Optional[Dict[str, ObjectsFileSource]] = None) -> Dataset:
         extra_fields = dataset_create.model_extra or {}
 
         dataset_obj = DatasetBase(
@@ -129,7 +279,7 @@ class Datasets(DatasetInterface):
 
         return await self.get_dataset(dataset_obj.id)
 
-    async def add_object_group(self, dataset_id: uuid.UUID, object_group_create: ObjectGroupCreate, filename_to_dataframe: Dict[str, pd.DataFrame]) -> ObjectGroup:
+    async def add_object_group(self, dataset_id: uuid.UUID, object_group_create: ObjectGroupCreate, filename_to_dataframe: Dict[str, ObjectsFileSource]) -> ObjectGroup:
         # Object groups must have data objects - no empty groups
         if len(filename_to_dataframe) == 0 or not object_group_create.objects_files:
             raise HTTPException(
@@ -163,81 +313,39 @@ class Datasets(DatasetInterface):
 
         return await self.get_object_group(object_group_data.id)
 
-    async def add_data_objects(self, object_group_id: uuid.UUID, metadata: List[ObjectsFile], filename_to_dataframe: Dict[str, pd.DataFrame]) -> List[DataObject]:
-        created_objects = []
-
-        # Match by filename - just like the old code
-        for objects_file in metadata:
-            if objects_file.filename not in filename_to_dataframe:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"No dataframe found for file: {objects_file.filename}"
-                )
-
-            df = filename_to_dataframe[objects_file.filename]
-            if len(df) == 0:
-                raise HTTPException(
-                    status_code=400, detail="DataFrame is empty")
-
-            # Use map() for pandas 2.0+, fallback to applymap() for older versions
-            try:
-                df = df.map(_convert_numpy_to_native)
-            except AttributeError:
-                # Fallback for pandas < 2.0
-                df = df.applymap(_convert_numpy_to_native)
-
-            first_row = df.iloc[0].to_dict()
-            try:
-                jsonschema.validate(
-                    first_row, DataObjectCreate.model_json_schema())
-            except jsonschema.ValidationError as e:
-                raise HTTPException(status_code=400, detail=str(e))
-
-            # Get parent fields from DataObjectBase, excluding auto-generated fields
-            parent_fields = set(DataObjectBase.model_fields.keys()) - \
-                {"id", "created_at", "updated_at", "group_id"}
-            parent_df = df[[
-                col for col in parent_fields if col in df.columns]].copy()
-
-            # Extract modality fields from the nested modality_fields column
-            if "modality_fields" not in df.columns:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"DataFrame missing required 'modality_fields' column"
-                )
-            modality_fields_list = df["modality_fields"].tolist()
-            modality_fields_df = pd.DataFrame(modality_fields_list)
-
-            # Convert dict values to JSON strings for JSONB columns
-            try:
-                for col in modality_fields_df.columns:
-                    modality_fields_df[col] = modality_fields_df[col].apply(
-                        lambda x: json.dumps(x) if isinstance(x, dict) else x)
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=str(e))
-
-            object_ids = [uuid.uuid4() for _ in range(len(parent_df))]
-            now = datetime.now(timezone.utc)
+    async def add_data_objects(self, object_group_id: uuid.UUID, metadata: List[ObjectsFile], filename_to_dataframe: Dict[str, ObjectsFileSource]) -> List[uuid.UUID]:
+        created_object_ids = []
+
+        # All batches of all files go in one transaction, so a file failing validation part way leaves nothing behind
+        async with transaction():
+            # Match by filename - just like the old code
+            for objects_file in metadata:
+                if objects_file.filename not in filename_to_dataframe:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"No dataframe found for file: {objects_file.filename}"
+                    )
 
-            parent_df["id"] = object_ids
-            parent_df["created_at"] = now
-            parent_df["updated_at"] = now
-            parent_df["group_id"] = object_group_id
+                _, modality_table_name, _ = _get_modality_table_and_model(
+                    objects_file.modality, "data_object")
 
-            modality_fields_df["id"] = object_ids
-            modality_fields_df["created_at"] = now
-            modality_fields_df["updated_at"] = now
+                num_objects = 0
+                async for df in _iter_objects_file_batches(filename_to_dataframe[objects_file.filename]):
+                    parent_df, modality_fields_df, object_ids = _prepare_data_objects(
+                        df, objects_file.modality, object_group_id)
 
-            _, modality_table_name, _ = _get_modality_table_and_model(
-                objects_file.modality, "data_object")
+                    await insert_df(parent_df, table_name="data_object", schema_name="data_objects")
+                    await insert_df(modality_fields_df, table_name=modality_table_name, schema_name="data_objects")
 
-            await insert_df(parent_df, table_name="data_object", schema_name="data_objects")
-            await insert_df(modality_fields_df, table_name=modality_table_name, schema_name="data_objects")
+                    created_object_ids.extend(object_ids)
+                    num_objects += len(object_ids)
 
-            # Get the created objects
-            created_objects.extend(await self.get_data_objects(object_ids=object_ids))
+                if num_objects == 0:
+                    raise HTTPException(
+                        status_code=400, detail="DataFrame is empty")
 
-        return created_objects
+        # Only the ids, the objects can be paged through with get_data_objects_page rather than all read back at once
+        return created_object_ids
 
     async def get_datasets(self, dataset_ids: Optional[List[uuid.UUID]] = None) -> List[Dataset]:
         """Get all datasets for a user"""
@@ -259,87 +367,19 @@ class Datasets(DatasetInterface):
             object_group.c.dataset_id.in_(dataset_ids_list)
         )
         object_groups_result = await fetch_all(object_groups_query)
+        object_groups = await self._assemble_object_groups(object_groups_result)
 
-        group_ids = [group["id"] for group in object_groups_result]
-
-        # Query modality-specific group tables if we have group_ids
-        time_series_groups_result = []
-        tabular_groups_result = []
-        if group_ids:
-            time_series_groups_query = select(time_series_group).where(
-                time_series_group.c.id.in_(group_ids)
-            )
-            time_series_groups_result = await fetch_all(time_series_groups_query)
-
-            tabular_groups_query = select(tabular_group).where(
-                tabular_group.c.id.in_(group_ids)
-            )
-            tabular_groups_result = await fetch_all(tabular_groups_query)
-
-        # Get first data object for each group
-        first_data_objects = {}
-        if group_ids:
-            first_object_ids_query = select(
-                data_object.c.group_id,
-                data_object.c.id
-            ).where(
-                data_object.c.group_id.in_(group_ids)
-            ).order_by(
-                data_object.c.group_id,
-                data_object.c.created_at
-            ).distinct(data_object.c.group_id)
-
-            first_object_ids_result = await fetch_all(first_object_ids_query)
-            first_object_ids = [row["id"] for row in first_object_ids_result]
-
-            if first_object_ids:
-                first_objects = await self.get_data_objects(object_ids=first_object_ids)
-                first_data_objects = {
-                    obj.group_id: obj for obj in first_objects}
+        dataset_id_to_object_groups: Dict[uuid.UUID, List[ObjectGroup]] = defaultdict(list)
+        for group in object_groups:
+            dataset_id_to_object_groups[group.dataset_id].append(group)
 
         # Prepare the final records
         result_records = []
         for dataset_result in datasets_result:
             dataset_obj = DatasetBase(**dataset_result)
-
-            # Create object groups
-            all_object_groups: List[ObjectGroup] = []
-            for group in object_groups_result:
-                if group["dataset_id"] == dataset_obj.id:
-                    if group["modality"] == "time_series":
-                        modality_record = next(
-                            (ts_record for ts_record in time_series_groups_result if ts_record["id"] == group["id"]), None)
-                        if modality_record is None:
-                            raise ValueError(
-                                f"Time series group data not found for group {group['id']}")
-                        modality_fields = TimeSeriesGroupBase(
-                            **modality_record)
-                    elif group["modality"] == "tabular":
-                        modality_record = next(
-                            (tab_record for tab_record in tabular_groups_result if tab_record["id"] == group["id"]), None)
-                        if modality_record is None:
-                            raise ValueError(
-                                f"Tabular group data not found for group {group['id']}")
-                        modality_fields = TabularGroupBase(**modality_record)
-                    else:
-                        raise ValueError(
-                            f"Unknown modality: {group['modality']}")
-
-                    # Create ObjectGroup
-                    first_data_object = first_data_objects.get(group["id"])
-                    if first_data_object is None:
-                        raise ValueError(
-                            f"Object group {group['id']} has no data objects. Groups must have at least one data object.")
-                    object_group_obj = ObjectGroup(
-                        **group,
-                        modality_fields=modality_fields,
-                        first_data_object=first_data_object
-                    )
-                    all_object_groups.append(object_group_obj)
-
             record = Dataset(
                 **dataset_obj.model_dump(),
-                object_groups=all_object_groups
+                object_groups=dataset_id_to_object_groups[dataset_obj.id]
             )
 
             result_records.append(record)
@@ -369,55 +409,60 @@ class Datasets(DatasetInterface):
                 object_group.c.id.in_(group_ids))
 
         object_groups_result = await fetch_all(object_group_query)
-        object_group_ids = [group["id"] for group in object_groups_result]
+        return await self._assemble_object_groups(object_groups_result, include_objects=include_objects)
 
-        time_series_groups_result = []
-        tabular_groups_result = []
-        if object_group_ids:
-            time_series_groups_query = select(time_series_group).where(
-                time_series_group.c.id.in_(object_group_ids))
-            time_series_groups_result = await fetch_all(time_series_groups_query)
+    async def _assemble_object_groups(
+        self,
+        object_groups_result: List[Dict[str, Any]],
+        include_objects: bool = False,
+    ) -> List[Union[ObjectGroupWithObjects, ObjectGroup]]:
+        """
+        Attach modality fields, first data objects and optionally all objects to object group records, in their order.
+        The related rows are fetched once per table and indexed by group id.
+        """
+        object_group_ids = [group["id"] for group in object_groups_result]
+        if not object_group_ids:
+            return []
 
-            tabular_groups_query = select(tabular_group).where(
-                tabular_group.c.id.in_(object_group_ids))
-            tabular_groups_result = await fetch_all(tabular_groups_query)
+        modality_to_group_records: Dict[str, Dict[uuid.UUID, Dict[str, Any]]] = {}
+        for modality, table in [("time_series", time_series_group), ("tabular", tabular_group)]:
+            records = await fetch_all(select(table).where(table.c.id.in_(object_group_ids)))
+            modality_to_group_records[modality] = {
+                record["id"]: record for record in records}
+
+        first_object_ids_query = select(
+            data_object.c.group_id,
+            data_object.c.id
+        ).where(
+            data_object.c.group_id.in_(object_group_ids)
+        ).order_by(
+            data_object.c.group_id,
+            data_object.c.created_at
+        ).distinct(data_object.c.group_id)
+
+        first_object_ids_result = await fetch_all(first_object_ids_query)
+        first_object_ids = [row["id"] for row in first_object_ids_result]
 
         first_data_objects = {}
-        if object_group_ids:
-            first_object_ids_query = select(
-                data_object.c.group_id,
-                data_object.c.id
-            ).where(
-                data_object.c.group_id.in_(object_group_ids)
-            ).order_by(
-                data_object.c.group_id,
-                data_object.c.created_at
-            ).distinct(data_object.c.group_id)
-
-            first_object_ids_result = await fetch_all(first_object_ids_query)
-            first_object_ids = [row["id"] for row in first_object_ids_result]
+        if first_object_ids:
+            first_objects = await self.get_data_objects(object_ids=first_object_ids)
+            first_data_objects = {obj.group_id: obj for obj in first_objects}
 
-            if first_object_ids:
-                first_objects = await self.get_data_objects(object_ids=first_object_ids)
-                first_data_objects = {
-                    obj.group_id: obj for obj in first_objects}
-
-        data_object_records = None
+        group_id_to_objects: Dict[uuid.UUID, List[DataObject]] = defaultdict(list)
         if include_objects:
-            data_object_records = await self.get_data_objects(group_ids=object_group_ids)
+            for obj in await self.get_data_objects(group_ids=object_group_ids):
+                group_id_to_objects[obj.group_id].append(obj)
 
         result_records = []
         for group in object_groups_result:
             if group["modality"] == "time_series":
-                structure_fields = next(
-                    (ts_group for ts_group in time_series_groups_result if ts_group["id"] == group["id"]), None)
+                structure_fields = modality_to_group_records["time_series"].get(group["id"])
                 if structure_fields is None:
                     raise ValueError(
                         f"Time series group data not found for group {group['id']}")
                 modality_fields = TimeSeriesGroupBase(**structure_fields)
             elif group["modality"] == "tabular":
-                structure_fields = next(
-                    (tab_group for tab_group in tabular_groups_result if tab_group["id"] == group["id"]), None)
+                structure_fields = modality_to_group_records["tabular"].get(group["id"])
                 if structure_fields is None:
                     raise ValueError(
                         f"Tabular group data not found for group {group['id']}")
@@ -431,13 +476,11 @@ class Datasets(DatasetInterface):
                     f"Object group {group['id']} has no data objects. Groups must have at least one data object.")
 
             if include_objects:
-                objects_in_group = [
-                    obj_rec for obj_rec in data_object_records if obj_rec.group_id == group["id"]]
                 result_records.append(ObjectGroupWithObjects(
                     **ObjectGroupBase(**group).model_dump(),
                     modality_fields=modality_fields,
                     first_data_object=first_data_object,
-                    objects=objects_in_group
+                    objects=group_id_to_objects[group["id"]]
                 ))
             else:
                 result_records.append(ObjectGroup(
@@ -479,7 +522,57 @@ class Datasets(DatasetInterface):
                 data_object.c.group_id.in_(group_ids))
 
         objects_result = await fetch_all(objects_query)
+        return await self._assemble_data_objects(objects_result)
+
+    async def get_data_objects_page(
+        self,
+        group_ids: Optional[List[uuid.UUID]] = None,
+        dataset_id: Optional[uuid.UUID] = None,
+        limit: int = 1000,
+        cursor: Optional[str] = None
+    ) -> DataObjectsPage:
+        if group_ids is None and dataset_id is None:
+            raise ValueError("Either group_ids or dataset_id must be provided")
+
+        objects_query = select(
+            data_object,
+            object_group.c.modality
+        ).join(
+            object_group,
+            data_object.c.group_id == object_group.c.id
+        )
+
+        if group_ids is not None:
+            objects_query = objects_query.where(
+                data_object.c.group_id.in_(group_ids))
+        if dataset_id is not None:
+            objects_query = objects_query.where(
+                object_group.c.dataset_id == dataset_id)
+        if cursor is not None:
+            cursor_group_id, cursor_object_id = _parse_data_objects_cursor(cursor)
+            objects_query = objects_query.where(
+                tuple_(data_object.c.group_id, data_object.c.id) > tuple_(cursor_group_id, cursor_object_id))
+
+        # Fetch one extra row to know whether there is a next page without counting
+        objects_query = objects_query.order_by(
+            data_object.c.group_id,
+            data_object.c.id
+        ).limit(limit + 1)
+
+        objects_result = await fetch_all(objects_query)
+        has_next_page = len(objects_result) > limit
+        objects = await self._assemble_data_objects(objects_result[:limit])
+
+        next_cursor = None
+        if has_next_page:
+            next_cursor = _data_objects_cursor(objects[-1])
+
+        return DataObjectsPage(objects=objects, next_cursor=next_cursor)
 
+    async def _assemble_data_objects(self, objects_result: List[Dict[str, Any]]) -> List[DataObject]:
+        """
+        Attach the modality fields to data object records joined with their group's modality, in their order.
+        """
         if not objects_result:
             return []
 
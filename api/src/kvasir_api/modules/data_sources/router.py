@@ -1,4 +1,3 @@
-import io
 from typing import Annotated, List
 from fastapi import APIRouter, Depends, UploadFile, Form
 from uuid import UUID
@@ -77,6 +76,7 @@ async def create_files_data_sources_endpoint(
                                    Depends(get_data_sources_service)]
 ) -> List[DataSource]:
     """Create files data sources"""
-    file_bytes = [io.BytesIO(await file.read()) for file in files]
+    # Hand over the spooled uploads rather than reading them into memory
+    file_bytes = [file.file for file in files]
     file_names = [file.filename for file in files]
     return await data_source_service.create_files_data_sources(file_bytes, file_names, mount_group_id)
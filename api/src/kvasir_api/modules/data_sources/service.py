@@ -1,9 +1,12 @@
-import io
 import uuid
+import shutil
+import asyncio
 import zipfile
+import tempfile
 from pathlib import Path
+from contextlib import ExitStack
 from datetime import datetime, timezone
-from typing import List, Optional, Annotated, Tuple
+from typing import BinaryIO, List, Optional, Annotated, Tuple
 from sqlalchemy import insert, select, update, delete
 from fastapi import HTTPException, Depends, UploadFile
 
@@ -201,7 +204,7 @@ class DataSources(DataSourceInterface):
         await execute(delete(file_data_source).where(file_data_source.c.id == data_source_id), commit_after=True)
         await execute(delete(data_source).where(data_source.c.id == data_source_id), commit_after=True)
 
-    async def create_files_data_sources(self, file_bytes: List[io.BytesIO], file_names: List[str], mount_group_id: uuid.UUID) -> Tuple[List[DataSource], List[Path]]:
+    async def create_files_data_sources(self, file_bytes: List[BinaryIO], file_names: List[str], mount_group_id: uuid.UUID) -> Tuple[List[DataSource], List[Path]]:
         """
         Create data sources from uploaded files.
 
@@ -209,7 +212,7 @@ class DataSources(DataSourceInterface):
         with each file inside the archive being added as a separate data source.
 
         Args:
-            file_bytes: List of file contents as BytesIO objects
+            file_bytes: List of binary file objects with the file contents, e.g. the uploads' spooled files
             file_names: List of corresponding file names
             mount_group_id: UUID of the mount group to add the data sources to
 
@@ -220,80 +223,49 @@ class DataSources(DataSourceInterface):
         mount_group = await graph_service.get_node_group(mount_group_id)
         sandbox = ModalSandbox(mount_group_id, mount_group.python_package_name)
 
-        # Process files and extract zip files if present
-        processed_files = []
-        for file_byte, file_name in zip(file_bytes, file_names):
-            # Check if the file is a zip file
-            if file_name.lower().endswith('.zip'):
-                # Reset the file pointer to the beginning
-                file_byte.seek(0)
-                try:
-                    with zipfile.ZipFile(file_byte, 'r') as zip_ref:
-                        # Extract all files from the zip
-                        for zip_info in zip_ref.infolist():
-                            # Skip directories
-                            if zip_info.is_dir():
-                                continue
-
-                            # Skip macOS metadata files and hidden files
-                            # Common patterns: __MACOSX/, .DS_Store, ._filename (resource forks)
-                            if ('__MACOSX' in zip_info.filename or
-                                zip_info.filename.startswith('._') or
-                                '/.DS_Store' in zip_info.filename or
-                                    zip_info.filename == '.DS_Store'):
-                                continue
-
-                            extracted_name = Path(zip_info.filename).name
-
-                            if extracted_name.startswith('.'):
-                                continue
-
-                            if extracted_name.startswith('._'):
-                                continue
-
-                            # Read the file content
-                            extracted_content = zip_ref.read(zip_info.filename)
-                            extracted_byte = io.BytesIO(extracted_content)
-
-                            processed_files.append(
-                                (extracted_byte, extracted_name))
-                except zipfile.BadZipFile:
-                    # If it's not a valid zip file, treat it as a regular file
-                    file_byte.seek(0)
+        with ExitStack() as extracted_files:
+            # Process files and extract zip files if present
+            processed_files = []
+            for file_byte, file_name in zip(file_bytes, file_names):
+                # Check if the file is a zip file
+                if file_name.lower().endswith('.zip'):
+                    # Extracting can take a while for large archives, keep it off the event loop
+                    extracted = await asyncio.to_thread(_extract_zip_file, file_byte, extracted_files)
+                    if extracted is not None:
+                        processed_files.extend(extracted)
+                    else:
+                        # If it's not a valid zip file, treat it as a regular file
+                        processed_files.append((file_byte, file_name))
+                else:
+                    # Regular file, add as-is
                     processed_files.append((file_byte, file_name))
-            else:
-                # Regular file, add as-is
-                file_byte.seek(0)
-                processed_files.append((file_byte, file_name))
-
-        objs = []
-        new_paths_full = []
-        for file_byte, file_name in processed_files:
-            try:
-                with sandbox.vol.batch_upload() as batch:
-                    data_source_id = uuid.uuid4()
-                    objs.append(DataSourceBase(
-                        id=data_source_id,
-                        user_id=self.user_id,
-                        type="file",
-                        name=file_name,
-                        created_at=datetime.now(timezone.utc),
-                        updated_at=datetime.now(timezone.utc)
-                    ).model_dump())
-                    new_path = f"/{mount_group.python_package_name}/data/{file_name}"
-                    batch.put_file(file_byte, new_path)
-                    new_path_full = Path("/app") / new_path.lstrip("/")
-                    new_paths_full.append(new_path_full)
-            except FileExistsError:
-                pass
+
+            objs = []
+            uploads = []
+            new_paths_full = []
+            for file_byte, file_name in processed_files:
+                data_source_id = uuid.uuid4()
+                objs.append(DataSourceBase(
+                    id=data_source_id,
+                    user_id=self.user_id,
+                    type="file",
+                    name=file_name,
+                    created_at=datetime.now(timezone.utc),
+                    updated_at=datetime.now(timezone.utc)
+                ).model_dump())
+                new_path = f"/{mount_group.python_package_name}/data/{file_name}"
+                uploads.append((file_byte, new_path))
+                new_path_full = Path("/app") / new_path.lstrip("/")
+                new_paths_full.append(new_path_full)
+
+            # One batch for all the files, reloaded into the running sandbox instead of restarting it
+            await sandbox.upload_files(uploads)
 
         await execute(
             insert(data_source).values(objs),
             commit_after=True
         )
 
-        # Need to reload for the files to appear in the volume
-        await sandbox.reload_container()
         return [DataSource(**obj) for obj in objs], new_paths_full
 
     async def get_data_source_details_submission_code(self) -> Tuple[str, str]:
@@ -348,3 +320,51 @@ class DataSources(DataSourceInterface):
 # For dependency injection
 async def get_data_sources_service(user: Annotated[User, Depends(get_current_user)]) -> DataSourceInterface:
     return DataSources(user.id)
+
+
+# Extracted files are kept in memory up to this size, and spooled to disk beyond it
+ZIP_EXTRACT_SPOOL_SIZE = 8 * 1024 * 1024
+
+
+def _extract_zip_file(file: BinaryIO, extracted_files: ExitStack) -> Optional[List[Tuple[BinaryIO, str]]]:
+    """
+    Extract the files in a zip archive to temporary files closed with extracted_files.
+    Returns (file, name) pairs, or None if it is not a valid zip file.
+    """
+    file.seek(0)
+    try:
+        with zipfile.ZipFile(file, 'r') as zip_ref:
+            extracted = []
+            # Extract all files from the zip
+            for zip_info in zip_ref.infolist():
+                # Skip directories
+                if zip_info.is_dir():
+                    continue
+
+                # Skip macOS metadata files and hidden files
+                # Common patterns: __MACOSX/, .DS_Store, ._filename (resource forks)
+                if ('__MACOSX' in zip_info.filename or
+                    zip_info.filename.startswith('._') or
+                    '/.DS_Store' in zip_info.filename or
+                        zip_info.filename == '.DS_Store'):
+                    continue
+
+                extracted_name = Path(zip_info.filename).name
+
+                if extracted_name.startswith('.'):
+                    continue
+
+                if extracted_name.startswith('._'):
+                    continue
+
+                # Copy the file content out in chunks rather than reading it whole
+                extracted_file = extracted_files.enter_context(
+                    tempfile.SpooledTemporaryFile(max_size=ZIP_EXTRACT_SPOOL_SIZE))
+                with zip_ref.open(zip_info) as member:
+                    shutil.copyfileobj(member, extracted_file)
+
+                extracted.append((extracted_file, extracted_name))
+
+            return extracted
+    except zipfile.BadZipFile:
+        return None
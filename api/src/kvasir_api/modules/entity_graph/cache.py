@@ -0,0 +1,81 @@
+import uuid
+from typing import List, Optional
+from sqlalchemy import select, or_
+
+from kvasir_api.redis import get_redis
+from kvasir_api.database.service import fetch_all, after_commit
+from kvasir_api.modules.entity_graph.models import node_in_group
+from kvasir_api.modules.pipeline.models import pipeline_run
+from kvasir_ontology.graph.interface import GraphCacheInterface
+from kvasir_ontology.graph.data_model import EntityGraph
+
+
+# Cached graphs are only ever read at the current version of their group, so the TTL just bounds how long
+# superseded versions linger in Redis
+ENTITY_GRAPH_CACHE_TTL = 60 * 60
+
+
+class EntityGraphCache(GraphCacheInterface):
+
+    def __init__(self):
+        self.cache = get_redis()
+
+    async def get_version(self, node_group_id: uuid.UUID) -> int:
+        version = await self.cache.get(_version_key(node_group_id))
+        return int(version) if version else 0
+
+    async def bump_versions(self, node_group_ids: List[uuid.UUID]) -> None:
+        if not node_group_ids:
+            return
+
+        async def _bump() -> None:
+            async with self.cache.pipeline(transaction=False) as pipe:
+                for node_group_id in set(node_group_ids):
+                    pipe.incr(_version_key(node_group_id))
+                await pipe.execute()
+
+        # Bumping before the writes are visible would let a concurrent reader cache the old graph under the new version
+        await after_commit(_bump)
+
+    async def get_entity_graph(self, node_group_id: uuid.UUID, version: int) -> Optional[EntityGraph]:
+        entity_graph_json = await self.cache.get(_entity_graph_key(node_group_id, version))
+        if not entity_graph_json:
+            return None
+        return EntityGraph.model_validate_json(entity_graph_json)
+
+    async def set_entity_graph(self, node_group_id: uuid.UUID, version: int, entity_graph: EntityGraph) -> None:
+        await self.cache.set(
+            _entity_graph_key(node_group_id, version),
+            entity_graph.model_dump_json(),
+            ex=ENTITY_GRAPH_CACHE_TTL
+        )
+
+    async def get_node_group_ids(self, node_ids: List[uuid.UUID]) -> List[uuid.UUID]:
+        """
+        Get the groups whose entity graph contains the nodes, pipeline runs are resolved through their pipeline.
+        """
+        if not node_ids:
+            return []
+
+        records = await fetch_all(
+            select(node_in_group.c.node_group_id).where(or_(
+                node_in_group.c.node_id.in_(node_ids),
+                node_in_group.c.node_id.in_(
+                    select(pipeline_run.c.pipeline_id).where(
+                        pipeline_run.c.id.in_(node_ids))
+                )
+            )).distinct()
+        )
+
+        return [record["node_group_id"] for record in records]
+
+    async def bump_versions_for_nodes(self, node_ids: List[uuid.UUID]) -> None:
+        await self.bump_versions(await self.get_node_group_ids(node_ids))
+
+
+def _version_key(node_group_id: uuid.UUID) -> str:
+    return f"entity-graph-version:{node_group_id}"
+
+
+def _entity_graph_key(node_group_id: uuid.UUID, version: int) -> str:
+    return f"entity-graph:{node_group_id}:{version}"
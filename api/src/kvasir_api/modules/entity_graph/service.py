@@ -1,7 +1,23 @@
 import uuid
 from typing import List, Optional, Annotated
 from datetime import datetime, timezone
-from sqlalchemy import select, insert, delete, and_, update
+from sqlalchemy import (
+    select,
+    insert,
+    delete,
+    and_,
+    or_,
+    update,
+    union_all,
+    literal,
+    null,
+    cast,
+    Select,
+    CompoundSelect,
+    String,
+    Float,
+    UUID,
+)
 from fastapi import HTTPException, Depends
 
 from kvasir_api.database.service import execute, fetch_all, fetch_one
@@ -39,6 +55,7 @@ from kvasir_api.modules.entity_graph.models import (
     model_instantiated_in_analysis,
 )
 from kvasir_api.modules.pipeline.models import pipeline_run
+from kvasir_api.modules.entity_graph.cache import EntityGraphCache
 
 
 # =============================================================================
@@ -64,6 +81,36 @@ PIPELINE_RUN_EDGE_TABLES = {
     ("pipeline_run", "data_source"): (pipeline_run_output_data_source, "output"),
 }
 
+EDGE_POINT_FIELDS = {
+    "data_source": "data_sources",
+    "dataset": "datasets",
+    "pipeline": "pipelines",
+    "model_instantiated": "models_instantiated",
+    "analysis": "analyses",
+    "pipeline_run": "pipeline_runs",
+}
+
+GRAPH_FIELDS = {
+    "data_source": "data_sources",
+    "dataset": "datasets",
+    "model_instantiated": "models_instantiated",
+    "analysis": "analyses",
+}
+
+_LOADER_COLUMN_TYPES = {
+    "id": UUID(as_uuid=True),
+    "entity_type": String(),
+    "name": String(),
+    "description": String(),
+    "x_position": Float(),
+    "y_position": Float(),
+    "pipeline_id": UUID(as_uuid=True),
+    "from_type": String(),
+    "from_id": UUID(as_uuid=True),
+    "to_type": String(),
+    "to_id": UUID(as_uuid=True),
+}
+
 
 # =============================================================================
 # Graph Service Implementation
@@ -73,6 +120,7 @@ class EntityGraphs(GraphInterface):
 
     def __init__(self, user_id: uuid.UUID):
         super().__init__(user_id)
+        self.graph_cache = EntityGraphCache()
 
     async def add_node(self, node: EntityNodeCreate) -> EntityNode:
         existing = await fetch_one(
@@ -156,6 +204,8 @@ class EntityGraphs(GraphInterface):
                 insert(node_in_group).values(node_group_mappings),
                 commit_after=True
             )
+            await self.graph_cache.bump_versions(
+                [mapping["node_group_id"] for mapping in node_group_mappings])
 
         return await self.get_nodes(node_ids)
 
@@ -282,6 +332,7 @@ class EntityGraphs(GraphInterface):
             ),
             commit_after=True
         )
+        await self.graph_cache.bump_versions_for_nodes([node_id])
         return await self.get_node(node_id)
 
     async def delete_node(self, node_id: uuid.UUID) -> None:
@@ -294,6 +345,8 @@ class EntityGraphs(GraphInterface):
                 detail=f"Node {node_id} not found"
             )
 
+        node_group_ids = await self.graph_cache.get_node_group_ids([node_id])
+
         await execute(
             delete(node_in_group).where(node_in_group.c.node_id == node_id),
             commit_after=True
@@ -304,6 +357,8 @@ class EntityGraphs(GraphInterface):
             commit_after=True
         )
 
+        await self.graph_cache.bump_versions(node_group_ids)
+
     async def get_node_edges(self, node_id: uuid.UUID) -> List[EdgeDefinition]:
         edges: List[EdgeDefinition] = []
 
@@ -470,6 +525,8 @@ class EntityGraphs(GraphInterface):
             commit_after=True
         )
 
+        await self.graph_cache.bump_versions([node_group_id])
+
     async def add_node_to_group(self, node_id: uuid.UUID, node_group_id: uuid.UUID) -> None:
         node_record = await fetch_one(
             select(entity_node).where(entity_node.c.id == node_id)
@@ -510,6 +567,7 @@ class EntityGraphs(GraphInterface):
             }),
             commit_after=True
         )
+        await self.graph_cache.bump_versions([node_group_id])
 
     async def remove_nodes_from_groups(
         self, node_ids: List[uuid.UUID], node_group_ids: List[uuid.UUID]
@@ -526,6 +584,7 @@ class EntityGraphs(GraphInterface):
             ),
             commit_after=True
         )
+        await self.graph_cache.bump_versions(node_group_ids)
 
     async def create_edges(self, edges: List[EdgeDefinition]) -> None:
         timestamp = datetime.now(timezone.utc)
@@ -654,6 +713,8 @@ class EntityGraphs(GraphInterface):
 
             await execute(insert(table).values(value), commit_after=True)
 
+        await self.graph_cache.bump_versions_for_nodes(_get_edge_node_ids(edges))
+
     async def remove_edges(self, edges: List[EdgeDefinition]) -> None:
         for edge in edges:
             key = (edge.from_node_type, edge.to_node_type)
@@ -728,6 +789,8 @@ class EntityGraphs(GraphInterface):
 
             await execute(delete(table).where(and_(*conditions)), commit_after=True)
 
+        await self.graph_cache.bump_versions_for_nodes(_get_edge_node_ids(edges))
+
     async def remove_pipeline_run_edges(self, pipeline_run_ids: List[uuid.UUID]) -> None:
         if not pipeline_run_ids:
             return
@@ -740,6 +803,8 @@ class EntityGraphs(GraphInterface):
                 commit_after=True
             )
 
+        await self.graph_cache.bump_versions_for_nodes(pipeline_run_ids)
+
     async def get_entity_graph(
         self,
         root_group_id: Optional[uuid.UUID] = None,
@@ -751,52 +816,76 @@ class EntityGraphs(GraphInterface):
                 detail="Either root_group_id or root_node_id must be provided"
             )
 
-        node_ids: List[uuid.UUID] = []
         if root_group_id:
-            node_group_records = await fetch_all(
-                select(node_in_group).where(
-                    node_in_group.c.node_group_id == root_group_id
-                )
+            node_filter = entity_node.c.id.in_(
+                select(node_in_group.c.node_id).where(
+                    node_in_group.c.node_group_id == root_group_id)
             )
-            node_ids = [record["node_id"] for record in node_group_records]
-        elif root_node_id:
-            node_ids = [root_node_id]
-
-        if not node_ids:
-            return EntityGraph()
+        else:
+            node_filter = entity_node.c.id == root_node_id
+
+        records = await fetch_all(_build_entity_graph_query(node_filter))
+
+        nodes: dict[uuid.UUID, dict] = {}
+        runs: dict[uuid.UUID, dict] = {}
+        edges: List[dict] = []
+        for record in records:
+            if record["row_kind"] == "node":
+                nodes[record["id"]] = record
+            elif record["row_kind"] == "run":
+                runs[record["id"]] = record
+            else:
+                edges.append(record)
 
-        node_records = await fetch_all(
-            select(entity_node).where(entity_node.c.id.in_(node_ids))
-        )
+        from_entities_map = {entity_id: EdgePoints()
+                             for entity_id in [*nodes, *runs]}
+        to_entities_map = {entity_id: EdgePoints()
+                           for entity_id in [*nodes, *runs]}
 
-        # Group nodes by entity type
-        nodes_by_type: dict[str, List[dict]] = {
-            "data_source": [],
-            "dataset": [],
-            "pipeline": [],
-            "model_instantiated": [],
-            "analysis": [],
-        }
+        for edge in edges:
+            if edge["from_id"] in to_entities_map:
+                getattr(to_entities_map[edge["from_id"]],
+                        EDGE_POINT_FIELDS[edge["to_type"]]).append(edge["to_id"])
+            if edge["to_id"] in from_entities_map:
+                getattr(from_entities_map[edge["to_id"]],
+                        EDGE_POINT_FIELDS[edge["from_type"]]).append(edge["from_id"])
+
+        runs_by_pipeline: dict[uuid.UUID, List[EntityNode]] = {}
+        for run_id, record in runs.items():
+            runs_by_pipeline.setdefault(record["pipeline_id"], []).append(EntityNode(
+                id=run_id,
+                name=record["name"],
+                description=record["description"],
+                x_position=0.0,  # Pipeline runs don't have positions in entity_node table
+                y_position=0.0,
+                from_entities=from_entities_map[run_id],
+                to_entities=to_entities_map[run_id]
+            ))
 
-        for record in node_records:
-            entity_type = record["entity_type"]
-            if entity_type in nodes_by_type:
-                nodes_by_type[entity_type].append(dict(record))
+        entity_graph = EntityGraph()
+        for entity_id, record in nodes.items():
+            if record["entity_type"] == "pipeline":
+                entity_graph.pipelines.append(PipelineNode(
+                    id=entity_id,
+                    name=record["name"],
+                    description=record["description"],
+                    x_position=record["x_position"],
+                    y_position=record["y_position"],
+                    from_entities=from_entities_map[entity_id],
+                    runs=runs_by_pipeline.get(entity_id, [])
+                ))
+            elif record["entity_type"] in GRAPH_FIELDS:
+                getattr(entity_graph, GRAPH_FIELDS[record["entity_type"]]).append(EntityNode(
+                    id=entity_id,
+                    name=record["name"],
+                    description=record["description"],
+                    x_position=record["x_position"],
+                    y_position=record["y_position"],
+                    from_entities=from_entities_map[entity_id],
+                    to_entities=to_entities_map[entity_id]
+                ))
 
-        # Build graph nodes directly from entity_node records
-        data_sources_in_graph = await self._get_nodes_from_records(nodes_by_type["data_source"])
-        datasets_in_graph = await self._get_nodes_from_records(nodes_by_type["dataset"])
-        pipelines_in_graph = await self._get_pipeline_nodes_from_records(nodes_by_type["pipeline"])
-        models_instantiated_in_graph = await self._get_nodes_from_records(nodes_by_type["model_instantiated"])
-        analyses_in_graph = await self._get_nodes_from_records(nodes_by_type["analysis"])
-
-        return EntityGraph(
-            data_sources=data_sources_in_graph,
-            datasets=datasets_in_graph,
-            pipelines=pipelines_in_graph,
-            analyses=analyses_in_graph,
-            models_instantiated=models_instantiated_in_graph,
-        )
+        return entity_graph
 
     async def _get_nodes_from_records(
         self, node_records: List[dict]
@@ -1059,6 +1148,87 @@ class EntityGraphs(GraphInterface):
         return run_nodes
 
 
+def _get_edge_node_ids(edges: List[EdgeDefinition]) -> List[uuid.UUID]:
+    return list({node_id for edge in edges for node_id in (edge.from_node_id, edge.to_node_id)})
+
+
+# =============================================================================
+# Entity Graph Loader
+# =============================================================================
+
+def _build_entity_graph_query(node_filter) -> CompoundSelect:
+    """
+    Build a single UNION ALL query returning the nodes matching node_filter, the runs of
+    their pipelines, and every edge touching either of them, as uniformly shaped rows.
+    """
+    graph_nodes = select(
+        entity_node.c.id,
+        entity_node.c.entity_type,
+        entity_node.c.name,
+        entity_node.c.description,
+        entity_node.c.x_position,
+        entity_node.c.y_position,
+    ).where(node_filter).cte("graph_nodes")
+    graph_runs = select(
+        pipeline_run.c.id,
+        pipeline_run.c.pipeline_id,
+        pipeline_run.c.name,
+        pipeline_run.c.description,
+    ).where(
+        pipeline_run.c.pipeline_id.in_(select(graph_nodes.c.id))
+    ).cte("graph_runs")
+
+    def _row(row_kind: str, **columns) -> Select:
+        values = {**{name: null() for name in _LOADER_COLUMN_TYPES}, **columns}
+        return select(
+            literal(row_kind, String).label("row_kind"),
+            *[cast(values[name], column_type).label(name)
+              for name, column_type in _LOADER_COLUMN_TYPES.items()]
+        )
+
+    queries = [
+        _row(
+            "node",
+            id=graph_nodes.c.id,
+            entity_type=graph_nodes.c.entity_type,
+            name=graph_nodes.c.name,
+            description=graph_nodes.c.description,
+            x_position=graph_nodes.c.x_position,
+            y_position=graph_nodes.c.y_position,
+        ).select_from(graph_nodes),
+        _row(
+            "run",
+            id=graph_runs.c.id,
+            name=graph_runs.c.name,
+            description=graph_runs.c.description,
+            pipeline_id=graph_runs.c.pipeline_id,
+        ).select_from(graph_runs),
+    ]
+
+    edge_tables = [(key, table) for key, table in VALID_EDGES.items()] + \
+        [(key, table) for key, (table, _) in PIPELINE_RUN_EDGE_TABLES.items()]
+
+    for (from_type, to_type), table in edge_tables:
+        from_column = table.c[f"{from_type}_id"]
+        to_column = table.c[f"{to_type}_id"]
+        endpoint_filters = []
+        for node_type, column in ((from_type, from_column), (to_type, to_column)):
+            if node_type == "pipeline_run":
+                endpoint_filters.append(column.in_(select(graph_runs.c.id)))
+            else:
+                endpoint_filters.append(column.in_(select(graph_nodes.c.id)))
+
+        queries.append(_row(
+            "edge",
+            from_type=literal(from_type, String),
+            from_id=from_column,
+            to_type=literal(to_type, String),
+            to_id=to_column,
+        ).where(or_(*endpoint_filters)))
+
+    return union_all(*queries)
+
+
 # For dependency injection
 async def get_graph_service(user: Annotated[User, Depends(get_current_user)]) -> GraphInterface:
     return EntityGraphs(user.id)
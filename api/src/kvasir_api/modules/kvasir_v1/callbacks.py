@@ -1,15 +1,19 @@
 import json
 import uuid
 import redis
+import asyncio
+import contextvars
 from uuid import UUID
-from typing import Literal, List, Dict, Optional
+from typing import Literal, List, Dict, Optional, Tuple
 from datetime import datetime, timezone
 from pydantic_ai.models import ModelMessage
 from taskiq import TaskiqState, TaskiqEvents
 from pydantic_ai.messages import ModelMessagesTypeAdapter
-from sqlalchemy import insert, select, update, and_
+from sqlalchemy import insert, select, update, and_, or_, func
+from sqlalchemy.exc import DBAPIError
 
 from kvasir_api.database.service import execute, fetch_one, fetch_all
+from kvasir_api.database.core import open_asyncpg_pool, close_asyncpg_pool
 from kvasir_api.modules.kvasir_v1.models import (
     run,
     swe_run,
@@ -19,8 +23,13 @@ from kvasir_api.modules.kvasir_v1.models import (
     pydantic_ai_message
 )
 from kvasir_api.modules.ontology.service import create_ontology_for_user
+from kvasir_api.modules.kvasir_v1.run_status import publish_run_status
+from kvasir_api.modules.kvasir_v1.stream_retention import RUN_MESSAGE_STREAM_MAXLEN, set_run_stream_retention
 from kvasir_agents.agents.v1.callbacks import KvasirV1Callbacks
 from kvasir_agents.agents.v1.broker import logger, v1_broker
+from kvasir_agents.agents.v1.history_processors import get_history_tail
+from kvasir_agents.sandbox.scheduler import log_scheduler_metrics_periodically
+from kvasir_agents.sandbox.local import start_warm_pool, stop_warm_pools
 from kvasir_agents.agents.v1.data_model import (
     AnalysisRun,
     SweRun,
@@ -37,6 +46,120 @@ from kvasir_agents.agents.v1.data_model import (
 from kvasir_ontology.ontology import Ontology
 from kvasir_api.redis import get_redis
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Log messages are buffered and written in batches, shared by every callbacks object in the process. A batch is
+# written once this many messages are waiting, or this many seconds after the first one came in
+LOG_FLUSH_MAX_MESSAGES = 50
+LOG_FLUSH_INTERVAL = 0.5
+_log_buffer: List[Message] = []
+_log_flush_lock = asyncio.Lock()
+_log_flush_timer: Optional[asyncio.Task] = None
+# Messages kept while the database can't be written to, the oldest are dropped past this
+MAX_LOG_BUFFER_MESSAGES = 10000
+
+# The owner and type of the runs logged to, a run's type never changes
+MAX_CACHED_RUN_TYPES = 4096
+_run_types: Dict[UUID, Tuple[UUID, RUN_TYPE_LITERAL]] = {}
+
+# Saved message histories at least this large are zstd compressed, if zstandard is installed
+MESSAGE_HISTORY_COMPRESSION_MIN_BYTES = 4096
+MESSAGE_HISTORY_COMPRESSION_LEVEL = 3
+
+# The fields of a message that are added to its run's stream
+MESSAGE_STREAM_FIELDS = {"content", "run_id", "role", "type"}
+
+
+def _encode_message_list(messages: List[ModelMessage]) -> Tuple[bytes, Optional[str]]:
+    message_bytes = ModelMessagesTypeAdapter.dump_json(messages)
+    if zstandard is None or len(message_bytes) < MESSAGE_HISTORY_COMPRESSION_MIN_BYTES:
+        return message_bytes, None
+    return zstandard.ZstdCompressor(level=MESSAGE_HISTORY_COMPRESSION_LEVEL).compress(message_bytes), "zstd"
+
+
+def _decode_message_list(message_bytes: bytes, compression: Optional[str]) -> bytes:
+    if compression is None:
+        return message_bytes
+    if compression != "zstd":
+        raise ValueError(f"Unknown message history compression {compression}")
+    if zstandard is None:
+        raise RuntimeError("The message history is zstd compressed, install zstandard (the zstd extra) to read it")
+    return zstandard.ZstdDecompressor().decompress(message_bytes)
+
+
+async def _insert_log_messages(batch: List[Message]) -> List[Message]:
+    """
+    Insert the messages, leaving out the ones the database rejects, e.g. of a run deleted since they were logged or
+    with content Postgres can't store, so one bad message doesn't hold up the logs of every run. Returns the inserted.
+    """
+    try:
+        await execute(insert(message).values([message_obj.model_dump() for message_obj in batch]), commit_after=True)
+        return batch
+    except DBAPIError as e:
+        # Data exceptions and integrity violations, other errors are not down to the messages
+        if (getattr(e.orig, "sqlstate", None) or "")[:2] not in ("22", "23"):
+            raise
+        if len(batch) == 1:
+            logger.error(f"Dropped log message {batch[0].id} of run {batch[0].run_id}, the database rejected it: {e.orig}")
+            return []
+
+    # Bisect to find the rejected messages, the others are inserted in order
+    middle = len(batch) // 2
+    return await _insert_log_messages(batch[:middle]) + await _insert_log_messages(batch[middle:])
+
+
+async def _flush_log_buffer() -> None:
+    async with _log_flush_lock:
+        if not _log_buffer:
+            return
+
+        batch = _log_buffer[:]
+        _log_buffer.clear()
+        try:
+            inserted = await _insert_log_messages(batch)
+        except BaseException:
+            # Keep the messages, in order, for the next flush, but only as many as the buffer holds
+            _log_buffer[:0] = batch
+            if len(_log_buffer) > MAX_LOG_BUFFER_MESSAGES:
+                n_dropped = len(_log_buffer) - MAX_LOG_BUFFER_MESSAGES
+                del _log_buffer[:n_dropped]
+                logger.error(f"Dropped the {n_dropped} oldest log messages, the log buffer is full")
+            raise
+
+        await _add_to_run_streams(inserted)
+
+
+async def _insert_message(message_obj: Message) -> None:
+    # Holding the flush lock, so the message is added to its run's stream in order with the logs
+    async with _log_flush_lock:
+        await execute(insert(message).values(**message_obj.model_dump()), commit_after=True)
+        await _add_to_run_streams([message_obj])
+
+
+async def _add_to_run_streams(messages: List[Message]) -> None:
+    cache = get_redis()
+    async with cache.pipeline(transaction=False) as pipe:
+        for message_obj in messages:
+            pipe.xadd(
+                str(message_obj.run_id),
+                message_obj.model_dump(mode="json", include=MESSAGE_STREAM_FIELDS),
+                maxlen=RUN_MESSAGE_STREAM_MAXLEN,
+                approximate=True
+            )
+        await pipe.execute()
+
+
+async def _flush_log_buffer_after(delay: float) -> None:
+    await asyncio.sleep(delay)
+    try:
+        await _flush_log_buffer()
+    except Exception:
+        logger.exception("Failed to write run logs, they are kept for the next flush")
+
 
 class ApplicationCallbacks(KvasirV1Callbacks):
 
@@ -66,6 +189,10 @@ class ApplicationCallbacks(KvasirV1Callbacks):
             .values(status=status),
             commit_after=True
         )
+        await set_run_stream_retention(run_id, status)
+        runs = await self.get_runs(user_id, run_ids=[run_id])
+        if runs:
+            await publish_run_status(runs[0])
         return status
 
     async def create_swe_run(self, user_id: UUID, project_id: UUID, kvasir_run_id: UUID, pipeline_id: UUID, run_name: str | None = None, initial_status: Literal["pending", "completed", "failed", "waiting", "running"] | None = None) -> SweRun:
@@ -75,7 +202,7 @@ class ApplicationCallbacks(KvasirV1Callbacks):
             initial_status=initial_status or "running",
             project_id=project_id,
         )
-        run_record = await self.create_run(user_id, run_create)
+        run_record = await self._insert_run(user_id, run_create)
 
         await execute(
             insert(swe_run).values(
@@ -87,12 +214,15 @@ class ApplicationCallbacks(KvasirV1Callbacks):
             commit_after=True
         )
 
-        return SweRun(
+        swe_run_obj = SweRun(
             **run_record.model_dump(),
             kvasir_run_id=kvasir_run_id,
             pipeline_id=pipeline_id,
             result=None
         )
+        # Published with the SWE fields, which the bare run did not have yet
+        await publish_run_status(swe_run_obj)
+        return swe_run_obj
 
     async def create_analysis_run(self, user_id: UUID, project_id: UUID, kvasir_run_id: UUID, analysis_id: UUID, run_name: str | None = None, initial_status: Literal["pending", "completed", "failed", "waiting", "running"] | None = None) -> AnalysisRun:
         run_create = RunCreate(
@@ -101,7 +231,7 @@ class ApplicationCallbacks(KvasirV1Callbacks):
             initial_status=initial_status or "running",
             project_id=project_id,
         )
-        run_record = await self.create_run(user_id, run_create)
+        run_record = await self._insert_run(user_id, run_create)
 
         await execute(
             insert(analysis_run).values(
@@ -113,12 +243,14 @@ class ApplicationCallbacks(KvasirV1Callbacks):
             commit_after=True
         )
 
-        return AnalysisRun(
+        analysis_run_obj = AnalysisRun(
             **run_record.model_dump(),
             analysis_id=analysis_id,
             kvasir_run_id=kvasir_run_id,
             result=None
         )
+        await publish_run_status(analysis_run_obj)
+        return analysis_run_obj
 
     async def create_kvasir_run(self, user_id: UUID, project_id: UUID, run_name: str | None = None, initial_status: Literal["pending", "completed", "failed", "waiting", "running"] | None = None) -> RunBase:
         run_create = RunCreate(
@@ -214,26 +346,56 @@ class ApplicationCallbacks(KvasirV1Callbacks):
 
     async def save_message_history(self, user_id: UUID, run_id: UUID, message_history: List[ModelMessage]) -> None:
         await self._verify_run_ownership(user_id, run_id)
-        message_bytes = ModelMessagesTypeAdapter.dump_json(message_history)
+        if not message_history:
+            return
+
+        # The messages are appended after the ones already saved, as one row
+        seq_record = await fetch_one(
+            select(func.coalesce(func.max(pydantic_ai_message.c.seq + pydantic_ai_message.c.message_count), 0).label("next_seq"))
+            .where(pydantic_ai_message.c.run_id == run_id)
+        )
+        message_bytes, compression = _encode_message_list(message_history)
         pydantic_ai_message_records = [PydanticAIMessage(
             id=uuid.uuid4(),
             run_id=run_id,
             message_list=message_bytes,
+            seq=seq_record["next_seq"],
+            message_count=len(message_history),
+            compression=compression,
             created_at=datetime.now(timezone.utc)
         )]
         await execute(insert(pydantic_ai_message).values([record.model_dump() for record in pydantic_ai_message_records]), commit_after=True)
 
-    async def get_message_history(self, user_id: UUID, run_id: UUID) -> List[ModelMessage] | None:
+    async def get_message_history(self, user_id: UUID, run_id: UUID, max_messages: Optional[int] = None) -> List[ModelMessage] | None:
         await self._verify_run_ownership(user_id, run_id)
+        if max_messages is None:
+            return await self._load_message_history(run_id) or None
+
+        # Only the rows holding the last max_messages messages, unless the run has rows saved before histories were
+        # appended to, which have no position
+        end = pydantic_ai_message.c.seq + pydantic_ai_message.c.message_count
+        last_seq = select(func.max(end)).where(pydantic_ai_message.c.run_id == run_id).scalar_subquery()
+        has_legacy_rows = select(pydantic_ai_message.c.id).where(
+            and_(pydantic_ai_message.c.run_id == run_id, pydantic_ai_message.c.seq.is_(None))).exists()
+        messages = get_history_tail(
+            await self._load_message_history(run_id, or_(end > last_seq - max_messages, has_legacy_rows)), max_messages)
+
+        if not messages:
+            # The last turn started before the rows that were loaded
+            messages = get_history_tail(await self._load_message_history(run_id), max_messages)
+        return messages if messages else None
+
+    async def _load_message_history(self, run_id: UUID, *conditions) -> List[ModelMessage]:
         c = await fetch_all(
-            select(pydantic_ai_message).where(
-                pydantic_ai_message.c.run_id == run_id)
+            select(pydantic_ai_message)
+            .where(pydantic_ai_message.c.run_id == run_id, *conditions)
+            .order_by(pydantic_ai_message.c.seq.asc().nulls_first(), pydantic_ai_message.c.created_at)
         )
         messages: list[ModelMessage] = []
         for message in c:
             messages.extend(
-                ModelMessagesTypeAdapter.validate_json(message["message_list"]))
-        return messages if messages else None
+                ModelMessagesTypeAdapter.validate_json(_decode_message_list(message["message_list"], message["compression"])))
+        return messages
 
     async def log(
         self,
@@ -242,21 +404,46 @@ class ApplicationCallbacks(KvasirV1Callbacks):
         message: str,
         type: Literal["result", "tool_call", "error", "info"]
     ) -> None:
+        global _log_flush_timer
         log_message = f"[{run_id}] [{type.upper()}] {message}"
         logger.info(log_message)
-        # Infer role from run type
-        runs = await self.get_runs(user_id=user_id, run_ids=[run_id])
-        if not runs:
-            raise ValueError(f"Run with id {run_id} not found")
-        role = runs[0].type
 
-        await self.create_message(user_id, MessageCreate(
-            run_id=run_id,
+        _log_buffer.append(Message(
+            id=uuid.uuid4(),
             content=message,
+            run_id=run_id,
+            # Infer role from run type
+            role=await self._get_run_type(user_id, run_id),
             type=type,
-            role=role
+            created_at=datetime.now(timezone.utc)
         ))
 
+        if len(_log_buffer) >= LOG_FLUSH_MAX_MESSAGES:
+            await self.flush_logs()
+        elif _log_flush_timer is None or _log_flush_timer.done():
+            # In a context of its own, so the flush doesn't join a transaction the logging code happens to be in
+            _log_flush_timer = asyncio.create_task(
+                _flush_log_buffer_after(LOG_FLUSH_INTERVAL), context=contextvars.Context())
+
+    async def flush_logs(self) -> None:
+        await asyncio.create_task(_flush_log_buffer(), context=contextvars.Context())
+
+    async def _get_run_type(self, user_id: UUID, run_id: UUID) -> RUN_TYPE_LITERAL:
+        # Also verifies the run belongs to the user
+        cached = _run_types.get(run_id)
+        if cached is not None and cached[0] == user_id:
+            return cached[1]
+
+        record = await fetch_one(select(run.c.type).where(and_(run.c.id == run_id, run.c.user_id == user_id)))
+        if not record:
+            raise ValueError(f"Run with id {run_id} not found")
+
+        _run_types[run_id] = (user_id, record["type"])
+        while len(_run_types) > MAX_CACHED_RUN_TYPES:
+            del _run_types[next(iter(_run_types))]
+
+        return record["type"]
+
     async def get_runs(
         self,
         user_id: UUID,
@@ -355,10 +542,10 @@ class ApplicationCallbacks(KvasirV1Callbacks):
             **message_create.model_dump()
         )
 
-        await execute(insert(message).values(**message_obj.model_dump()), commit_after=True)
-
-        cache = get_redis()
-        await cache.xadd(str(message_create.run_id), message_create.model_dump(mode="json", exclude={"context"}))
+        # The logs before it are written first, so the run's stream stays in order. The message itself is written on
+        # its own, so its errors reach the caller instead of being dropped or retried with the logs
+        await self.flush_logs()
+        await asyncio.create_task(_insert_message(message_obj), context=contextvars.Context())
 
         return message_obj
 
@@ -372,9 +559,15 @@ class ApplicationCallbacks(KvasirV1Callbacks):
         )
 
         runs = await self.get_runs(user_id=user_id, run_ids=[run_id])
+        await publish_run_status(runs[0])
         return runs[0]
 
     async def create_run(self, user_id: UUID, create: RunCreate) -> RunBase:
+        run_obj = await self._insert_run(user_id, create)
+        await publish_run_status(run_obj)
+        return run_obj
+
+    async def _insert_run(self, user_id: UUID, create: RunCreate) -> RunBase:
         create_dict = create.model_dump(exclude={"initial_status"})
         run_obj = RunBase(
             id=uuid.uuid4(),
@@ -390,4 +583,16 @@ class ApplicationCallbacks(KvasirV1Callbacks):
 
 @v1_broker.on_event(TaskiqEvents.WORKER_STARTUP)
 async def startup(state: TaskiqState) -> None:
+    await open_asyncpg_pool()
     state.callbacks = ApplicationCallbacks()
+    state.log_scheduler_metrics_task = asyncio.create_task(log_scheduler_metrics_periodically())
+    # Local sandbox containers for new projects, if KVASIR_SANDBOX_WARM_POOL_SIZE is set
+    start_warm_pool()
+
+
+@v1_broker.on_event(TaskiqEvents.WORKER_SHUTDOWN)
+async def shutdown(state: TaskiqState) -> None:
+    state.log_scheduler_metrics_task.cancel()
+    stop_warm_pools()
+    await state.callbacks.flush_logs()
+    await close_asyncpg_pool()
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Table, Column, String, DateTime, func, ForeignKey
+from sqlalchemy import Table, Column, String, Integer, DateTime, func, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, BYTEA
 from kvasir_api.database.core import metadata
 
@@ -50,8 +50,15 @@ pydantic_ai_message = Table(
     Column("run_id", UUID(as_uuid=True),
            ForeignKey("kvasir_v1.run.id"), nullable=False),
     Column("message_list", BYTEA, nullable=False),
+    # Position of the row's first message in the run's history and the number of messages in the row, null for
+    # rows saved before histories were appended to
+    Column("seq", Integer, nullable=True),
+    Column("message_count", Integer, nullable=True),
+    # zstd or null if message_list is not compressed
+    Column("compression", String, nullable=True),
     Column("created_at", DateTime(timezone=True),
            nullable=False, default=func.now()),
+    Index(None, "run_id", "seq", unique=True),
     schema="kvasir_v1"
 )
 
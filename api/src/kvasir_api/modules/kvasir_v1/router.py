@@ -1,23 +1,22 @@
 import uuid
-import time
-import redis
-import asyncio
 from pydantic import TypeAdapter
 from datetime import datetime, timezone
 from typing import Annotated, List, Optional, Union
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import StreamingResponse, Response
 
 
 from kvasir_api.auth.service import get_current_user, user_owns_runs, oauth2_scheme
 from kvasir_api.auth.schema import User
-from kvasir_api.redis import get_redis
-from kvasir_api.app_secrets import SSE_MAX_TIMEOUT, SSE_MIN_SLEEP_TIME
+from kvasir_api.stream_hub import get_stream_hub, format_stream_event_id, parse_stream_event_id
+from kvasir_api.app_secrets import SSE_MAX_TIMEOUT
 from kvasir_api.modules.kvasir_v1.callbacks import ApplicationCallbacks
+from kvasir_api.modules.kvasir_v1.run_status import get_run_status_stream_key
 from kvasir_api.modules.entity_graph.service import EntityGraphs
 from kvasir_api.utils.pydanticai_utils import helper_agent
 from kvasir_agents.agents.v1.kvasir.agent import KvasirV1
 from kvasir_agents.agents.v1.kvasir.deps import KvasirV1Deps
+from kvasir_agents.sandbox.scheduler import ExecPriority, exec_priority
 from kvasir_agents.agents.v1.data_model import (
     Message,
     MessageCreate,
@@ -31,6 +30,9 @@ from kvasir_agents.agents.v1.data_model import (
 
 _callbacks = ApplicationCallbacks()
 
+# Seconds without a run status event after which a comment is sent on the incomplete runs stream
+RUN_STATUS_KEEPALIVE_INTERVAL = 15
+
 
 router = APIRouter()
 
@@ -81,7 +83,9 @@ async def post_chat(
     else:
         kvasir = await KvasirV1.from_run(user.id, run_record.id, ApplicationCallbacks(), token)
 
-    response = await kvasir(prompt.content, context=prompt.context)
+    # The user is waiting on the chat, its sandbox executions go ahead of background ones in this process
+    with exec_priority(ExecPriority.INTERACTIVE):
+        response = await kvasir(prompt.content, context=prompt.context)
 
     if is_new_conversation:
         name = await helper_agent.run(
@@ -131,7 +135,7 @@ async def fetch_run_messages(
 async def stream_run_messages(
     run_ids: Optional[List[uuid.UUID]] = None,
     project_id: Optional[uuid.UUID] = None,
-    cache: Annotated[redis.Redis, Depends(get_redis)] = None,
+    last_event_id: Annotated[Optional[str], Header()] = None,
     user: Annotated[User, Depends(get_current_user)] = None,
 ) -> StreamingResponse:
 
@@ -153,35 +157,28 @@ async def stream_run_messages(
     timeout = min(timeout, SSE_MAX_TIMEOUT)
     stream_keys = [str(run.id) for run in runs]
 
+    # A reconnecting client resumes after the last message it got from each run, the others start from new messages
+    resumed_ids = parse_stream_event_id(last_event_id) if last_event_id else {}
+    positions = {key: resumed_ids.get(key) for key in stream_keys}
+
     async def stream_run_messages():
-        # Track last_id for each stream
-        last_ids = {key: "$" for key in stream_keys}
-        start_time = time.time()
-
-        while True:
-            response = await cache.xread(last_ids, count=10, block=int(SSE_MIN_SLEEP_TIME * 1000))
-
-            if response:
-                start_time = time.time()
-                # XREAD returns: [[stream_name, [[msg_id, {fields}], ...]], ...]
-                for stream_key, messages in response:
-                    for message_id, message_data in messages:
-                        last_ids[stream_key] = message_id
-
-                        message_validated = MessageCreate(**message_data)
-                        output_data = Message(
-                            id=uuid.uuid4(),
-                            content=message_validated.content,
-                            run_id=uuid.UUID(stream_key),
-                            type=message_validated.type,
-                            role=message_validated.role,
-                            created_at=datetime.now(timezone.utc)
-                        )
-                        yield f"data: {output_data.model_dump_json(by_alias=True)}\n\n"
-
-            if start_time + timeout < time.time():
+        async for entry in get_stream_hub().listen(positions, heartbeat=timeout):
+            if entry is None:
+                # No messages for the whole timeout
                 break
 
+            positions[entry.key] = entry.id
+            message_validated = MessageCreate(**entry.fields)
+            output_data = Message(
+                id=uuid.uuid4(),
+                content=message_validated.content,
+                run_id=uuid.UUID(entry.key),
+                type=message_validated.type,
+                role=message_validated.role,
+                created_at=datetime.now(timezone.utc)
+            )
+            yield f"id: {format_stream_event_id(positions)}\ndata: {output_data.model_dump_json(by_alias=True)}\n\n"
+
     return StreamingResponse(stream_run_messages(), media_type="text/event-stream")
 
 
@@ -192,22 +189,20 @@ async def stream_incomplete_runs(
 ) -> StreamingResponse:
 
     adapter = TypeAdapter(List[Union[RunBase, AnalysisRun, SweRun]])
+    hub = get_stream_hub()
+    stream_key = get_run_status_stream_key(user.id)
 
     async def stream_incomplete_runs():
-        prev_run_ids = []
-        while True:
-            incomplete_runs = await _callbacks.get_runs(user.id, filter_status=["running", "pending"], project_id=project_id)
-
-            # Include recently stopped runs to ensure we don't miss the associated state changes
-            # Could optionally listen for when a run id is removed from this list in the frontend, then mutate all jobs, but this is more efficient
-            stopped_run_ids = [
-                run_id for run_id in prev_run_ids if run_id not in [run.id for run in incomplete_runs]]
-
-            stopped_runs = await _callbacks.get_runs(user.id, run_ids=stopped_run_ids, project_id=project_id)
-            runs = stopped_runs + incomplete_runs
-            yield f"data: {adapter.dump_json(runs, by_alias=True).decode("utf-8")}\n\n"
-            prev_run_ids = [run.id for run in runs]
-
-            await asyncio.sleep(SSE_MIN_SLEEP_TIME)
+        # Taken before the snapshot, so no transition between the two is missed
+        last_id = await hub.get_last_id(stream_key)
+        incomplete_runs = await _callbacks.get_runs(user.id, filter_status=["running", "pending"], project_id=project_id)
+        yield f"data: {adapter.dump_json(incomplete_runs, by_alias=True).decode('utf-8')}\n\n"
+
+        async for entry in hub.listen({stream_key: last_id}, heartbeat=RUN_STATUS_KEEPALIVE_INTERVAL):
+            if entry is None:
+                # Keeps proxies from closing the idle connection
+                yield ": keepalive\n\n"
+            elif project_id is None or entry.fields["project_id"] == str(project_id):
+                yield f"data: [{entry.fields['run']}]\n\n"
 
     return StreamingResponse(stream_incomplete_runs(), media_type="text/event-stream")
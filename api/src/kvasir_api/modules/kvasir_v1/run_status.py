@@ -0,0 +1,34 @@
+from uuid import UUID
+from typing import Union
+
+from kvasir_api.redis import get_redis
+from kvasir_api.database.service import after_commit
+from kvasir_agents.agents.v1.data_model import RunBase, AnalysisRun, SweRun
+
+
+# Status events are only read by clients connected when they are published, clients connecting later start from a
+# snapshot of the database, so the streams only need to hold the events the listeners have not caught up with
+RUN_STATUS_STREAM_MAXLEN = 1000
+
+
+def get_run_status_stream_key(user_id: UUID) -> str:
+    return f"{user_id}-run-status"
+
+
+async def publish_run_status(run_obj: Union[RunBase, AnalysisRun, SweRun]) -> None:
+    """
+    Publish the run's current state to its user's status stream, once the current unit of work has committed so
+    readers never see a state they can not read from the database.
+    """
+    fields = {
+        "run_id": str(run_obj.id),
+        "project_id": str(run_obj.project_id),
+        "status": run_obj.status,
+        "run": run_obj.model_dump_json(by_alias=True)
+    }
+
+    async def _publish() -> None:
+        await get_redis().xadd(
+            get_run_status_stream_key(run_obj.user_id), fields, maxlen=RUN_STATUS_STREAM_MAXLEN, approximate=True)
+
+    await after_commit(_publish)
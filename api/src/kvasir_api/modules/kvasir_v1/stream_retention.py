@@ -0,0 +1,174 @@
+import asyncio
+from uuid import UUID
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import select
+
+from kvasir_api.redis import get_redis
+from kvasir_api.database.service import fetch_all
+from kvasir_api.modules.kvasir_v1.models import run
+from kvasir_api.modules.kvasir_v1.run_status import RUN_STATUS_STREAM_MAXLEN
+from kvasir_agents.agents.v1.broker import logger
+
+
+# The streams only feed live viewers, the messages themselves are in the database. Trimming is approximate, so the
+# streams can run somewhat over these lengths
+RUN_MESSAGE_STREAM_MAXLEN = 10000
+ANALYSIS_STREAM_MAXLEN = 1000
+
+# How long the streams of a finished run are kept, for viewers that reconnect and resume from their last message
+FINISHED_RUN_STREAM_TTL = 60 * 60
+FINISHED_RUN_STATUSES = ("completed", "failed")
+
+STREAM_COMPACTION_INTERVAL = 10 * 60
+STREAM_SCAN_COUNT = 500
+# Run ids per status query, well under Postgres' limit of 32767 bind parameters per statement
+RUN_STATUS_QUERY_BATCH_SIZE = 5000
+# The largest streams listed in the metrics logged after each compaction
+STREAM_METRICS_LOG_COUNT = 10
+
+
+class StreamMemoryMetrics(NamedTuple):
+    key: str
+    length: int
+    # As estimated by MEMORY USAGE
+    memory_bytes: int
+    # In seconds, None if the stream does not expire
+    ttl: Optional[int]
+
+
+def get_run_stream_keys(run_id: UUID) -> List[str]:
+    return [str(run_id), f"{run_id}-analysis"]
+
+
+def _parse_stream_key(key: str) -> Optional[Tuple[Optional[UUID], int]]:
+    """The run of a stream written by the app and the length it is trimmed to, None for streams the app did not write."""
+    kinds = (("-run-status", RUN_STATUS_STREAM_MAXLEN), ("-analysis", ANALYSIS_STREAM_MAXLEN), ("", RUN_MESSAGE_STREAM_MAXLEN))
+    for suffix, maxlen in kinds:
+        if suffix and not key.endswith(suffix):
+            continue
+        try:
+            owner_id = UUID(key.removesuffix(suffix))
+        except ValueError:
+            return None
+        # Status streams belong to a user rather than a run
+        return (None if suffix == "-run-status" else owner_id), maxlen
+    return None
+
+
+async def set_run_stream_retention(run_id: UUID, status: str) -> None:
+    """
+    Let the run's streams expire once it finishes, and keep them again if it is resumed. Messages added after the run
+    finished keep the expiry, streams first created after it are expired by the compaction.
+    """
+    cache = get_redis()
+    async with cache.pipeline(transaction=False) as pipe:
+        for key in get_run_stream_keys(run_id):
+            if status in FINISHED_RUN_STATUSES:
+                pipe.expire(key, FINISHED_RUN_STREAM_TTL)
+            else:
+                pipe.persist(key)
+        await pipe.execute()
+
+
+async def _get_stream_keys() -> List[str]:
+    return [key async for key in get_redis().scan_iter(count=STREAM_SCAN_COUNT, _type="stream")]
+
+
+async def compact_streams() -> None:
+    """
+    Trim the app's streams to their lengths and expire the streams of finished runs that are not set to expire,
+    like those of runs that finished before expiry was set or were deleted.
+    """
+    cache = get_redis()
+    streams: Dict[str, Tuple[Optional[UUID], int]] = {}
+    for key in await _get_stream_keys():
+        parsed_key = _parse_stream_key(key)
+        if parsed_key is not None:
+            streams[key] = parsed_key
+    if not streams:
+        return
+
+    async with cache.pipeline(transaction=False) as pipe:
+        for key, (_, maxlen) in streams.items():
+            pipe.xtrim(key, maxlen=maxlen, approximate=True)
+            pipe.ttl(key)
+        ttls = (await pipe.execute())[1::2]
+
+    run_keys: Dict[UUID, List[str]] = {}
+    for (key, (run_id, _)), ttl in zip(streams.items(), ttls):
+        # -1 means the stream has no expiry
+        if run_id is not None and ttl == -1:
+            run_keys.setdefault(run_id, []).append(key)
+    if not run_keys:
+        return
+
+    run_ids = list(run_keys)
+    statuses: Dict[UUID, str] = {}
+    for start in range(0, len(run_ids), RUN_STATUS_QUERY_BATCH_SIZE):
+        records = await fetch_all(
+            select(run.c.id, run.c.status).where(run.c.id.in_(run_ids[start:start + RUN_STATUS_QUERY_BATCH_SIZE])))
+        statuses.update({record["id"]: record["status"] for record in records})
+
+    async with cache.pipeline(transaction=False) as pipe:
+        for run_id, keys in run_keys.items():
+            # Runs that are not in the database anymore are done too
+            if statuses.get(run_id, "completed") in FINISHED_RUN_STATUSES:
+                for key in keys:
+                    pipe.expire(key, FINISHED_RUN_STREAM_TTL)
+        await pipe.execute()
+
+
+async def compact_streams_periodically(interval: float = STREAM_COMPACTION_INTERVAL) -> None:
+    while True:
+        try:
+            await compact_streams()
+        except Exception:
+            logger.exception("Failed to compact the run streams")
+        try:
+            await log_stream_memory_metrics()
+        except Exception:
+            logger.exception("Failed to get the memory metrics of the run streams")
+        await asyncio.sleep(interval)
+
+
+async def get_stream_memory_metrics() -> List[StreamMemoryMetrics]:
+    """The length, memory use and expiry of the app's streams, largest first."""
+    cache = get_redis()
+    keys = [key for key in await _get_stream_keys() if _parse_stream_key(key) is not None]
+    if not keys:
+        return []
+
+    async with cache.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.xlen(key)
+            pipe.memory_usage(key)
+            pipe.ttl(key)
+        replies = await pipe.execute()
+
+    metrics = [
+        StreamMemoryMetrics(
+            key=key,
+            length=length,
+            memory_bytes=memory_bytes or 0,
+            ttl=ttl if ttl >= 0 else None
+        )
+        for key, length, memory_bytes, ttl in zip(keys, replies[0::3], replies[1::3], replies[2::3])
+    ]
+    return sorted(metrics, key=lambda stream_metrics: stream_metrics.memory_bytes, reverse=True)
+
+
+async def log_stream_memory_metrics(count: int = STREAM_METRICS_LOG_COUNT) -> None:
+    """Logs the totals over the app's streams and the largest of them."""
+    metrics = await get_stream_memory_metrics()
+    if not metrics:
+        return
+
+    expiring = sum(1 for stream_metrics in metrics if stream_metrics.ttl is not None)
+    logger.info(
+        f"Run streams: {len(metrics)} streams ({expiring} expiring), "
+        f"{sum(stream_metrics.length for stream_metrics in metrics)} entries, "
+        f"{sum(stream_metrics.memory_bytes for stream_metrics in metrics)} bytes")
+    for stream_metrics in metrics[:count]:
+        logger.info(
+            f"Stream {stream_metrics.key}: {stream_metrics.length} entries, {stream_metrics.memory_bytes} bytes, "
+            f"ttl {stream_metrics.ttl if stream_metrics.ttl is not None else 'none'}")
@@ -1,4 +1,3 @@
-import io
 import json
 from typing import Annotated, List, Union
 from uuid import UUID
@@ -109,7 +108,8 @@ async def insert_files_data_sources_endpoint(
 
     ontology = create_ontology_for_user(
         user.id, mount_group_id, bearer_token=token)
-    file_bytes = [io.BytesIO(await file.read()) for file in files]
+    # Hand over the spooled uploads rather than reading them into memory
+    file_bytes = [file.file for file in files]
     file_names = [file.filename for file in files]
 
     try:
@@ -8,8 +8,10 @@ from kvasir_api.modules.data_objects.service import Datasets
 from kvasir_api.modules.pipeline.service import Pipelines
 from kvasir_api.modules.model.service import Models
 from kvasir_api.modules.entity_graph.service import EntityGraphs
+from kvasir_api.modules.entity_graph.cache import EntityGraphCache
 from kvasir_api.modules.visualization.service import Visualizations
 from kvasir_api.modules.codebase.service import Codebase
+from kvasir_api.database.service import transaction
 
 
 def create_ontology_for_user(
@@ -37,5 +39,7 @@ def create_ontology_for_user(
         model_interface=model_service,
         visualization_interface=visualization_service,
         graph_interface=graph_service,
-        code_interface=code_service
+        code_interface=code_service,
+        graph_cache=EntityGraphCache(),
+        unit_of_work=transaction
     )
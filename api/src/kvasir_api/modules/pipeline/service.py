@@ -13,6 +13,7 @@ from kvasir_api.modules.pipeline.models import (
     pipeline_run,
 )
 from kvasir_api.modules.kvasir_v1.models import swe_run
+from kvasir_api.modules.entity_graph.cache import EntityGraphCache
 from kvasir_ontology.entities.pipeline.data_model import (
     PipelineBase,
     PipelineImplementationBase,
@@ -85,6 +86,8 @@ class Pipelines(PipelineInterface):
             ) for pipeline_run_create in pipeline_runs_create
         ]
         await execute(insert(pipeline_run).values([run.model_dump() for run in pipeline_runs_objs]), commit_after=True)
+        await EntityGraphCache().bump_versions_for_nodes(
+            list({run.pipeline_id for run in pipeline_runs_objs}))
         return pipeline_runs_objs
 
     async def get_pipeline(self, pipeline_id: uuid.UUID) -> Pipeline:
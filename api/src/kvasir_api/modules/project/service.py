@@ -64,9 +64,9 @@ class Projects:
         )
 
         # Run the init to get the project setup
-        # Need to force_build on project creation to ensure the package is installed
+        # The package is put on the sandbox's path from its volume, so the shared prebuilt image can be reused
         sb = ModalSandbox(project_create.mount_group_id, name_snake_case)
-        await sb.create_container_if_not_exists(force_build=True)
+        await sb.create_container_if_not_exists()
 
         await execute(
             insert(project).values(project_record.model_dump()),
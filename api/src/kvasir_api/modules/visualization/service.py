@@ -1,6 +1,5 @@
 import json
 import uuid
-import modal
 from datetime import datetime, timezone
 from typing import List, Annotated, Optional
 from sqlalchemy import insert, select, and_
@@ -15,7 +14,8 @@ from kvasir_api.auth.schema import User
 from kvasir_ontology.visualization.interface import VisualizationInterface
 from kvasir_ontology.visualization.data_model import ImageBase, EchartBase, TableBase, ImageCreate, EchartCreate, TableCreate, EChartsOption
 
-from kvasir_agents.sandbox.modal import ModalSandbox
+from kvasir_agents.sandbox.modal import ModalSandbox, read_project_file
+from kvasir_agents.sandbox.scheduler import ExecPriority, exec_priority
 
 
 class Visualizations(VisualizationInterface):
@@ -131,39 +131,15 @@ class Visualizations(VisualizationInterface):
 
     async def download_image(self, image_id: uuid.UUID, mount_group_id: uuid.UUID) -> bytes:
         image_obj = await self.get_image(image_id)
-        vol = modal.Volume.from_name(
-            str(mount_group_id), create_if_missing=True)
-
-        chunks = []
-        async for chunk in vol.read_file.aio(image_obj.image_path.replace("/app", "")):
-            chunks.append(chunk)
-
-        return b"".join(chunks)
+        return await read_project_file(mount_group_id, image_obj.image_path)
 
     async def download_table(self, table_id: uuid.UUID, mount_group_id: uuid.UUID) -> bytes:
         table_obj = await self.get_table(table_id)
-
-        vol = modal.Volume.from_name(
-            str(mount_group_id), create_if_missing=True)
-
-        chunks = []
-        async for chunk in vol.read_file.aio(table_obj.table_path.replace("/app", "")):
-            chunks.append(chunk)
-
-        return b"".join(chunks)
+        return await read_project_file(mount_group_id, table_obj.table_path)
 
     async def download_echart(self, echart_id: uuid.UUID, mount_group_id: uuid.UUID, original_object_id: Optional[str] = None) -> EChartsOption:
-        graph_service = EntityGraphs(self.user_id)
-        mount_group = await graph_service.get_node_group(mount_group_id)
-        if not mount_group.python_package_name:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Mount group with ID {mount_group_id} does not have a Python package name"
-            )
-
         echart = await self.get_echart(echart_id)
-        sandbox = ModalSandbox(mount_group_id,
-                               mount_group.python_package_name)
+        sandbox = await self._get_sandbox(mount_group_id)
         script_content = await sandbox.read_file(echart.chart_script_path)
 
         if original_object_id:
@@ -171,7 +147,9 @@ class Visualizations(VisualizationInterface):
         else:
             script_content = f"{script_content}\n\nresult = generate_chart()\nimport json\nprint(json.dumps(result, default=str))"
 
-        out, err = await sandbox.run_python_code(script_content)
+        # The user is waiting on the chart, it goes ahead of queued agent code
+        with exec_priority(ExecPriority.INTERACTIVE):
+            out, err = await sandbox.run_python_code(script_content)
 
         if err:
             raise HTTPException(
@@ -184,6 +162,17 @@ class Visualizations(VisualizationInterface):
 
         return chart_config
 
+    async def _get_sandbox(self, mount_group_id: uuid.UUID) -> ModalSandbox:
+        graph_service = EntityGraphs(self.user_id)
+        mount_group = await graph_service.get_node_group(mount_group_id)
+        if not mount_group.python_package_name:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Mount group with ID {mount_group_id} does not have a Python package name"
+            )
+
+        return ModalSandbox(mount_group_id, mount_group.python_package_name)
+
 
 # For dependency injection
 async def get_visualization_service(user: Annotated[User, Depends(get_current_user)]) -> VisualizationInterface:
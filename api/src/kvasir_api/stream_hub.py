@@ -0,0 +1,208 @@
+import asyncio
+from typing import AsyncIterator, Dict, Mapping, NamedTuple, Optional, Set, Tuple
+
+from kvasir_api.redis import get_redis
+from kvasir_api.app_secrets import SSE_MIN_SLEEP_TIME
+from kvasir_agents.agents.v1.broker import logger
+
+
+# Entries a listener can fall behind the live entries by. A listener that falls further behind is cut off from them
+# and catches up by reading the stream itself, so a slow client never holds up the others or loses entries
+MAX_QUEUED_ENTRIES = 256
+
+# The entries to read in one XREAD or XRANGE, and how long a read blocks. A reader stops after its first read that
+# ends with no listeners left
+STREAM_READ_COUNT = 100
+STREAM_READ_BLOCK = SSE_MIN_SLEEP_TIME
+
+
+class StreamEntry(NamedTuple):
+    key: str
+    id: str
+    fields: Dict[str, str]
+
+
+def _parse_entry_id(entry_id: str) -> Tuple[int, int]:
+    milliseconds, _, sequence = entry_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+class _Listener:
+
+    def __init__(self):
+        self.queue: asyncio.Queue[Optional[StreamEntry]] = asyncio.Queue()
+        self.lagging = False
+        # Per stream, the last entry the listener had when it started following the reader
+        self.floors: Dict[str, Tuple[int, int]] = {}
+
+    def _put(self, entry: StreamEntry) -> None:
+        if self.lagging or _parse_entry_id(entry.id) <= self.floors[entry.key]:
+            return
+        if self.queue.qsize() >= MAX_QUEUED_ENTRIES:
+            self.lagging = True
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(entry)
+
+
+class _StreamReader:
+    """
+    The one XREAD consumer of a stream in the process, position is the id of the last entry it read.
+    """
+
+    def __init__(self, key: str, position: str):
+        self.key = key
+        self.position = position
+        self.listeners: Set[_Listener] = set()
+        self.task: Optional[asyncio.Task] = None
+
+
+class StreamHub:
+    """
+    Fans the entries of Redis streams out to every listener in the process, with one blocking XREAD per stream that
+    has listeners rather than one per listener.
+    """
+
+    def __init__(self):
+        self._readers: Dict[str, _StreamReader] = {}
+
+    async def get_last_id(self, key: str) -> str:
+        """The id of the stream's last entry, listening from it gets the entries added after this returns."""
+        last_entries = await get_redis().xrevrange(key, count=1)
+        return last_entries[0][0] if last_entries else "0-0"
+
+    async def listen(
+        self,
+        streams: Mapping[str, Optional[str]],
+        heartbeat: Optional[float] = None
+    ) -> AsyncIterator[Optional[StreamEntry]]:
+        """
+        Yields the entries of the streams after the given ids, or after the entries added before listening for the
+        streams without an id, in order per stream. Entries that are still in the stream are caught up on first, so
+        listening from the last id a client got resumes where it left off. If heartbeat is set, None is yielded
+        whenever that many seconds pass without an entry.
+        """
+        positions = dict(streams)
+        listener = _Listener()
+        try:
+            while True:
+                readers = {key: await self._get_reader(key) for key in positions}
+                for key, reader in readers.items():
+                    if positions[key] is None:
+                        positions[key] = reader.position
+
+                # Caught up only if none of the readers moved on or stopped while waiting for the others
+                behind = {
+                    key: reader for key, reader in readers.items()
+                    if self._readers.get(key) is not reader
+                    or _parse_entry_id(positions[key]) < _parse_entry_id(reader.position)
+                }
+                if behind:
+                    async for entry in self._read_range(behind, positions):
+                        yield entry
+                    continue
+
+                listener.lagging = False
+                for key, reader in readers.items():
+                    listener.floors[key] = _parse_entry_id(positions[key])
+                    reader.listeners.add(listener)
+                try:
+                    while True:
+                        try:
+                            entry = await asyncio.wait_for(listener.queue.get(), timeout=heartbeat)
+                        except asyncio.TimeoutError:
+                            yield None
+                            continue
+                        if entry is None:
+                            break
+                        positions[entry.key] = entry.id
+                        yield entry
+                finally:
+                    for reader in readers.values():
+                        reader.listeners.discard(listener)
+                # Fell behind, the entries still queued are read again from the streams
+                listener.queue = asyncio.Queue()
+        finally:
+            for key in positions:
+                reader = self._readers.get(key)
+                if reader is not None:
+                    reader.listeners.discard(listener)
+
+    async def _read_range(
+        self,
+        readers: Dict[str, _StreamReader],
+        positions: Dict[str, Optional[str]]
+    ) -> AsyncIterator[StreamEntry]:
+        cache = get_redis()
+        for key, reader in readers.items():
+            if _parse_entry_id(positions[key]) >= _parse_entry_id(reader.position):
+                continue
+            entries = await cache.xrange(key, f"({positions[key]}", reader.position, count=STREAM_READ_COUNT)
+            if not entries:
+                # Trimmed from the stream before the listener got to them
+                positions[key] = reader.position
+            for entry_id, fields in entries:
+                positions[key] = entry_id
+                yield StreamEntry(key, entry_id, fields)
+
+    async def _get_reader(self, key: str) -> _StreamReader:
+        reader = self._readers.get(key)
+        if reader is not None:
+            return reader
+
+        last_id = await self.get_last_id(key)
+        # Another listener may have started one in the meantime
+        reader = self._readers.get(key)
+        if reader is None:
+            reader = _StreamReader(key, last_id)
+            self._readers[key] = reader
+            reader.task = asyncio.create_task(self._read(reader))
+        return reader
+
+    async def _read(self, reader: _StreamReader) -> None:
+        cache = get_redis()
+        try:
+            while True:
+                try:
+                    response = await cache.xread(
+                        {reader.key: reader.position}, count=STREAM_READ_COUNT, block=int(STREAM_READ_BLOCK * 1000))
+                except Exception:
+                    logger.exception(f"Failed to read stream {reader.key}, retrying")
+                    await asyncio.sleep(STREAM_READ_BLOCK)
+                    response = None
+
+                for _, entries in response or []:
+                    for entry_id, fields in entries:
+                        reader.position = entry_id
+                        entry = StreamEntry(reader.key, entry_id, fields)
+                        for listener in list(reader.listeners):
+                            listener._put(entry)
+
+                if not reader.listeners:
+                    break
+        finally:
+            if self._readers.get(reader.key) is reader:
+                del self._readers[reader.key]
+
+
+_stream_hub = StreamHub()
+
+
+def get_stream_hub() -> StreamHub:
+    return _stream_hub
+
+
+def format_stream_event_id(positions: Mapping[str, Optional[str]]) -> str:
+    """The SSE event id of the positions in several streams, for the client to send back as Last-Event-ID."""
+    return ",".join(f"{key}={entry_id}" for key, entry_id in positions.items() if entry_id is not None)
+
+
+def parse_stream_event_id(event_id: str) -> Dict[str, str]:
+    """The positions in an event id from format_stream_event_id, ids that are not stream entry ids are left out."""
+    positions = {}
+    for position in event_id.split(","):
+        key, _, entry_id = position.strip().partition("=")
+        milliseconds, _, sequence = entry_id.partition("-")
+        if milliseconds.isdigit() and sequence.isdigit():
+            positions[key] = entry_id
+    return positions
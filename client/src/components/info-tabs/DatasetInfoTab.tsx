@@ -1,7 +1,7 @@
 import { Layers, ChevronDown, ChevronRight, Database, Calendar, Trash2, Settings } from 'lucide-react';  
 import { useEffect, useState } from 'react';
-import { useDataset } from "@/hooks/useDatasets";
-import { ObjectGroupWithObjects, DataObject, TimeSeriesBase, Modality } from "@/types/ontology/dataset";
+import { useDataset, useDataObjectsInDataset } from "@/hooks/useDatasets";
+import { ObjectGroup, DataObject, TimeSeriesBase, TimeSeriesGroupBase, TabularGroupBase, Modality } from "@/types/ontology/dataset";
 import EChartWrapper from '@/components/charts/EChartWrapper';
 import { UUID } from 'crypto';
 import ConfirmationPopup from '@/components/ConfirmationPopup';
@@ -24,6 +24,90 @@ type SelectedDataObject = {
 }
 
 
+const formatTimeRange = (obj: DataObject) => {
+  const fields = obj.modalityFields as TimeSeriesBase;
+  const start = new Date(fields.startTimestamp).toLocaleDateString();
+  const end = new Date(fields.endTimestamp).toLocaleDateString();
+  return `${start} - ${end}`;
+};
+
+
+interface ObjectGroupDataObjectsProps {
+  datasetId: UUID;
+  group: ObjectGroup;
+  onSelect: (dataObject: SelectedDataObject) => void;
+}
+
+// The objects of an expanded group, paged in so large groups don't load all at once
+function ObjectGroupDataObjects({ datasetId, group, onSelect }: ObjectGroupDataObjectsProps) {
+  const { dataObjects, hasMore, loadMore, isLoading, isLoadingMore } = useDataObjectsInDataset(datasetId, group.id, 100);
+  const modality = group.modality;
+  const chartId = group.echartId;
+  const hasChart = chartId !== null && chartId !== undefined;
+
+  return (
+    <div className="border-t border-gray-300 bg-gray-50">
+      <div className="p-2 space-y-2">
+        {isLoading && (
+          <p className="text-xs text-gray-600 p-1">Loading...</p>
+        )}
+        {dataObjects.map((obj: DataObject) => {
+          const onClick = hasChart ? () => onSelect({
+            id: obj.id, 
+            modality: modality,
+            originalId: obj.originalId,
+            chartId: chartId!
+          }) : undefined;
+          return (
+          <div 
+            key={obj.id} 
+            onClick={onClick}
+            className={`group relative flex items-center gap-3 p-1 rounded-lg transition-all duration-200 border border-transparent ${hasChart ? 'cursor-pointer hover:bg-[#0E4F70]/10 hover:border-[#0E4F70]/30' : 'opacity-50 cursor-default'}`}> 
+            <div className="flex-1 min-w-0">
+              <div className="flex items-center justify-between mb-1">
+                <div className="flex items-center gap-2">
+                  <span className="text-xs px-2 py-1 bg-gray-200 rounded-full text-gray-600 font-mono">
+                    {modality}
+                  </span>
+                  <span className="text-sm font-medium text-gray-900 truncate">{obj.name}</span>
+                </div>
+                <div className="flex items-center gap-2">
+                  {modality === 'time_series' && (
+                    <>
+                      <div className="flex items-center gap-1 text-xs px-2 py-1 border border-gray-300 rounded-full text-gray-600">
+                        <Calendar size={12} />
+                        <span>{formatTimeRange(obj)}</span>
+                      </div>
+                      <div className="flex items-center gap-1 text-xs px-2 py-1 border border-gray-300 rounded-full text-gray-600">
+                        <Database size={12} />
+                        <span>{(obj.modalityFields as TimeSeriesBase).numTimestamps} points</span>
+                      </div>
+                    </>
+                  )}
+                </div>
+              </div>
+              <p className="text-xs text-gray-600 truncate">{obj.description}</p>
+            </div>
+          </div>
+        );
+        })}
+        {hasMore && (
+          <div className="flex justify-center py-1">
+            <button
+              onClick={loadMore}
+              disabled={isLoadingMore}
+              className="px-6 py-2 bg-gray-400 text-white text-sm font-medium rounded-md hover:bg-gray-500 disabled:bg-gray-400 disabled:cursor-not-allowed transition-colors"
+            >
+              {isLoadingMore ? 'Loading...' : 'Load More'}
+            </button>
+          </div>
+        )}
+      </div>
+    </div>
+  );
+}
+
+
 export default function DatasetInfoTab({ 
   datasetId,
   projectId,
@@ -77,13 +161,6 @@ export default function DatasetInfoTab({
     });
   };
 
-  const formatTimeRange = (obj: DataObject) => {
-    const fields = obj.modalityFields as TimeSeriesBase;
-    const start = new Date(fields.startTimestamp).toLocaleDateString();
-    const end = new Date(fields.endTimestamp).toLocaleDateString();
-    return `${start} - ${end}`;
-  };
-
   if (!dataset) {
     return null;
   }
@@ -156,9 +233,11 @@ export default function DatasetInfoTab({
                         </div>
 
                         <div className="flex-1 space-y-1 overflow-y-auto pr-2">
-                          {objectGroups.map((group: ObjectGroupWithObjects) => {
+                          {objectGroups.map((group: ObjectGroup) => {
                             const isOpen = expandedGroupIds.has(group.id);
-                            const entityCount = group.objects?.length || 0;
+                            const entityCount = group.modality === 'time_series'
+                              ? (group.modalityFields as TimeSeriesGroupBase).numberOfSeries
+                              : (group.modalityFields as TabularGroupBase).numberOfEntities;
                             
                             return (
                               <div key={group.id} className="bg-gray-100 rounded-xl border border-gray-300 overflow-hidden">
@@ -190,53 +269,11 @@ export default function DatasetInfoTab({
                                 </button>
                                 
                                 {isOpen && (
-                                  <div className="border-t border-gray-300 bg-gray-50">
-                                    <div className="p-2 space-y-2">
-                                      {group.objects?.map((obj: DataObject) => {
-                                        const modality = objectGroups.find(g => g.id === obj.groupId)?.modality;
-                                        const chartId = objectGroups.find(g => g.id === obj.groupId)?.echartId;
-                                        const hasChart = chartId !== null && chartId !== undefined;
-                                        const onClick = hasChart ? () => setSelectedDataObject({
-                                          id: obj.id, 
-                                          modality: modality as Modality,
-                                          originalId: obj.originalId,
-                                          chartId: chartId!
-                                        }) : undefined;
-                                        return (
-                                        <div 
-                                          key={obj.id} 
-                                          onClick={onClick}
-                                          className={`group relative flex items-center gap-3 p-1 rounded-lg transition-all duration-200 border border-transparent ${hasChart ? 'cursor-pointer hover:bg-[#0E4F70]/10 hover:border-[#0E4F70]/30' : 'opacity-50 cursor-default'}`}> 
-                                          <div className="flex-1 min-w-0">
-                                            <div className="flex items-center justify-between mb-1">
-                                              <div className="flex items-center gap-2">
-                                                <span className="text-xs px-2 py-1 bg-gray-200 rounded-full text-gray-600 font-mono">
-                                                  {modality}
-                                                </span>
-                                                <span className="text-sm font-medium text-gray-900 truncate">{obj.name}</span>
-                                              </div>
-                                              <div className="flex items-center gap-2">
-                                                {modality === 'time_series' && (
-                                                  <>
-                                                    <div className="flex items-center gap-1 text-xs px-2 py-1 border border-gray-300 rounded-full text-gray-600">
-                                                      <Calendar size={12} />
-                                                      <span>{formatTimeRange(obj)}</span>
-                                                    </div>
-                                                    <div className="flex items-center gap-1 text-xs px-2 py-1 border border-gray-300 rounded-full text-gray-600">
-                                                      <Database size={12} />
-                                                      <span>{(obj.modalityFields as TimeSeriesBase).numTimestamps} points</span>
-                                                    </div>
-                                                  </>
-                                                )}
-                                              </div>
-                                            </div>
-                                            <p className="text-xs text-gray-600 truncate">{obj.description}</p>
-                                          </div>
-                                        </div>
-                                      );
-                                      })}
-                                    </div>
-                                  </div>
+                                  <ObjectGroupDataObjects
+                                    datasetId={datasetId}
+                                    group={group}
+                                    onSelect={setSelectedDataObject}
+                                  />
                                 )}
                               </div>
                             );
@@ -13,7 +13,7 @@ export {
 
 // Entity hooks
 export { useDataSources, useDataSourcesByIds, useDataSource } from '@/hooks/useDataSources';
-export { useDatasetsByIds, useDataset } from '@/hooks/useDatasets';
+export { useDatasetsByIds, useDataset, useDataObjectsInDataset } from '@/hooks/useDatasets';
 export { usePipelinesByIds, usePipeline, usePipelineRuns, usePipelineRunsByPipelineId } from '@/hooks/usePipelines';
 export { useModelsInstantiated, useModelInstantiated } from '@/hooks/useModelsInstantiated';
 export { useAnalysis } from '@/hooks/useAnalysis';
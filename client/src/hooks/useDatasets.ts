@@ -1,8 +1,9 @@
 import useSWR from "swr";
+import useSWRInfinite from "swr/infinite";
 import { useSession } from "next-auth/react";
 import { snakeToCamelKeys } from "@/lib/utils";
 import { UUID } from "crypto";
-import { Dataset, ObjectGroupWithObjects } from "@/types/ontology/dataset";
+import { Dataset, DataObjectsPage, ObjectGroup } from "@/types/ontology/dataset";
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL;
 
@@ -45,8 +46,9 @@ async function fetchDatasetsByIds(token: string, datasetIds: UUID[]): Promise<Da
   return snakeToCamelKeys(data);
 }
 
-async function fetchObjectGroupsInDataset(token: string, datasetId: UUID): Promise<ObjectGroupWithObjects[]> {
-  const response = await fetch(`${API_URL}/data-objects/object-groups-in-dataset/${datasetId}`, {
+async function fetchObjectGroupsInDataset(token: string, datasetId: UUID): Promise<ObjectGroup[]> {
+  // The objects are paged in with useDataObjectsInDataset
+  const response = await fetch(`${API_URL}/data-objects/object-groups-in-dataset/${datasetId}?include_objects=false`, {
     headers: {
       'Authorization': `Bearer ${token}`,
       'Content-Type': 'application/json'
@@ -63,6 +65,32 @@ async function fetchObjectGroupsInDataset(token: string, datasetId: UUID): Promi
   return snakeToCamelKeys(data);
 }
 
+async function fetchDataObjectsPage(token: string, datasetId: UUID, groupId: UUID | null, limit: number, cursor: string | null): Promise<DataObjectsPage> {
+  const params = new URLSearchParams({ limit: limit.toString() });
+  if (groupId) {
+    params.append('group_ids', groupId);
+  }
+  if (cursor) {
+    params.append('cursor', cursor);
+  }
+
+  const response = await fetch(`${API_URL}/data-objects/data-objects-in-dataset/${datasetId}?${params.toString()}`, {
+    headers: {
+      'Authorization': `Bearer ${token}`,
+      'Content-Type': 'application/json'
+    },
+  });
+
+  if (!response.ok) {
+    const errorText = await response.text();
+    console.error('Failed to fetch data objects in dataset', errorText);
+    throw new Error(`Failed to fetch data objects in dataset: ${response.status} ${errorText}`);
+  }
+
+  const data = await response.json();
+  return snakeToCamelKeys(data);
+}
+
 
 export const useDatasetsByIds = (datasetIds?: UUID[]) => {
   const { data: session } = useSession();
@@ -101,4 +129,49 @@ export const useDataset = (datasetId?: UUID) => {
   };
 };
 
+export const useDataObjectsInDataset = (datasetId?: UUID, groupId?: UUID, objectsPerPage: number = 1000) => {
+  const { data: session } = useSession();
+
+  const getKey = (pageIndex: number, previousPageData: DataObjectsPage | null) => {
+    // The previous page was the last one
+    if (previousPageData && !previousPageData.nextCursor) return null;
+    if (!session || !datasetId) return null;
+
+    return ["data-objects-in-dataset", datasetId, groupId ?? null, objectsPerPage, previousPageData?.nextCursor ?? null];
+  };
+
+  const { data, size, setSize, error, isLoading, isValidating, mutate } = useSWRInfinite(
+    getKey,
+    ([, datasetId, groupId, limit, cursor]) =>
+      fetchDataObjectsPage(
+        session!.APIToken.accessToken,
+        datasetId as UUID,
+        groupId as UUID | null,
+        limit as number,
+        cursor as string | null
+      ),
+    {
+      revalidateFirstPage: false,
+      revalidateAll: false,
+    }
+  );
+
+  const dataObjects = data?.flatMap((page) => page.objects) ?? [];
+  const hasMore = !!data?.[data.length - 1]?.nextCursor;
 
+  const loadMore = () => {
+    if (hasMore && !isValidating) {
+      setSize(size + 1);
+    }
+  };
+
+  return {
+    dataObjects,
+    hasMore,
+    loadMore,
+    isLoading,
+    isLoadingMore: isValidating && size > 0,
+    isError: error,
+    mutateDataObjects: mutate,
+  };
+};
@@ -103,6 +103,11 @@ export interface ObjectGroupWithObjects extends ObjectGroup {
   objects: DataObject[];
 }
 
+export interface DataObjectsPage {
+  objects: DataObject[];
+  nextCursor: string | null;
+}
+
 // Create Models
 
 export interface DatasetBaseCreate {
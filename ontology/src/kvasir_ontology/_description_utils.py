@@ -1,12 +1,19 @@
 import json
-from typing import List, TYPE_CHECKING
+import asyncio
+from typing import List, Dict, Tuple, Any, TYPE_CHECKING
 from uuid import UUID
 
+from kvasir_ontology.graph.data_model import EdgeDefinition, NODE_TYPE_LITERAL
+
 
 if TYPE_CHECKING:
     from kvasir_ontology.ontology import Ontology
 
 
+# Only the first connections in each direction are shown in a description
+MAX_CONNECTIONS_SHOWN = 10
+
+
 def _is_simple_value(value) -> bool:
     value_str = str(value)
     return "\n" not in value_str and len(value_str) < 200
@@ -26,133 +33,236 @@ def _format_complex_field(name: str, value, indent: str = "", content_indent: st
     return result
 
 
-async def _get_connections_description(
+def _get_connections_description(
     entity_id: UUID,
-    ontology: "Ontology"
+    descriptions: "EntityDescriptions"
 ) -> List[str]:
     result = []
 
-    edges = await ontology.graph.get_node_edges(entity_id)
-
-    inbound_edges = [e for e in edges if e.to_node_id == entity_id]
-    outbound_edges = [e for e in edges if e.from_node_id == entity_id]
+    inbound_edges, outbound_edges = descriptions.get_edges(entity_id)
 
     if inbound_edges:
-        inputs_to_show = inbound_edges[:10]
+        inputs_to_show = inbound_edges[:MAX_CONNECTIONS_SHOWN]
         result.append("")
         result.append(f'  <inputs num_inputs="{len(inbound_edges)}">')
 
         for edge in inputs_to_show:
-            if edge.from_node_type == "data_source":
-                entity_desc = await get_data_source_description(
-                    edge.from_node_id, ontology, include_connections=False)
-                result.append("    <input>")
-                for line in entity_desc.split("\n"):
-                    result.append(f"      {line}")
-                result.append("    </input>")
-            elif edge.from_node_type == "dataset":
-                entity_desc = await get_dataset_description(
-                    edge.from_node_id, ontology, include_connections=False)
-                result.append("    <input>")
-                for line in entity_desc.split("\n"):
-                    result.append(f"      {line}")
-                result.append("    </input>")
-            elif edge.from_node_type == "pipeline":
-                entity_desc = await get_pipeline_description(
-                    edge.from_node_id, ontology, include_connections=False, include_runs=False)
-                result.append("    <input>")
-                for line in entity_desc.split("\n"):
-                    result.append(f"      {line}")
-                result.append("    </input>")
-            elif edge.from_node_type == "pipeline_run":
-                entity_desc = await get_pipeline_run_description(
-                    edge.from_node_id, ontology,
-                    show_pipeline_description=False,
-                    include_connections=False
-                )
-                result.append("    <input>")
-                for line in entity_desc.split("\n"):
-                    result.append(f"      {line}")
-                result.append("    </input>")
-            elif edge.from_node_type == "model_instantiated":
-                entity_desc = await get_model_entity_description(
-                    edge.from_node_id, ontology, include_connections=False)
-                result.append("    <input>")
-                for line in entity_desc.split("\n"):
-                    result.append(f"      {line}")
-                result.append("    </input>")
-            elif edge.from_node_type == "analysis":
-                entity_desc = await get_analysis_description(
-                    edge.from_node_id, ontology, include_connections=False)
-                result.append("    <input>")
-                for line in entity_desc.split("\n"):
-                    result.append(f"      {line}")
-                result.append("    </input>")
+            entity_desc = descriptions.render(
+                edge.from_node_id, edge.from_node_type,
+                include_connections=False,
+                include_runs=False,
+                show_pipeline_description=False
+            )
+            result.append("    <input>")
+            for line in entity_desc.split("\n"):
+                result.append(f"      {line}")
+            result.append("    </input>")
 
         result.append("  </inputs>")
 
     if outbound_edges:
-        outputs_to_show = outbound_edges[:10]
+        outputs_to_show = outbound_edges[:MAX_CONNECTIONS_SHOWN]
         result.append("")
         result.append(f'  <outputs num_outputs="{len(outbound_edges)}">')
 
         for edge in outputs_to_show:
-            if edge.to_node_type == "data_source":
-                entity_desc = await get_data_source_description(
-                    edge.to_node_id, ontology, include_connections=False)
-                result.append("    <output>")
-                for line in entity_desc.split("\n"):
-                    result.append(f"      {line}")
-                result.append("    </output>")
-            elif edge.to_node_type == "dataset":
-                entity_desc = await get_dataset_description(
-                    edge.to_node_id, ontology, include_connections=False)
-                result.append("    <output>")
-                for line in entity_desc.split("\n"):
-                    result.append(f"      {line}")
-                result.append("    </output>")
-            elif edge.to_node_type == "pipeline":
-                entity_desc = await get_pipeline_description(
-                    edge.to_node_id, ontology, include_connections=False, include_runs=False)
-                result.append("    <output>")
-                for line in entity_desc.split("\n"):
-                    result.append(f"      {line}")
-                result.append("    </output>")
-            elif edge.to_node_type == "pipeline_run":
-                entity_desc = await get_pipeline_run_description(
-                    edge.to_node_id, ontology,
-                    show_pipeline_description=False,
-                    include_connections=False
-                )
-                result.append("    <output>")
-                for line in entity_desc.split("\n"):
-                    result.append(f"      {line}")
-                result.append("    </output>")
-            elif edge.to_node_type == "model_instantiated":
-                entity_desc = await get_model_entity_description(
-                    edge.to_node_id, ontology, include_connections=False)
-                result.append("    <output>")
-                for line in entity_desc.split("\n"):
-                    result.append(f"      {line}")
-                result.append("    </output>")
-            elif edge.to_node_type == "analysis":
-                entity_desc = await get_analysis_description(
-                    edge.to_node_id, ontology, include_connections=False)
-                result.append("    <output>")
-                for line in entity_desc.split("\n"):
-                    result.append(f"      {line}")
-                result.append("    </output>")
+            entity_desc = descriptions.render(
+                edge.to_node_id, edge.to_node_type,
+                include_connections=False,
+                include_runs=False,
+                show_pipeline_description=False
+            )
+            result.append("    <output>")
+            for line in entity_desc.split("\n"):
+                result.append(f"      {line}")
+            result.append("    </output>")
 
         result.append("  </outputs>")
 
     return result
 
 
+class EntityDescriptions:
+    """
+    Describes a set of entities in one pass. Everything the descriptions reference (connected entities,
+    pipelines of runs, implementation code) is loaded up front with one batched call per entity type,
+    and each rendered fragment is memoized so shared neighbors are only formatted once.
+    """
+
+    def __init__(self, ontology: "Ontology"):
+        self.ontology = ontology
+        self.entities: Dict[NODE_TYPE_LITERAL, Dict[UUID, Any]] = {
+            "data_source": {},
+            "dataset": {},
+            "pipeline": {},
+            "pipeline_run": {},
+            "model_instantiated": {},
+            "analysis": {},
+        }
+        self.edges: Dict[UUID, List[EdgeDefinition]] = {}
+        self.code_files: Dict[str, str] = {}
+        self._fragments: Dict[Tuple, str] = {}
+
+    async def load(
+        self,
+        entities: List[Tuple[UUID, NODE_TYPE_LITERAL]],
+        include_connections: bool = True,
+        show_pipeline_description: bool = True
+    ) -> None:
+        if include_connections:
+            entity_ids = list({entity_id for entity_id, _ in entities if entity_id not in self.edges})
+            edges = await asyncio.gather(*[self.ontology.graph.get_node_edges(entity_id) for entity_id in entity_ids])
+            self.edges.update(zip(entity_ids, edges))
+
+        entity_ids_by_type: Dict[NODE_TYPE_LITERAL, set] = {entity_type: set() for entity_type in self.entities}
+        for entity_id, entity_type in entities:
+            entity_ids_by_type[entity_type].add(entity_id)
+            if include_connections:
+                inbound_edges, outbound_edges = self.get_edges(entity_id)
+                for edge in inbound_edges[:MAX_CONNECTIONS_SHOWN]:
+                    entity_ids_by_type[edge.from_node_type].add(edge.from_node_id)
+                for edge in outbound_edges[:MAX_CONNECTIONS_SHOWN]:
+                    entity_ids_by_type[edge.to_node_type].add(edge.to_node_id)
+
+        await self._load_entities(entity_ids_by_type)
+
+        if show_pipeline_description:
+            runs = [self.entities["pipeline_run"].get(entity_id)
+                    for entity_id, entity_type in entities if entity_type == "pipeline_run"]
+            await self._load_entities({"pipeline": {run.pipeline_id for run in runs if run}})
+
+        await self._load_code_files()
+
+    def get_edges(self, entity_id: UUID) -> Tuple[List[EdgeDefinition], List[EdgeDefinition]]:
+        edges = self.edges.get(entity_id, [])
+        inbound_edges = [e for e in edges if e.to_node_id == entity_id]
+        outbound_edges = [e for e in edges if e.from_node_id == entity_id]
+        return inbound_edges, outbound_edges
+
+    def render(
+        self,
+        entity_id: UUID,
+        entity_type: NODE_TYPE_LITERAL,
+        include_connections: bool = True,
+        include_runs: bool = True,
+        show_pipeline_description: bool = True
+    ) -> str:
+        # Normalize the options that don't apply to the entity type so equivalent fragments share a key
+        include_runs = include_runs and entity_type == "pipeline"
+        show_pipeline_description = show_pipeline_description and entity_type == "pipeline_run"
+        key = (entity_id, entity_type, include_connections, include_runs, show_pipeline_description)
+        if key in self._fragments:
+            return self._fragments[key]
+
+        if entity_type == "data_source":
+            description = _render_data_source(entity_id, self, include_connections)
+        elif entity_type == "dataset":
+            description = _render_dataset(entity_id, self, include_connections)
+        elif entity_type == "pipeline":
+            description = _render_pipeline(entity_id, self, include_connections, include_runs)
+        elif entity_type == "pipeline_run":
+            description = _render_pipeline_run(entity_id, self, include_connections, show_pipeline_description)
+        elif entity_type == "model_instantiated":
+            description = _render_model_entity(entity_id, self, include_connections)
+        elif entity_type == "analysis":
+            description = _render_analysis(entity_id, self, include_connections)
+        else:
+            raise ValueError(f"Unknown entity type: {entity_type}")
+
+        self._fragments[key] = description
+        return description
+
+    async def _load_entities(self, entity_ids_by_type: Dict[NODE_TYPE_LITERAL, set]) -> None:
+        loaders = {
+            "data_source": self.ontology.data_sources.get_data_sources,
+            "dataset": self.ontology.datasets.get_datasets,
+            "pipeline": self.ontology.pipelines.get_pipelines,
+            "pipeline_run": lambda run_ids: self.ontology.pipelines.get_pipeline_runs(run_ids=run_ids),
+            "model_instantiated": self.ontology.models.get_models_instantiated,
+            "analysis": self.ontology.analyses.get_analyses,
+        }
+
+        to_load = {}
+        for entity_type, entity_ids in entity_ids_by_type.items():
+            missing_ids = [entity_id for entity_id in entity_ids if entity_id not in self.entities[entity_type]]
+            if missing_ids:
+                to_load[entity_type] = missing_ids
+
+        results = await asyncio.gather(*[loaders[entity_type](entity_ids) for entity_type, entity_ids in to_load.items()])
+
+        for entity_type, entity_objs in zip(to_load, results):
+            for entity_obj in entity_objs:
+                self.entities[entity_type][entity_obj.id] = entity_obj
+                if entity_type == "pipeline":
+                    for run in entity_obj.runs:
+                        self.entities["pipeline_run"].setdefault(run.id, run)
+
+    async def _load_code_files(self) -> None:
+        script_paths = set()
+        for pipeline in self.entities["pipeline"].values():
+            if pipeline.implementation and pipeline.implementation.implementation_script_path:
+                script_paths.add(pipeline.implementation.implementation_script_path)
+        for model_entity in self.entities["model_instantiated"].values():
+            model_impl = model_entity.model.implementation if model_entity.model else None
+            if model_impl and model_impl.implementation_script_path:
+                script_paths.add(model_impl.implementation_script_path)
+
+        script_paths = [path for path in script_paths if path not in self.code_files]
+        code_files = await asyncio.gather(*[self.ontology.code.get_codebase_file(path) for path in script_paths])
+        self.code_files.update({path: code_file.content for path, code_file in zip(script_paths, code_files)})
+
+
+async def describe_entities(
+    entities: List[Tuple[UUID, NODE_TYPE_LITERAL]],
+    ontology: "Ontology",
+    include_connections: bool = True,
+    include_runs: bool = True,
+    show_pipeline_description: bool = True
+) -> List[str]:
+    descriptions = EntityDescriptions(ontology)
+    await descriptions.load(entities, include_connections, show_pipeline_description)
+    return [
+        descriptions.render(entity_id, entity_type, include_connections, include_runs, show_pipeline_description)
+        for entity_id, entity_type in entities
+    ]
+
+
 async def get_data_source_description(entity_id: UUID, ontology: "Ontology", include_connections: bool = True) -> str:
-    data_sources = await ontology.data_sources.get_data_sources([entity_id])
-    if not data_sources:
+    return (await describe_entities([(entity_id, "data_source")], ontology, include_connections))[0]
+
+
+async def get_dataset_description(entity_id: UUID, ontology: "Ontology", include_connections: bool = True) -> str:
+    return (await describe_entities([(entity_id, "dataset")], ontology, include_connections))[0]
+
+
+async def get_pipeline_description(entity_id: UUID, ontology: "Ontology", include_connections: bool = True, include_runs: bool = True) -> str:
+    return (await describe_entities([(entity_id, "pipeline")], ontology, include_connections, include_runs=include_runs))[0]
+
+
+async def get_pipeline_run_description(
+    run_id: UUID,
+    ontology: "Ontology",
+    show_pipeline_description: bool = True,
+    include_connections: bool = True
+) -> str:
+    return (await describe_entities(
+        [(run_id, "pipeline_run")], ontology, include_connections,
+        show_pipeline_description=show_pipeline_description
+    ))[0]
+
+
+async def get_model_entity_description(entity_id: UUID, ontology: "Ontology", include_connections: bool = True) -> str:
+    return (await describe_entities([(entity_id, "model_instantiated")], ontology, include_connections))[0]
+
+
+async def get_analysis_description(entity_id: UUID, ontology: "Ontology", include_connections: bool = True) -> str:
+    return (await describe_entities([(entity_id, "analysis")], ontology, include_connections))[0]
+
+
+def _render_data_source(entity_id: UUID, descriptions: "EntityDescriptions", include_connections: bool) -> str:
+    data_source = descriptions.entities["data_source"].get(entity_id)
+    if not data_source:
         raise ValueError(f"Data source with ID {entity_id} not found")
-    data_source = data_sources[0]
 
     result = [f'<data_source id="{data_source.id}" name="{data_source.name}">']
 
@@ -193,7 +303,7 @@ async def get_data_source_description(entity_id: UUID, ontology: "Ontology", inc
         result.append("  </additional_variables>")
 
     if include_connections:
-        connections = await _get_connections_description(entity_id, ontology)
+        connections = _get_connections_description(entity_id, descriptions)
         result.extend(connections)
 
     result.append("")
@@ -202,11 +312,10 @@ async def get_data_source_description(entity_id: UUID, ontology: "Ontology", inc
     return "\n".join(result)
 
 
-async def get_dataset_description(entity_id: UUID, ontology: "Ontology", include_connections: bool = True) -> str:
-    datasets = await ontology.datasets.get_datasets([entity_id])
-    if not datasets:
+def _render_dataset(entity_id: UUID, descriptions: "EntityDescriptions", include_connections: bool) -> str:
+    dataset = descriptions.entities["dataset"].get(entity_id)
+    if not dataset:
         raise ValueError(f"Dataset with ID {entity_id} not found")
-    dataset = datasets[0]
 
     result = [f'<dataset id="{dataset.id}" name="{dataset.name}">']
 
@@ -313,7 +422,7 @@ async def get_dataset_description(entity_id: UUID, ontology: "Ontology", include
         result.append("  </object_groups>")
 
     if include_connections:
-        connections = await _get_connections_description(entity_id, ontology)
+        connections = _get_connections_description(entity_id, descriptions)
         result.extend(connections)
 
     result.append("")
@@ -322,11 +431,10 @@ async def get_dataset_description(entity_id: UUID, ontology: "Ontology", include
     return "\n".join(result)
 
 
-async def get_pipeline_description(entity_id: UUID, ontology: "Ontology", include_connections: bool = True, include_runs: bool = True) -> str:
-    pipelines = await ontology.pipelines.get_pipelines([entity_id])
-    if not pipelines:
+def _render_pipeline(entity_id: UUID, descriptions: "EntityDescriptions", include_connections: bool, include_runs: bool) -> str:
+    pipeline = descriptions.entities["pipeline"].get(entity_id)
+    if not pipeline:
         raise ValueError(f"Pipeline with ID {entity_id} not found")
-    pipeline = pipelines[0]
 
     result = [f'<pipeline id="{pipeline.id}" name="{pipeline.name}">']
 
@@ -382,26 +490,25 @@ async def get_pipeline_description(entity_id: UUID, ontology: "Ontology", includ
         if impl.implementation_script_path:
             result.append(_format_simple_field(
                 'implementation_script_path', impl.implementation_script_path, "    "))
-            code_file = await ontology.code.get_codebase_file(impl.implementation_script_path)
             result.append("    <code>")
-            for line in code_file.content.split("\n"):
+            for line in descriptions.code_files[impl.implementation_script_path].split("\n"):
                 result.append(f"      {line}")
             result.append("    </code>")
 
         result.append("  </implementation>")
 
     if include_connections:
-        connections = await _get_connections_description(entity_id, ontology)
+        connections = _get_connections_description(entity_id, descriptions)
         result.extend(connections)
 
     if include_runs and pipeline.runs:
         result.append("")
         result.append("  <pipeline_runs>")
         for run in pipeline.runs:
-            run_desc = await get_pipeline_run_description(
-                run.id, ontology,
-                show_pipeline_description=False,
-                include_connections=False
+            run_desc = descriptions.render(
+                run.id, "pipeline_run",
+                include_connections=False,
+                show_pipeline_description=False
             )
             result.append("")
             result.append("    <pipeline_run>")
@@ -416,13 +523,13 @@ async def get_pipeline_description(entity_id: UUID, ontology: "Ontology", includ
     return "\n".join(result)
 
 
-async def get_pipeline_run_description(
+def _render_pipeline_run(
     run_id: UUID,
-    ontology: "Ontology",
-    show_pipeline_description: bool = True,
-    include_connections: bool = True
+    descriptions: "EntityDescriptions",
+    include_connections: bool,
+    show_pipeline_description: bool
 ) -> str:
-    pipeline_run = await ontology.pipelines.get_pipeline_run(run_id)
+    pipeline_run = descriptions.entities["pipeline_run"].get(run_id)
     if not pipeline_run:
         raise ValueError(f"Pipeline run with ID {run_id} not found")
 
@@ -488,8 +595,8 @@ async def get_pipeline_run_description(
     if show_pipeline_description:
         result.append("")
         result.append("  <pipeline>")
-        pipeline_desc = await get_pipeline_description(
-            pipeline_run.pipeline_id, ontology,
+        pipeline_desc = descriptions.render(
+            pipeline_run.pipeline_id, "pipeline",
             include_connections=False,
             include_runs=False
         )
@@ -498,7 +605,7 @@ async def get_pipeline_run_description(
         result.append("  </pipeline>")
 
     if include_connections:
-        connections = await _get_connections_description(run_id, ontology)
+        connections = _get_connections_description(run_id, descriptions)
         result.extend(connections)
 
     result.append("")
@@ -507,11 +614,10 @@ async def get_pipeline_run_description(
     return "\n".join(result)
 
 
-async def get_model_entity_description(entity_id: UUID, ontology: "Ontology", include_connections: bool = True) -> str:
-    models = await ontology.models.get_models_instantiated([entity_id])
-    if not models:
+def _render_model_entity(entity_id: UUID, descriptions: "EntityDescriptions", include_connections: bool) -> str:
+    model_entity = descriptions.entities["model_instantiated"].get(entity_id)
+    if not model_entity:
         raise ValueError(f"Model instantiated with ID {entity_id} not found")
-    model_entity = models[0]
 
     result = [
         f'<model_instantiated id="{model_entity.id}" name="{model_entity.name}">']
@@ -560,9 +666,8 @@ async def get_model_entity_description(entity_id: UUID, ontology: "Ontology", in
         if model_impl.implementation_script_path:
             result.append(_format_simple_field(
                 'implementation_script_path', model_impl.implementation_script_path, "    "))
-            code_file = await ontology.code.get_codebase_file(model_impl.implementation_script_path)
             result.append("    <code>")
-            for line in code_file.content.split("\n"):
+            for line in descriptions.code_files[model_impl.implementation_script_path].split("\n"):
                 result.append(f"      {line}")
             result.append("    </code>")
 
@@ -639,7 +744,7 @@ async def get_model_entity_description(entity_id: UUID, ontology: "Ontology", in
         result.append("  </model_implementation>")
 
     if include_connections:
-        connections = await _get_connections_description(entity_id, ontology)
+        connections = _get_connections_description(entity_id, descriptions)
         result.extend(connections)
 
     result.append("")
@@ -648,11 +753,10 @@ async def get_model_entity_description(entity_id: UUID, ontology: "Ontology", in
     return "\n".join(result)
 
 
-async def get_analysis_description(entity_id: UUID, ontology: "Ontology", include_connections: bool = True) -> str:
-    analyses = await ontology.analyses.get_analyses([entity_id])
-    if not analyses:
+def _render_analysis(entity_id: UUID, descriptions: "EntityDescriptions", include_connections: bool) -> str:
+    analysis = descriptions.entities["analysis"].get(entity_id)
+    if not analysis:
         raise ValueError(f"Analysis with ID {entity_id} not found")
-    analysis = analyses[0]
 
     result = [f'<analysis id="{analysis.id}" name="{analysis.name}">']
 
@@ -708,7 +812,7 @@ async def get_analysis_description(entity_id: UUID, ontology: "Ontology", includ
         result.append("  (empty notebook)")
 
     if include_connections:
-        connections = await _get_connections_description(entity_id, ontology)
+        connections = _get_connections_description(entity_id, descriptions)
         result.extend(connections)
 
     result.append("")
@@ -1,5 +1,5 @@
 from uuid import UUID
-from typing import List, AsyncGenerator, Union
+from typing import List, AsyncGenerator, Optional, Tuple, Union
 from abc import ABC, abstractmethod
 
 from kvasir_ontology.entities.analysis.data_model import Analysis, AnalysisCreate, SectionCreate, CodeCellCreate, MarkdownCellCreate, CodeOutputCreate, Section, AnalysisCell
@@ -68,5 +68,5 @@ class AnalysisInterface(ABC):
         pass
 
     @abstractmethod
-    async def listen_to_analysis_stream(self, run_id: UUID) -> AsyncGenerator[Union[Section, AnalysisCell], None]:
+    async def listen_to_analysis_stream(self, run_id: UUID, last_event_id: Optional[str] = None) -> AsyncGenerator[Tuple[str, Union[Section, AnalysisCell]], None]:
         pass
@@ -1,8 +1,7 @@
 from uuid import UUID
 from abc import ABC, abstractmethod
-from typing import List, Optional, Tuple
+from typing import BinaryIO, List, Optional, Tuple
 from pathlib import Path
-from io import BytesIO
 
 from kvasir_ontology.entities.data_source.data_model import DataSource, DataSourceCreate, DataSourceDetailsCreate
 
@@ -34,7 +33,7 @@ class DataSourceInterface(ABC):
         pass
 
     @abstractmethod
-    async def create_files_data_sources(self, file_bytes: List[BytesIO], file_names: List[str], mount_group_id: UUID) -> Tuple[List[DataSource], List[Path]]:
+    async def create_files_data_sources(self, file_bytes: List[BinaryIO], file_names: List[str], mount_group_id: UUID) -> Tuple[List[DataSource], List[Path]]:
         pass
 
     # Methods to get submission code for use in sandbox
@@ -105,6 +105,12 @@ class ObjectGroupWithObjects(ObjectGroup):
     objects: List[DataObject]
 
 
+class DataObjectsPage(BaseModel):
+    objects: List[DataObject]
+    # Pass back to get the next page, None on the last page
+    next_cursor: Optional[str] = None
+
+
 # Create schemas
 
 
@@ -3,7 +3,7 @@ from abc import ABC, abstractmethod
 from uuid import UUID
 from typing import List, Optional, Tuple, Union, Dict
 
-from kvasir_ontology.entities.dataset.data_model import Dataset, DatasetCreate, ObjectGroup, ObjectGroupWithObjects, ObjectGroupCreate, ObjectsFile, DataObject
+from kvasir_ontology.entities.dataset.data_model import Dataset, DatasetCreate, ObjectGroup, ObjectGroupWithObjects, ObjectGroupCreate, ObjectsFile, DataObject, DataObjectsPage
 from kvasir_ontology.visualization.data_model import EchartCreate
 
 
@@ -22,7 +22,7 @@ class DatasetInterface(ABC):
         pass
 
     @abstractmethod
-    async def add_data_objects(self, object_group_id: UUID, metadata: List[ObjectsFile], filename_to_dataframe: Dict[str, pd.DataFrame]) -> List[DataObject]:
+    async def add_data_objects(self, object_group_id: UUID, metadata: List[ObjectsFile], filename_to_dataframe: Dict[str, pd.DataFrame]) -> List[UUID]:
         pass
 
     @abstractmethod
@@ -58,6 +58,19 @@ class DatasetInterface(ABC):
     ) -> List[DataObject]:
         pass
 
+    @abstractmethod
+    async def get_data_objects_page(
+        self,
+        group_ids: Optional[List[UUID]] = None,
+        dataset_id: Optional[UUID] = None,
+        limit: int = 1000,
+        cursor: Optional[str] = None
+    ) -> DataObjectsPage:
+        """
+        Get objects ordered by (group_id, id), starting after the cursor of the previous page.
+        """
+        pass
+
     @abstractmethod
     async def create_object_group_echart(self, object_group_id: UUID, echart: EchartCreate) -> ObjectGroup:
         pass
@@ -89,3 +89,23 @@ class GraphInterface(ABC):
             root_node_id: Optional[UUID] = None) -> EntityGraph:
         # One of root_group_id or root_node_id must be provided
         pass
+
+
+class GraphCacheInterface(ABC):
+    # Entity graphs are cached per node group and version, the version must be bumped whenever the group's graph changes
+
+    @abstractmethod
+    async def get_version(self, node_group_id: UUID) -> int:
+        pass
+
+    @abstractmethod
+    async def bump_versions(self, node_group_ids: List[UUID]) -> None:
+        pass
+
+    @abstractmethod
+    async def get_entity_graph(self, node_group_id: UUID, version: int) -> Optional[EntityGraph]:
+        pass
+
+    @abstractmethod
+    async def set_entity_graph(self, node_group_id: UUID, version: int, entity_graph: EntityGraph) -> None:
+        pass
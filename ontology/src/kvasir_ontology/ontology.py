@@ -1,7 +1,7 @@
-import io
 from uuid import UUID
 from pathlib import Path
-from typing import List, Union, Tuple
+from contextlib import nullcontext
+from typing import BinaryIO, List, Union, Tuple, Optional, Callable, AsyncContextManager, Any
 
 from kvasir_ontology.entities.data_source.data_model import DataSourceCreate, DataSource
 from kvasir_ontology.entities.data_source.interface import DataSourceInterface
@@ -14,7 +14,7 @@ from kvasir_ontology.entities.pipeline.interface import PipelineInterface
 from kvasir_ontology.entities.model.data_model import ModelInstantiatedCreate, ModelInstantiated
 from kvasir_ontology.entities.model.interface import ModelInterface
 from kvasir_ontology.visualization.interface import VisualizationInterface
-from kvasir_ontology.graph.interface import GraphInterface
+from kvasir_ontology.graph.interface import GraphInterface, GraphCacheInterface
 from kvasir_ontology.graph.data_model import EdgeDefinition, EntityNodeCreate, EntityGraph, get_entity_graph_description, NODE_TYPE_LITERAL
 from kvasir_ontology.code.interface import CodeInterface
 from kvasir_ontology._description_utils import (
@@ -23,7 +23,8 @@ from kvasir_ontology._description_utils import (
     get_pipeline_description,
     get_pipeline_run_description,
     get_model_entity_description,
-    get_analysis_description
+    get_analysis_description,
+    describe_entities
 )
 
 
@@ -40,7 +41,9 @@ class Ontology:
             model_interface: ModelInterface,
             visualization_interface: VisualizationInterface,
             graph_interface: GraphInterface,
-            code_interface: CodeInterface
+            code_interface: CodeInterface,
+            graph_cache: Optional[GraphCacheInterface] = None,
+            unit_of_work: Optional[Callable[[], AsyncContextManager[Any]]] = None
     ) -> None:
 
         self.user_id = user_id
@@ -53,9 +56,41 @@ class Ontology:
         self.visualizations = visualization_interface
         self.graph = graph_interface
         self.code = code_interface
+        self.graph_cache = graph_cache
+        # Factory for the context each insert/delete runs in, so the backend can make its writes one atomic commit
+        self.unit_of_work = unit_of_work or nullcontext
+
+        # In-process copy of the mount group's graph, valid while its version matches the current one.
+        # Without a shared cache the version is local and only bumped by writes made through this ontology.
+        self._entity_graph: Optional[EntityGraph] = None
+        self._entity_graph_version: Optional[int] = None
+        self._local_graph_version = 0
 
     async def get_entity_graph(self) -> EntityGraph:
-        return await self.graph.get_entity_graph(root_group_id=self.mount_group_id)
+        if self.graph_cache:
+            version = await self.graph_cache.get_version(self.mount_group_id)
+        else:
+            version = self._local_graph_version
+
+        if self._entity_graph is not None and self._entity_graph_version == version:
+            return self._entity_graph
+
+        entity_graph = None
+        if self.graph_cache:
+            entity_graph = await self.graph_cache.get_entity_graph(self.mount_group_id, version)
+
+        if entity_graph is None:
+            entity_graph = await self.graph.get_entity_graph(root_group_id=self.mount_group_id)
+            if self.graph_cache:
+                await self.graph_cache.set_entity_graph(self.mount_group_id, version, entity_graph)
+
+        self._entity_graph = entity_graph
+        self._entity_graph_version = version
+        return entity_graph
+
+    def invalidate_entity_graph(self) -> None:
+        self._local_graph_version += 1
+        self._entity_graph = None
 
     async def get_entities(self, entity_ids: List[UUID]) -> List[Union[DataSource, Dataset, Pipeline, ModelInstantiated, Analysis]]:
         data_sources = await self.data_sources.get_data_sources(entity_ids)
@@ -123,12 +158,11 @@ class Ontology:
         for entity in entity_graph.models_instantiated:
             id_to_type[entity.id] = "model_instantiated"
 
-        entity_descriptions = []
-        for entity_id in entity_ids:
-            if entity_id in id_to_type:
-                entity_type = id_to_type[entity_id]
-                description = await self.describe_entity(entity_id, entity_type, include_connections)
-                entity_descriptions.append(description)
+        entity_descriptions = await describe_entities(
+            [(entity_id, id_to_type[entity_id]) for entity_id in entity_ids if entity_id in id_to_type],
+            self,
+            include_connections=include_connections
+        )
 
         final_out = (
             "<entity_descriptions>\n\n" +
@@ -146,16 +180,18 @@ class Ontology:
         y_position: float = 400,
     ) -> DataSource:
 
-        data_source_obj = await self.data_sources.create_data_source(data_source)
-        await self.graph.add_node(EntityNodeCreate(
-            id=data_source_obj.id,
-            name=data_source_obj.name,
-            entity_type="data_source",
-            node_groups=[self.mount_group_id],
-            x_position=x_position,
-            y_position=y_position,
-        ))
-        await self.graph.create_edges(edges)
+        async with self.unit_of_work():
+            data_source_obj = await self.data_sources.create_data_source(data_source)
+            await self.graph.add_node(EntityNodeCreate(
+                id=data_source_obj.id,
+                name=data_source_obj.name,
+                entity_type="data_source",
+                node_groups=[self.mount_group_id],
+                x_position=x_position,
+                y_position=y_position,
+            ))
+            await self.graph.create_edges(edges)
+        self.invalidate_entity_graph()
 
         return data_source_obj
 
@@ -167,16 +203,18 @@ class Ontology:
         y_position: float = 400,
     ) -> Dataset:
 
-        dataset_obj = await self.datasets.create_dataset(dataset)
-        await self.graph.add_node(EntityNodeCreate(
-            id=dataset_obj.id,
-            name=dataset_obj.name,
-            entity_type="dataset",
-            node_groups=[self.mount_group_id],
-            x_position=x_position,
-            y_position=y_position,
-        ))
-        await self.graph.create_edges(edges)
+        async with self.unit_of_work():
+            dataset_obj = await self.datasets.create_dataset(dataset)
+            await self.graph.add_node(EntityNodeCreate(
+                id=dataset_obj.id,
+                name=dataset_obj.name,
+                entity_type="dataset",
+                node_groups=[self.mount_group_id],
+                x_position=x_position,
+                y_position=y_position,
+            ))
+            await self.graph.create_edges(edges)
+        self.invalidate_entity_graph()
 
         return dataset_obj
 
@@ -188,16 +226,18 @@ class Ontology:
         y_position: float = 400,
     ) -> Analysis:
 
-        analysis_obj = await self.analyses.create_analysis(analysis)
-        await self.graph.add_node(EntityNodeCreate(
-            id=analysis_obj.id,
-            name=analysis_obj.name,
-            entity_type="analysis",
-            node_groups=[self.mount_group_id],
-            x_position=x_position,
-            y_position=y_position,
-        ))
-        await self.graph.create_edges(edges)
+        async with self.unit_of_work():
+            analysis_obj = await self.analyses.create_analysis(analysis)
+            await self.graph.add_node(EntityNodeCreate(
+                id=analysis_obj.id,
+                name=analysis_obj.name,
+                entity_type="analysis",
+                node_groups=[self.mount_group_id],
+                x_position=x_position,
+                y_position=y_position,
+            ))
+            await self.graph.create_edges(edges)
+        self.invalidate_entity_graph()
 
         return analysis_obj
 
@@ -209,16 +249,18 @@ class Ontology:
         y_position: float = 400,
     ) -> Pipeline:
 
-        pipeline_obj = await self.pipelines.create_pipeline(pipeline)
-        await self.graph.add_node(EntityNodeCreate(
-            id=pipeline_obj.id,
-            name=pipeline_obj.name,
-            entity_type="pipeline",
-            node_groups=[self.mount_group_id],
-            x_position=x_position,
-            y_position=y_position,
-        ))
-        await self.graph.create_edges(edges)
+        async with self.unit_of_work():
+            pipeline_obj = await self.pipelines.create_pipeline(pipeline)
+            await self.graph.add_node(EntityNodeCreate(
+                id=pipeline_obj.id,
+                name=pipeline_obj.name,
+                entity_type="pipeline",
+                node_groups=[self.mount_group_id],
+                x_position=x_position,
+                y_position=y_position,
+            ))
+            await self.graph.create_edges(edges)
+        self.invalidate_entity_graph()
 
         return pipeline_obj
 
@@ -230,78 +272,90 @@ class Ontology:
         y_position: float = 400,
     ) -> ModelInstantiated:
 
-        model_instantiated_obj = await self.models.create_model_instantiated(model_instantiated)
-        await self.graph.add_node(EntityNodeCreate(
-            id=model_instantiated_obj.id,
-            name=model_instantiated_obj.name,
-            entity_type="model_instantiated",
-            node_groups=[self.mount_group_id],
-            x_position=x_position,
-            y_position=y_position,
-        ))
-        await self.graph.create_edges(edges)
+        async with self.unit_of_work():
+            model_instantiated_obj = await self.models.create_model_instantiated(model_instantiated)
+            await self.graph.add_node(EntityNodeCreate(
+                id=model_instantiated_obj.id,
+                name=model_instantiated_obj.name,
+                entity_type="model_instantiated",
+                node_groups=[self.mount_group_id],
+                x_position=x_position,
+                y_position=y_position,
+            ))
+            await self.graph.create_edges(edges)
+        self.invalidate_entity_graph()
 
         return model_instantiated_obj
 
     async def delete_data_source(self, data_source_id: UUID) -> None:
 
-        all_edges = await self.graph.get_node_edges(data_source_id)
-        if all_edges:
-            await self.graph.remove_edges(all_edges)
-        node_groups = await self.graph.get_node_groups(data_source_id)
-        if node_groups:
-            await self.graph.remove_nodes_from_groups([data_source_id], [group.id for group in node_groups])
-        await self.graph.delete_node(data_source_id)
-        await self.data_sources.delete_data_source(data_source_id)
+        async with self.unit_of_work():
+            all_edges = await self.graph.get_node_edges(data_source_id)
+            if all_edges:
+                await self.graph.remove_edges(all_edges)
+            node_groups = await self.graph.get_node_groups(data_source_id)
+            if node_groups:
+                await self.graph.remove_nodes_from_groups([data_source_id], [group.id for group in node_groups])
+            await self.graph.delete_node(data_source_id)
+            await self.data_sources.delete_data_source(data_source_id)
+        self.invalidate_entity_graph()
 
     async def delete_dataset(self, dataset_id: UUID) -> None:
 
-        all_edges = await self.graph.get_node_edges(dataset_id)
-        if all_edges:
-            await self.graph.remove_edges(all_edges)
-        node_groups = await self.graph.get_node_groups(dataset_id)
-        if node_groups:
-            await self.graph.remove_nodes_from_groups([dataset_id], [group.id for group in node_groups])
-        await self.graph.delete_node(dataset_id)
-        await self.datasets.delete_dataset(dataset_id)
+        async with self.unit_of_work():
+            all_edges = await self.graph.get_node_edges(dataset_id)
+            if all_edges:
+                await self.graph.remove_edges(all_edges)
+            node_groups = await self.graph.get_node_groups(dataset_id)
+            if node_groups:
+                await self.graph.remove_nodes_from_groups([dataset_id], [group.id for group in node_groups])
+            await self.graph.delete_node(dataset_id)
+            await self.datasets.delete_dataset(dataset_id)
+        self.invalidate_entity_graph()
 
     async def delete_analysis(self, analysis_id: UUID) -> None:
 
-        all_edges = await self.graph.get_node_edges(analysis_id)
-        if all_edges:
-            await self.graph.remove_edges(all_edges)
-        node_groups = await self.graph.get_node_groups(analysis_id)
-        if node_groups:
-            await self.graph.remove_nodes_from_groups([analysis_id], [group.id for group in node_groups])
-        await self.graph.delete_node(analysis_id)
-        await self.analyses.delete_analysis(analysis_id)
+        async with self.unit_of_work():
+            all_edges = await self.graph.get_node_edges(analysis_id)
+            if all_edges:
+                await self.graph.remove_edges(all_edges)
+            node_groups = await self.graph.get_node_groups(analysis_id)
+            if node_groups:
+                await self.graph.remove_nodes_from_groups([analysis_id], [group.id for group in node_groups])
+            await self.graph.delete_node(analysis_id)
+            await self.analyses.delete_analysis(analysis_id)
+        self.invalidate_entity_graph()
 
     async def delete_pipeline(self, pipeline_id: UUID) -> None:
-        pipeline_runs = await self.pipelines.get_pipeline_runs(pipeline_ids=[pipeline_id])
-        pipeline_run_ids = [run.id for run in pipeline_runs]
-
-        if pipeline_run_ids:
-            await self.graph.remove_pipeline_run_edges(pipeline_run_ids)
-
-        all_edges = await self.graph.get_node_edges(pipeline_id)
-        if all_edges:
-            await self.graph.remove_edges(all_edges)
-        node_groups = await self.graph.get_node_groups(pipeline_id)
-        if node_groups:
-            await self.graph.remove_nodes_from_groups([pipeline_id], [group.id for group in node_groups])
-        await self.graph.delete_node(pipeline_id)
-        await self.pipelines.delete_pipeline(pipeline_id)
+        async with self.unit_of_work():
+            pipeline_runs = await self.pipelines.get_pipeline_runs(pipeline_ids=[pipeline_id])
+            pipeline_run_ids = [run.id for run in pipeline_runs]
+
+            if pipeline_run_ids:
+                await self.graph.remove_pipeline_run_edges(pipeline_run_ids)
+
+            all_edges = await self.graph.get_node_edges(pipeline_id)
+            if all_edges:
+                await self.graph.remove_edges(all_edges)
+            node_groups = await self.graph.get_node_groups(pipeline_id)
+            if node_groups:
+                await self.graph.remove_nodes_from_groups([pipeline_id], [group.id for group in node_groups])
+            await self.graph.delete_node(pipeline_id)
+            await self.pipelines.delete_pipeline(pipeline_id)
+        self.invalidate_entity_graph()
 
     async def delete_model_instantiated(self, model_instantiated_id: UUID) -> None:
 
-        all_edges = await self.graph.get_node_edges(model_instantiated_id)
-        if all_edges:
-            await self.graph.remove_edges(all_edges)
-        node_groups = await self.graph.get_node_groups(model_instantiated_id)
-        if node_groups:
-            await self.graph.remove_nodes_from_groups([model_instantiated_id], [group.id for group in node_groups])
-        await self.graph.delete_node(model_instantiated_id)
-        await self.models.delete_model_instantiated(model_instantiated_id)
+        async with self.unit_of_work():
+            all_edges = await self.graph.get_node_edges(model_instantiated_id)
+            if all_edges:
+                await self.graph.remove_edges(all_edges)
+            node_groups = await self.graph.get_node_groups(model_instantiated_id)
+            if node_groups:
+                await self.graph.remove_nodes_from_groups([model_instantiated_id], [group.id for group in node_groups])
+            await self.graph.delete_node(model_instantiated_id)
+            await self.models.delete_model_instantiated(model_instantiated_id)
+        self.invalidate_entity_graph()
 
     async def get_mounted_data_sources(self) -> List[DataSource]:
         entity_graph = await self.get_entity_graph()
@@ -338,19 +392,22 @@ class Ontology:
             return []
         return await self.analyses.get_analyses(analysis_ids)
 
-    async def insert_files_data_sources(self, file_bytes: List[io.BytesIO], file_names: List[str], edges: List[EdgeDefinition]) -> Tuple[List[DataSource], List[Path]]:
-        file_objs, file_paths = await self.data_sources.create_files_data_sources(file_bytes, file_names, self.mount_group_id)
-        await self.graph.add_nodes(
-            [EntityNodeCreate(
-                id=file_obj.id,
-                name=file_obj.name,
-                entity_type="data_source",
-                node_groups=[self.mount_group_id],
-                x_position=400,
-                y_position=400,
-            ) for file_obj in file_objs]
-        )
-        await self.graph.create_edges(edges)
+    async def insert_files_data_sources(self, file_bytes: List[BinaryIO], file_names: List[str], edges: List[EdgeDefinition]) -> Tuple[List[DataSource], List[Path]]:
+        async with self.unit_of_work():
+            file_objs, file_paths = await self.data_sources.create_files_data_sources(file_bytes, file_names, self.mount_group_id)
+            await self.graph.add_nodes(
+                [EntityNodeCreate(
+                    id=file_obj.id,
+                    name=file_obj.name,
+                    entity_type="data_source",
+                    node_groups=[self.mount_group_id],
+                    x_position=400,
+                    y_position=400,
+                ) for file_obj in file_objs]
+            )
+            await self.graph.create_edges(edges)
+        self.invalidate_entity_graph()
+
         return file_objs, file_paths
 
     async def describe_analysis(self, analysis_obj: Analysis, include_connections: bool = True) -> str: